@@ -0,0 +1,523 @@
+# -*- coding: utf-8 -*-
+"""
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+
+Created on Mon Oct 19 16:10:45 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A runner to segment many genomes, described in a JSON manifest. FASTA files are
+read by a thread, while chromosomes read before are segmented by a pool of
+processes. Completed chromosomes are recorded in a checkpoint file, so that an
+interrupted campaign could be resumed.
+
+A manifest example:
+
+    {
+        "output_dir": "campaign",
+        "defaults": {"window_size": 100000, "gap_tolerance": 5000,
+                     "min_size": 2, "windows": false},
+        "genomes": [
+            {"name": "hg38", "fasta": "hg38.fa.gz"},
+            {"name": "mm10", "fasta": "mm10.fa.gz", "window_size": 300000,
+             "chromosomes": ["chr1", "chr2"]}
+        ]
+    }
+
+"""
+
+import os
+import json
+import time
+import Queue
+import logging
+import threading
+import multiprocessing
+
+from . import Elements
+from . import Utility
+from . import Streaming
+from . import constants
+
+from . import __copyright__, __license__, __version__
+
+__author__ = "Paolo Cozzi <paolo.cozzi@ptp.it>"
+
+# for logging messages
+logger = logging.getLogger(__name__)
+
+
+# Exceptions definitions
+class CampaignError(Exception):
+    pass
+
+
+# the parameters of a segmentation, and their default values
+PARAMETERS = {
+    "window_size": constants.WINDOW_SIZE,
+    "gap_tolerance": constants.GAP_TOLERANCE,
+    "min_size": constants.ISO_MIN_SIZE,
+    "windows": False}
+
+
+def _safe_name(name):
+    """Returns a name which could be used as a filename"""
+
+    return name.replace(os.sep, "_").replace(" ", "_")
+
+
+def _write_atomic(filename, dump):
+    """Write a file with a temporary name, then rename it. dump is a function
+    which writes in an open file"""
+
+    tmpfile = filename + ".tmp"
+
+    with open(tmpfile, "w") as handle:
+        dump(handle)
+
+    os.rename(tmpfile, filename)
+
+
+def _segment_chromosome(task):
+    """Segment a chromosome and write its isochores (and windows) in files.
+    Returns the task key and some statistics"""
+
+    # sequence is a Utility.SharedSequence: only its filename was pickled
+    key, name, sequence, parameters, outputs = task
+
+    start_time = time.time()
+
+    Chrom = Elements.Chromosome(sequence)
+
+    Chrom.ValueWindows(
+        window_size=parameters["window_size"],
+        gap_tolerance=parameters["gap_tolerance"])
+
+    if "windows" in outputs:
+        _write_atomic(outputs["windows"], Chrom.DumpWindows)
+
+    Chrom.FindIsochores(min_size=parameters["min_size"])
+
+    _write_atomic(outputs["isochores"], Chrom.DumpIsochores)
+
+    return key, {
+        "n_of_windows": len(Chrom.windows),
+        "n_of_isochores": len(Chrom.isochores),
+        "elapsed": time.time() - start_time}
+
+
+# This class will segment all the genomes of a manifest
+class Campaign:
+    """A class to segment many genomes. Each chromosome is a task executed by
+    a pool of processes, while the next FASTA files are read in background"""
+
+    def __init__(self, manifest, processes=1, prefetch=2, retries=2):
+        """manifest could be a filename or a dictionary. At most prefetch
+        chromosomes will wait to be segmented. Failed tasks are tried again
+        retries times"""
+
+        if isinstance(manifest, basestring):
+            with open(manifest) as handle:
+                manifest = json.load(handle)
+
+        if "genomes" not in manifest or "output_dir" not in manifest:
+            raise CampaignError(
+                "A manifest needs 'genomes' and 'output_dir' keys")
+
+        self.manifest = manifest
+        self.output_dir = manifest["output_dir"]
+        self.processes = processes
+        self.prefetch = prefetch
+        self.retries = retries
+
+        # default parameters for all genomes
+        self.defaults = dict(PARAMETERS)
+        self.defaults.update(manifest.get("defaults", {}))
+
+        self.genomes = []
+
+        for genome in manifest["genomes"]:
+            if "name" not in genome or "fasta" not in genome:
+                raise CampaignError(
+                    "Each genome needs 'name' and 'fasta' keys: %s" %
+                    (genome))
+
+            self.genomes.append(genome)
+
+        self.checkpoint_file = os.path.join(
+            self.output_dir, "checkpoint.json")
+
+        # completed and failed tasks, and chromosomes of each genome
+        self.checkpoint = {"completed": {}, "failed": {}, "genomes": {}}
+
+        # tasks executed in this run
+        self.n_of_completed = 0
+        self.n_of_skipped = 0
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def GetParameters(self, genome):
+        """Returns the segmentation parameters of a genome"""
+
+        parameters = dict(self.defaults)
+
+        for key in PARAMETERS:
+            if key in genome:
+                parameters[key] = genome[key]
+
+        return parameters
+
+    def GetOutputs(self, genome, chrom):
+        """Returns the output files of a chromosome"""
+
+        directory = os.path.join(self.output_dir, _safe_name(genome["name"]))
+
+        outputs = {
+            "isochores": os.path.join(
+                directory, "%s.isochores.csv" % (_safe_name(chrom)))}
+
+        if self.GetParameters(genome)["windows"]:
+            outputs["windows"] = os.path.join(
+                directory, "%s.windows.csv" % (_safe_name(chrom)))
+
+        return outputs
+
+    def LoadCheckpoint(self):
+        """Read the checkpoint file, if it exists"""
+
+        if os.path.exists(self.checkpoint_file):
+            with open(self.checkpoint_file) as handle:
+                self.checkpoint = json.load(handle)
+
+            # failed tasks will be tried again
+            self.checkpoint["failed"] = {}
+
+            logger.info(
+                "%s completed tasks read from %s" %
+                (len(self.checkpoint["completed"]), self.checkpoint_file))
+
+    def DumpCheckpoint(self):
+        """Write the checkpoint file"""
+
+        _write_atomic(
+            self.checkpoint_file,
+            lambda handle: json.dump(self.checkpoint, handle, indent=1))
+
+    def IsCompleted(self, genome, chrom):
+        """Returns True if a chromosome was segmented with the same parameters,
+        and its outputs exist"""
+
+        key = "%s/%s" % (genome["name"], chrom)
+        record = self.checkpoint["completed"].get(key)
+
+        if record is None:
+            return False
+
+        if record["parameters"] != self.GetParameters(genome):
+            return False
+
+        for filename in self.GetOutputs(genome, chrom).values():
+            if not os.path.exists(filename):
+                return False
+
+        return True
+
+    def _GetChromosomes(self, genome):
+        """Returns the chromosomes of a genome, if they are known"""
+
+        if "chromosomes" in genome:
+            return genome["chromosomes"]
+
+        return self.checkpoint["genomes"].get(genome["name"])
+
+    def _ReadGenome(self, genome, chromosomes, handled, queue):
+        """Read the FASTA file of a genome without storing it: each chromosome
+        is queued as soon as it's read, so reading overlaps with segmentation.
+        chromosomes are the ids to segment (None for all), handled the ids
+        already queued or completed (it's updated). Returns the ids of the
+        file"""
+
+        ids = []
+
+        for record, chunks in Streaming.StreamFastaFile(genome["fasta"]):
+            ids.append(record.id)
+
+            if chromosomes is not None and record.id not in chromosomes:
+                continue
+
+            if record.id in handled:
+                continue
+
+            if self.IsCompleted(genome, record.id):
+                self.n_of_skipped += 1
+                handled.add(record.id)
+                continue
+
+            for bases in chunks:
+                record.data += bases
+
+            # workers will read the sequence from a shared file
+            sequence = Utility.SharedSequence(record)
+            del(record)
+
+            # blocks if queue is full
+            queue.put(("task", genome, (sequence.id, sequence)))
+            handled.add(sequence.id)
+
+        return ids
+
+    def _ReadGenomes(self, queue):
+        """Read FASTA files and put chromosome tasks in queue. Executed by a
+        thread: the queue is bounded, so reading stops when too many
+        chromosomes are waiting"""
+
+        try:
+            for genome in self.genomes:
+                chromosomes = self._GetChromosomes(genome)
+
+                # a genome could be completed without reading its FASTA file
+                if chromosomes is not None and all(
+                        [self.IsCompleted(genome, chrom)
+                         for chrom in chromosomes]):
+                    logger.info("%s already completed" % (genome["name"]))
+                    self.n_of_skipped += len(chromosomes)
+                    continue
+
+                # the chromosomes already queued (or completed)
+                handled = set()
+                ids = None
+
+                for attempt in range(self.retries + 1):
+                    try:
+                        ids = self._ReadGenome(
+                            genome, chromosomes, handled, queue)
+                        break
+
+                    except IOError as message:
+                        logger.warning(
+                            "Cannot read %s (attempt %s): %s" %
+                            (genome["fasta"], attempt + 1, message))
+
+                if ids is None:
+                    queue.put(("error", genome["name"], "Cannot read %s" % (
+                        genome["fasta"])))
+                    continue
+
+                if chromosomes is None:
+                    chromosomes = ids
+
+                queue.put(("genome", genome, chromosomes))
+
+                # the chromosomes of manifest which are not in file
+                for chrom in chromosomes:
+                    if chrom in handled:
+                        continue
+
+                    if self.IsCompleted(genome, chrom):
+                        self.n_of_skipped += 1
+                        continue
+
+                    key = "%s/%s" % (genome["name"], chrom)
+                    queue.put(("error", key, "%s not found in %s" % (
+                        chrom, genome["fasta"])))
+
+        except Exception as message:
+            # Run can't wait for tasks which will never come
+            logger.exception("Cannot read genomes")
+            queue.put(("fatal", None, "Cannot read genomes: %s" % (message)))
+
+        finally:
+            # no more tasks
+            queue.put(None)
+
+    def Run(self):
+        """Segment all chromosomes of all genomes, skipping the completed
+        ones. Returns the number of failed tasks. Raise CampaignError if the
+        genomes can't be read anymore (completed tasks are in checkpoint)"""
+
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+
+        self.LoadCheckpoint()
+
+        for genome in self.genomes:
+            directory = os.path.join(
+                self.output_dir, _safe_name(genome["name"]))
+
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+
+        queue = Queue.Queue(maxsize=self.prefetch)
+
+        reader = threading.Thread(target=self._ReadGenomes, args=(queue, ))
+        reader.daemon = True
+        reader.start()
+
+        pool = multiprocessing.Pool(processes=self.processes)
+
+        # running tasks: key -> (async result, task, attempt)
+        pending = {}
+
+        start_time = time.time()
+
+        try:
+            while True:
+                # collect finished tasks before waiting for new ones
+                self._CollectResults(pool, pending, block=False)
+
+                # at most a task for each process, plus the prefetched ones
+                if len(pending) >= self.processes:
+                    self._CollectResults(pool, pending, block=True)
+                    continue
+
+                # don't block forever: finished tasks need to be recorded
+                try:
+                    item = queue.get(timeout=0.1)
+
+                except Queue.Empty:
+                    # the reader stopped without its last item
+                    if not reader.is_alive() and queue.empty():
+                        raise CampaignError("Genome reader stopped")
+
+                    continue
+
+                if item is None:
+                    break
+
+                kind, genome, value = item
+
+                if kind == "fatal":
+                    raise CampaignError(value)
+
+                # genome is the failed task key
+                if kind == "error":
+                    logger.error(value)
+                    self.checkpoint["failed"][genome] = value
+                    continue
+
+                if kind == "genome":
+                    self.checkpoint["genomes"][genome["name"]] = value
+                    continue
+
+                chrom, sequence = value
+                key = "%s/%s" % (genome["name"], chrom)
+
+                task = (key, chrom, sequence, self.GetParameters(genome),
+                        self.GetOutputs(genome, chrom))
+
+                pending[key] = (
+                    pool.apply_async(_segment_chromosome, (task, )), task, 0)
+
+            # waiting for the last tasks
+            while len(pending) > 0:
+                self._CollectResults(pool, pending, block=True)
+
+            pool.close()
+
+        except BaseException:
+            pool.terminate()
+            raise
+
+        finally:
+            pool.join()
+            self.DumpCheckpoint()
+
+        n_of_failed = len(self.checkpoint["failed"])
+
+        logger.info(
+            "%s tasks completed, %s skipped, %s failed in %.2f seconds" %
+            (self.n_of_completed, self.n_of_skipped, n_of_failed,
+             time.time() - start_time))
+
+        return n_of_failed
+
+    def _CollectResults(self, pool, pending, block=False):
+        """Record finished tasks in checkpoint, and submit again the failed
+        ones. If block is True, wait for at least a task"""
+
+        while True:
+            finished = [key for key, (result, task, attempt) in
+                        pending.items() if result.ready()]
+
+            if len(finished) > 0 or not block or len(pending) == 0:
+                break
+
+            # wait a little for the first task
+            pending.values()[0][0].wait(0.1)
+
+        for key in finished:
+            result, task, attempt = pending.pop(key)
+
+            try:
+                key, statistics = result.get()
+
+            except Exception as message:
+                if attempt < self.retries:
+                    logger.warning(
+                        "%s failed (attempt %s): %s. Trying again" %
+                        (key, attempt + 1, message))
+                    pending[key] = (
+                        pool.apply_async(_segment_chromosome, (task, )),
+                        task, attempt + 1)
+
+                else:
+                    logger.error("%s failed: %s" % (key, message))
+                    self.checkpoint["failed"][key] = str(message)
+                    self.DumpCheckpoint()
+
+                    # removing the shared sequence
+                    task[2].Close()
+
+                continue
+
+            task[2].Close()
+
+            statistics["parameters"] = task[3]
+            self.checkpoint["completed"][key] = statistics
+            self.n_of_completed += 1
+
+            logger.info(
+                "%s completed in %.2f seconds (%s isochores)" %
+                (key, statistics["elapsed"], statistics["n_of_isochores"]))
+
+            # the checkpoint is updated after each task
+            self.DumpCheckpoint()
@@ -41,13 +41,37 @@ import os
 import re
 import csv
 import sys
+import fnmatch
 import Bio
+import json
+import time
 import numpy
 import types
+import bisect
+import hashlib
 import logging
+import itertools
+import collections
+import multiprocessing
+import multiprocessing.pool
 import Bio.SeqUtils
+import Bio.SeqRecord
+
+# os.scandir is available since python 3.5, the scandir module is its backport.
+# Without both, directories are walked with os.listdir and os.stat
+try:
+    from os import scandir
+
+except ImportError:
+    try:
+        from scandir import scandir
+
+    except ImportError:
+        scandir = None
 
 from . import constants
+from . import Utility
+from . import Profiles
 
 __author__ = "Paolo Cozzi <paolo.cozzi@ptp.it>"
 
@@ -78,6 +102,22 @@ class FamilyError(Exception):
     pass
 
 
+class RegionsError(Exception):
+    pass
+
+
+class FamiliesIndexError(FamilyError):
+    pass
+
+
+class SettingsError(Exception):
+    pass
+
+
+class GCIndexError(Exception):
+    pass
+
+
 class Element:
     """A basic class for windows, gaps and isochores"""
 
@@ -153,10 +193,11 @@ class Window(Element):
         return "Window instance at %s : start:%s,end:%s,size:%s,GClevel:%.6f,Class:%s" % (
             hex(id(self)), self.start, self.end, self.size, self.GClevel, self.Class)
 
-    def SetGClevel(self, GClevel):
-        """To set GClevel and class for a window"""
+    def SetGClevel(self, GClevel, scheme=None):
+        """To set GClevel and class for a window. scheme is a ClassScheme
+        (default: constants.CLASS_TO_LEVEL)"""
         self.GClevel = GClevel
-        self.Class = CalcClass(GClevel)
+        self.Class = CalcClass(GClevel, scheme)
 
 # need to define a window class? (which doesn't contain values like
 # average GC, and so on)?
@@ -208,9 +249,10 @@ class Isochore():
         """return the number of windows in this isochore"""
         return len(self.GClevels)
 
-    def AddWindow(self, window):
+    def AddWindow(self, window, scheme=None):
         """Add a window to the current isochore. Windows must to be contiguous and
-        non overlapped"""
+        non overlapped. The class is evaluated with scheme (a ClassScheme,
+        default: constants.CLASS_TO_LEVEL)"""
 
         # Add only a instatiated Window Element
         if window.__class__ != Window or window.Class is None:
@@ -242,16 +284,17 @@ class Isochore():
 
         # The class may change when adding a window
         old_Class = self.Class
-        self.Class = CalcClass(self.avg_GClevel)
+        self.Class = CalcClass(self.avg_GClevel, scheme)
 
         if old_Class != self.Class:
             logger.warning(
                 "The Class changed between %s and %s for %s" %
                 (old_Class, self.Class, self))
 
-    def AddIsochore(self, isochore):
+    def AddIsochore(self, isochore, scheme=None):
         """Add and Isochore to the current one. Isochore must be contiguous and
-        non overlapped"""
+        non overlapped. The class is evaluated with scheme (a ClassScheme,
+        default: constants.CLASS_TO_LEVEL)"""
 
         # Add only a instatiated Isochore Element
         if isochore.__class__ != Isochore or isochore.Class is None:
@@ -284,7 +327,7 @@ class Isochore():
 
         # The class may change when adding and isochore:
         old_Class = self.Class
-        self.Class = CalcClass(self.avg_GClevel)
+        self.Class = CalcClass(self.avg_GClevel, scheme)
 
         # Pheraps this event isn't so significant
         if old_Class != self.Class:
@@ -318,15 +361,266 @@ class Gap(Element):
             hex(id(self)), self.start, self.end, self.size, self.Class)
 
 
+# A class to count G and C in any interval of a sequence. Counts are
+# accumulated in blocks, so only the bases at the edges of an interval need to
+# be counted
+
+
+class GCIndex:
+    """Cumulative G+C counts of a sequence in blocks of block_size bp. G, C
+    and S are counted in both cases, like Bio.SeqUtils.GC does. sequence
+    could be a string, a bytearray or a Utility.SharedSequence"""
+
+    def __init__(self, sequence, block_size=4096):
+
+        # a shared sequence is pickled by name, without its bases
+        self.shared = None
+
+        if isinstance(sequence, Utility.SharedSequence):
+            self.shared = sequence
+            sequence = sequence.data
+
+        # a read-only view of the sequence string, without copying it
+        self.sequence = numpy.frombuffer(sequence, dtype=numpy.uint8)
+        self.block_size = block_size
+        self.size = len(self.sequence)
+
+        # a lookup table for G+C bases
+        self.is_gc = numpy.zeros(256, dtype=numpy.bool_)
+
+        for base in "GCSgcs":
+            self.is_gc[ord(base)] = True
+
+        n_of_blocks = self.size // block_size
+        counts = numpy.zeros(n_of_blocks, dtype=numpy.int64)
+
+        # counting G+C in chunks of blocks, to limit memory usage
+        chunk = max(1, 2 ** 22 // block_size)
+
+        for i in range(0, n_of_blocks, chunk):
+            j = min(i + chunk, n_of_blocks)
+            bases = self.is_gc[
+                self.sequence[i * block_size:j * block_size]]
+            counts[i:j] = bases.reshape(j - i, block_size).sum(axis=1)
+
+        # blocks[i] is the G+C count of the first i blocks
+        self.blocks = numpy.zeros(n_of_blocks + 1, dtype=numpy.int64)
+        numpy.cumsum(counts, out=self.blocks[1:])
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__):
+            return (self.block_size == other.block_size and
+                    numpy.array_equal(self.sequence, other.sequence))
+        else:
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __getstate__(self):
+        """Don't pickle the bases of a shared sequence"""
+
+        state = self.__dict__.copy()
+
+        if self.shared is not None:
+            del(state["sequence"])
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+        if self.shared is not None:
+            self.sequence = numpy.frombuffer(
+                self.shared.data, dtype=numpy.uint8)
+
+    def _CountBases(self, start, end):
+        """Count G+C in a sequence slice"""
+
+        return int(numpy.count_nonzero(self.is_gc[self.sequence[start:end]]))
+
+    def Count(self, start, end):
+        """Returns the G+C count between start and end (python coordinates)"""
+
+        # the first and the last whole block inside the interval
+        first = -(-start // self.block_size)
+        last = end // self.block_size
+
+        if first >= last:
+            return self._CountBases(start, end)
+
+        return (int(self.blocks[last] - self.blocks[first]) +
+                self._CountBases(start, first * self.block_size) +
+                self._CountBases(last * self.block_size, end))
+
+    def GClevel(self, start, end):
+        """Returns the G+C percentage between start and end (python
+        coordinates), like Bio.SeqUtils.GC does"""
+
+        if end <= start:
+            return 0.0
+
+        return self.Count(start, end) * 100.0 / (end - start)
+
+    def _Prefixes(self, positions, chunk=256):
+        """Returns the G+C count before each position. The blocks of
+        positions are counted chunk blocks at a time"""
+
+        positions = numpy.asarray(positions, dtype=numpy.int64)
+
+        # positions outside the sequence have no prefix
+        if len(positions) > 0 and (
+                positions.min() < 0 or positions.max() > self.size):
+            raise GCIndexError(
+                "Positions must be between 0 and sequence length (%s)" %
+                (self.size))
+
+        blocks = positions // self.block_size
+        offsets = positions - blocks * self.block_size
+
+        prefixes = self.blocks[blocks]
+
+        # only the positions inside a block need its bases. The last bases
+        # of the sequence aren't in a whole block
+        inside = numpy.flatnonzero(offsets > 0)
+        n_of_blocks = len(self.blocks) - 1
+
+        whole = self.sequence[:n_of_blocks * self.block_size].reshape(
+            n_of_blocks, self.block_size)
+
+        for i in inside[blocks[inside] == n_of_blocks]:
+            prefixes[i] += self._CountBases(
+                n_of_blocks * self.block_size, positions[i])
+
+        inside = inside[blocks[inside] < n_of_blocks]
+        edges, rows = numpy.unique(blocks[inside], return_inverse=True)
+
+        for i in range(0, len(edges), chunk):
+            # the cumulative G+C counts inside each block of this chunk
+            counts = numpy.cumsum(
+                numpy.take(self.is_gc, whole[edges[i:i + chunk]]), axis=1,
+                dtype=numpy.int16)
+
+            selected = numpy.flatnonzero((rows >= i) & (rows < i + chunk))
+            prefixes[inside[selected]] += counts[
+                rows[selected] - i, offsets[inside[selected]] - 1]
+
+        return prefixes
+
+    def Counts(self, starts, ends):
+        """Returns the G+C counts between starts and ends (arrays of python
+        coordinates). Counts are calculated by numpy, without the GIL"""
+
+        starts = numpy.asarray(starts, dtype=numpy.int64)
+
+        # starts and ends share their blocks
+        prefixes = self._Prefixes(numpy.concatenate([starts, ends]))
+
+        return prefixes[len(starts):] - prefixes[:len(starts)]
+
+
+# Heavy stages work on sequence bytes with numpy kernels, which release the
+# GIL: chromosomes could be segmented by many threads of the same process
+
+# a lookup table for gap bases
+_is_n = numpy.zeros(256, dtype=numpy.bool_)
+
+for base in "Nn":
+    _is_n[ord(base)] = True
+
+
+def _find_runs(sequence, table, block_size=2 ** 22):
+    """Returns the starts and the ends of the runs of bases selected by table
+    (a boolean lookup table) in a sequence (a string or a buffer). The sequence
+    is read in blocks of block_size bp"""
+
+    if len(sequence) == 0:
+        return (numpy.zeros(0, dtype=numpy.int64),
+                numpy.zeros(0, dtype=numpy.int64))
+
+    # a read-only view of the sequence, without copying it
+    bases = numpy.frombuffer(sequence, dtype=numpy.uint8)
+
+    # the positions where runs start or end
+    bounds = []
+    previous = False
+
+    for i in range(0, len(bases), block_size):
+        selected = numpy.take(table, bases[i:i + block_size])
+
+        # a run could start at the first base of a block
+        if selected[0] != previous:
+            bounds.append(numpy.array([i], dtype=numpy.int64))
+
+        bounds.append(
+            numpy.flatnonzero(selected[1:] != selected[:-1]) + (i + 1))
+
+        previous = selected[-1]
+
+    # the last run ends with the sequence
+    if previous:
+        bounds.append(numpy.array([len(bases)], dtype=numpy.int64))
+
+    bounds = numpy.concatenate(bounds).astype(numpy.int64)
+
+    return bounds[0::2], bounds[1::2]
+
+
+def _window_bounds(gaps, window_size, From, To):
+    """Returns the windows between From and To, as (starts, ends) arrays for
+    each stretch of sequence between gaps, and the gaps resized to From and
+    To, in sequence order. gaps are the gaps bigger than gap tolerance, sorted
+    by position. Windows restart after each gap, and the last window of a
+    stretch ends at the next gap"""
+
+    elements = []
+
+    if From >= To:
+        return elements
+
+    # windows start from the start of each stretch
+    position = From
+
+    for gap in gaps:
+        if gap.start >= To:
+            break
+
+        # gaps before From don't affect windows
+        if gap.end <= position:
+            continue
+
+        if gap.start > position:
+            starts = numpy.arange(
+                position, gap.start, window_size, dtype=numpy.int64)
+            elements.append((starts, numpy.minimum(
+                starts + window_size, gap.start)))
+
+        elements.append(Gap(start=max(gap.start, From), end=min(gap.end, To)))
+        position = gap.end
+
+    if position < To:
+        starts = numpy.arange(position, To, window_size, dtype=numpy.int64)
+        elements.append((starts, numpy.minimum(starts + window_size, To)))
+
+    return elements
+
+# The sequences a Chromosome could work on, and the ones with their bases in a
+# data buffer
+_buffer_types = (Utility.SharedSequence, Utility.FastaRecord)
+_sequence_types = (Bio.SeqRecord.SeqRecord, ) + _buffer_types
+
+
 # A generic chromosome Class
 class Chromosome:
     """A class to deal with chromosomes. This class need a Bio.Seq object to
     work on Gaps, Windows and Isochores. It is better to pass a SeqRecord
     object at the time of Chromosome instantiation, in order to set useful
-    values and scan for gaps presence over the sequence."""
+    values and scan for gaps presence over the sequence. settings are the
+    default parameters of windows and isochores (GClib.constants if None)"""
 
-    def __init__(self, seqRecord=None):
+    def __init__(self, seqRecord=None, settings=None):
         self.seqRecord = seqRecord
+        self.settings = settings
         self.gaps = []
         self.GClevel = 0
         self.name = None
@@ -334,8 +628,18 @@ class Chromosome:
         self.isochores = []
         self.windows = []
 
-        # check seqRecord value
-        if isinstance(self.seqRecord, Bio.SeqRecord.SeqRecord):
+        # G+C counts, calculated when windows are evaluated
+        self.gc_index = None
+
+        # k-mer counts, calculated when profiles are dumped
+        self.kmer_index = None
+
+        # how many isochores were joined by the last FindIsochores
+        self.n_of_merges = 0
+
+        # check seqRecord value (a SharedSequence or a FastaRecord could be
+        # used too)
+        if isinstance(self.seqRecord, _sequence_types):
             # apply functions
             self.Scan4Gaps()
             self.name = seqRecord.name
@@ -364,22 +668,67 @@ class Chromosome:
         else:
             return False
 
+    def GetSettings(self):
+        """Returns the Settings of this chromosome, or the Settings of
+        GClib.constants"""
+
+        return GetSettings(self.settings)
+
     def WholeGCcontent(self):
         """Calculate the GC counter for the whole chromosome"""
 
-        if not isinstance(self.seqRecord, Bio.SeqRecord.SeqRecord):
+        if not isinstance(self.seqRecord, _sequence_types):
             raise ChromosomeError(
                 "I can calculate the whole GClevel only for a Bio.SeqRecord.SeqRecord object!")
 
+        # a sequence buffer is counted with the G+C index
+        if isinstance(self.seqRecord, _buffer_types):
+            self.BuildGCIndex()
+            return self.gc_index.GClevel(0, len(self.seqRecord))
+
         return Bio.SeqUtils.GC(self.seqRecord.seq)
 
+    def GetSequence(self):
+        """Returns the sequence as a string, or as its buffer for a
+        Utility.SharedSequence or a Utility.FastaRecord"""
+
+        if isinstance(self.seqRecord, _buffer_types):
+            return self.seqRecord.data
+
+        return str(self.seqRecord.seq)
+
+    def BuildGCIndex(self):
+        """Calculate the G+C counts of the sequence, if they are not
+        calculated yet"""
+
+        if self.gc_index is None or self.gc_index.size != len(self.seqRecord):
+            if isinstance(self.seqRecord, Utility.SharedSequence):
+                self.gc_index = GCIndex(self.seqRecord)
+
+            else:
+                self.gc_index = GCIndex(self.GetSequence())
+
+    def BuildKmerIndex(self, k_values=(1, 2, 3)):
+        """Calculate the k-mer counts of the sequence (see Profiles.KmerIndex),
+        if they are not calculated yet for each k of k_values"""
+
+        if self.seqRecord is None:
+            raise ChromosomeError(
+                "I need a sequence to calculate k-mer profiles")
+
+        if (self.kmer_index is None or
+                self.kmer_index.size != len(self.seqRecord) or
+                not set(k_values) <= set(self.kmer_index.k_values)):
+            self.kmer_index = Profiles.KmerIndex(
+                self.GetSequence(), k_values=k_values)
+
     def Scan4Gaps(self):
         """Scan sequence in order to find Gaps"""
 
-        if not isinstance(self.seqRecord, Bio.SeqRecord.SeqRecord):
+        if not isinstance(self.seqRecord, _sequence_types):
             raise ChromosomeError(
-                "I can search for gaps only on Bio.SeqRecord.SeqRecord"
-                " object!")
+                "I can search for gaps only on Bio.SeqRecord.SeqRecord,"
+                " Utility.SharedSequence or Utility.FastaRecord object!")
 
         logger.debug("Starting GAPs calculation")
 
@@ -389,32 +738,36 @@ class Chromosome:
         # handle deprecated method seq.tostring from biopython release 1.64
         seq_str = None
 
-        if Bio.__version__ > 1.64:
+        if isinstance(self.seqRecord, _buffer_types):
+            seq_str = self.seqRecord.data
+
+        elif Bio.__version__ > 1.64:
             seq_str = str(self.seqRecord.seq)
 
         else:
             seq_str = self.seqRecord.seq.tostring()
 
-        # A very quick method to find gaps on chromosome.
-        for match in re.finditer("N+", seq_str, flags=re.IGNORECASE):
-            logger.debug(
-                "Gap found from %s to %s" %
-                (match.start(), match.end()))
+        # N runs are found by numpy, without the GIL
+        starts, ends = _find_runs(seq_str, _is_n)
+
+        for start, end in itertools.izip(starts.tolist(), ends.tolist()):
+            logger.debug("Gap found from %s to %s" % (start, end))
 
             # Adding this gap to the gaps list
-            gaps += [Gap(start=match.start(), end=match.end())]
+            gaps += [Gap(start=start, end=end)]
 
         self.gaps = gaps
 
         logger.debug("GAPs calculation finished")
 
     def ValueWindows(self, window_size=None, From=None,
-                     To=None, gap_tolerance=None):
+                     To=None, gap_tolerance=None, processes=1):
         """Segments the sequence in non-overlapping windows of fixed size, and
-        calculate the GC countent on each window"""
+        calculate the GC countent on each window. With processes > 1, the
+        sequence is split in chunks evaluated by a pool of processes"""
 
         # No window divisions if there is no sequence
-        if not isinstance(self.seqRecord, Bio.SeqRecord.SeqRecord):
+        if not isinstance(self.seqRecord, _sequence_types):
             raise ChromosomeError(
                 "The seqRecord class attribute must be instantiated with a "
                 "valid Bio.Seqrecord object in order to divide sequence in "
@@ -429,18 +782,20 @@ class Chromosome:
         if self.size != len(self.seqRecord):
             self.size = len(self.seqRecord)
 
+        settings = self.GetSettings()
+
         if window_size is None:
             logger.info(
                 "No window size provided. Setting the default value to %s bp" %
-                (constants.WINDOW_SIZE))
-            window_size = constants.WINDOW_SIZE
+                (settings.window_size))
+            window_size = settings.window_size
 
         # Setting gap tolerance if not provided
         if gap_tolerance is None:
             logger.info(
                 "No gap tolerance provided. Setting the default value to "
-                "%s bp" % (constants.GAP_TOLERANCE))
-            gap_tolerance = constants.GAP_TOLERANCE
+                "%s bp" % (settings.gap_tolerance))
+            gap_tolerance = settings.gap_tolerance
 
         # The user may want to analize sequence between two coordinates.
         # Otherwise I will set the default values
@@ -451,6 +806,9 @@ class Chromosome:
         if To is None:
             To = self.size
 
+        # windows can't end after the sequence
+        To = min(To, self.size)
+
         # It makes no sense to start segmenting genome with an higher position
         # than sequence length
         if From >= self.size:
@@ -465,173 +823,137 @@ class Chromosome:
         # resetting self.windows if any
         self.windows = []
 
-        # get a seq object
-        seqObj = self.seqRecord.seq
+        # G+C counts are calculated once, and used for every window
+        self.BuildGCIndex()
 
-        # cicling over the sequence
-        start = From
+        # Only gaps bigger than gap tolerance, and which overlap user
+        # coordinates, can affect windows
+        gaps = [gap for gap in self.gaps if gap.size > gap_tolerance and
+                gap.end > From and gap.start <= To]
 
-        while start < To:
-            # determining end coordinates
-            end = start + window_size
+        # windows don't depend on chunks: each chunk starts after a gap or
+        # at the start of a window
+        if processes == 1:
+            self.windows = self._WindowsRange(gaps, window_size, From, To)
 
-            # I cannot take a end coordinate higher than sequence length, or
-            # user final coordinate
-            if end > To:
-                end = To
+        else:
+            self.windows = self._ParallelWindows(
+                gaps, window_size, From, To, processes)
 
-            # Debug
-            logger.debug(
-                "Evaluation of window (start:%s, end:%s, size:%s)" %
-                (start, end, end - start))
-
-            # cheching gap presence in windows
-            for gap in self.gaps:
-                if gap.size <= gap_tolerance:
-                    # I can ignore this gap
-                    continue
-
-                # Case 1: Start is inside a GAP
-                if start >= gap.start and start < gap.end:
-                    # defin a new gap istance with this position. It will be
-                    # useful when modifing coordinates by user limits
-                    new_gap = Gap(start=gap.start, end=gap.end)
-
-                    # Ensure that if the user started from a different
-                    # position, Gap will start with the same positions
-                    if new_gap.start < From:
-                        logger.debug(
-                            "Resizing %s to user start:%s coordinates" %
-                            (new_gap, From))
-                        # Start the gap from the same user positions
-                        new_gap.SetSize(From, new_gap.end)
-
-                    # Maybe the user want to terminate windows calculations
-                    # before gap ending
-                    if new_gap.end > To:
-                        logger.debug(
-                            "Resizing %s to user end:%s coordinates" %
-                            (new_gap, To))
-                        new_gap.SetSize(new_gap.start, To)
-
-                        # This assignments will interrupt the while cicle
-                        start = To
-                        end = To
-
-                        # Adding this gap to window list before break the cicle
-                        self.windows += [new_gap]
-
-                        # Breaking the cicle
-                        break
-
-                    # resizing start and end. The end gap coordinate is excluded (python behavior)
-                    # Ensure if the user ended to a determined position, Gap
-                    # will end with the same position
-                    new_start = new_gap.end
-                    new_end = new_start + window_size
-
-                    # I cannot take a end coordinate higher than sequence
-                    # length, or user To coordinates
-                    if new_end > To:
-                        new_end = To
-
-                    # debug
-                    logger.debug(
-                        "Case 1: %s found in this window (start:%s,end:%s,size:%s). Setting window to (start:%s,end:%s,size:%s)" %
-                        (gap, start, end, end - start, new_start, new_end, new_end - new_start))
-
-                    # add this gap to windows list
-                    self.windows += [new_gap]
-
-                    # Updating the windows coordinates
-                    start = new_start
-                    end = new_end
-
-                # Case 2: End is inside a GAP
-                if end >= gap.start and end < gap.end:
-                    # resize window in order to avoid the next gap
-                    new_end = gap.start
-
-                    # debug
-                    logger.debug(
-                        "Case 2: %s found in this window (start:%s,end:%s,size:%s). Setting window end to %s (start:%s,end:%s,size:%s)" %
-                        (gap, start, end, end - start, new_end, start, new_end, new_end - start))
-
-                    # Updating windows coordinates
-                    end = new_end
-
-                # Case 3: A gap inside a window
-                if start < gap.start and end >= gap.end:
-                    # resize window in order to avoid the next gap
-                    new_end = gap.start
-
-                    # debug
-                    logger.debug(
-                        "Case 3: %s found in this window (start:%s,end:%s,size:%s). Setting window end to %s (start:%s,end:%s,size:%s)" %
-                        (gap, start, end, end - start, new_end, start, new_end, new_end - start))
-
-                    # Updating windows coordinates
-                    end = new_end
-
-            # In case of sequence terminate with gaps, GAP Case1 will be called, start will be gap.end and end will be equal to To, since end = start+window_size cannot be higher than to.
-            # However it makes no sense to calculate a window with 0 length,
-            # because sequence is terminated
-            if start == end:
-                logger.debug("Windows calculation finished")
-                break
+    def _WindowsRange(self, gaps, window_size, From, To):
+        """Returns the windows (and gaps) between From and To. gaps are the
+        gaps bigger than gap tolerance. Window bounds and G+C counts are
+        calculated by numpy, without the GIL"""
 
-            # calculate the GClevel of this windows
-            GClevel = Bio.SeqUtils.GC(seqObj[start:end])
+        elements = _window_bounds(gaps, window_size, From, To)
 
-            # Round GClevel to first 6 decimal digits
-            GClevel = round(GClevel, 6)
+        # the G+C counts of all windows at once
+        bounds = [element for element in elements
+                  if not isinstance(element, Gap)]
 
-            # Instantiate a new window
-            new_window = Window(start=start, end=end, GClevel=GClevel)
+        if len(bounds) > 0:
+            starts = numpy.concatenate([element[0] for element in bounds])
+            ends = numpy.concatenate([element[1] for element in bounds])
 
-            # debug
-            logger.debug("New %s defined" % (new_window))
+            # like GCIndex.GClevel
+            GClevels = iter((self.gc_index.Counts(starts, ends) * 100.0 /
+                             (ends - starts)).tolist())
+
+        windows = []
+
+        for element in elements:
+            if isinstance(element, Gap):
+                windows += [element]
+                continue
+
+            for start, end in itertools.izip(
+                    element[0].tolist(), element[1].tolist()):
+                # Round GClevel to first 6 decimal digits. Classes are
+                # assigned to all windows at once
+                new_window = Window(start=start, end=end)
+                new_window.GClevel = round(next(GClevels), 6)
+
+                # add this windows to the windows list
+                windows += [new_window]
+
+        ClassifyWindows(windows, self.GetSettings().GetClassScheme())
+
+        # debug
+        if logger.isEnabledFor(logging.DEBUG):
+            for window in windows:
+                logger.debug("New %s defined" % (window))
+
+        return windows
+
+    def _ParallelWindows(self, gaps, window_size, From, To, processes):
+        """Evaluate windows in chunks, with a pool of processes. Workers read
+        G+C counts from the forked process memory"""
+
+        global _windows_chromosome
+
+        # more chunks than processes, to balance the load
+        bounds = _window_chunks(
+            gaps, window_size, From, To, processes * 4)
+
+        tasks = [(gaps, window_size, chunk_from, chunk_to)
+                 for chunk_from, chunk_to in zip(bounds[:-1], bounds[1:])]
+
+        logger.debug("%s chunks of windows" % (len(tasks)))
+
+        windows = []
+
+        _windows_chromosome = self
+
+        try:
+            pool = multiprocessing.Pool(processes=processes)
 
-            # add this windows to the windows list
-            self.windows += [new_window]
+            try:
+                # chunks are returned in order
+                for chunk in pool.imap(_windows_chunk, tasks):
+                    windows += chunk
 
-            # update start coordinate for next step
-            start = end
+                pool.close()
 
-    def FindIsochores(self):
+            except BaseException:
+                pool.terminate()
+                raise
+
+            finally:
+                pool.join()
+
+        finally:
+            _windows_chromosome = None
+
+        return windows
+
+    def FindIsochores(self, min_size=None):
         """A function for calculating isochores for this chromosome. Windows must be
-        calculated to call this function (call ValueWindows())"""
+        calculated to call this function (call ValueWindows()). min_size is the
+        minimum number of windows of an isochore (default: the min_size of
+        chromosome settings)"""
 
         if self.windows == []:
             raise ChromosomeError(
                 "Windows must be calculated to call this function")
 
+        settings = self.GetSettings()
+        scheme = settings.GetClassScheme()
+
+        if min_size is None:
+            min_size = settings.min_size
+
         # The isochore calculation is performed in three step. In the first one, we put
         # in the same isochore all adjacent windows with the same class.
         # Resetting isochores if any
         self.isochores = []
+        self.n_of_merges = 0
 
         # processing all windows
         logger.debug("Starting isochores calculation")
         logger.debug("Isochores calculations. Step (1)...")
 
         for window in self.windows:
-            logger.debug("Current %s" % (window))
-            if window.Class == "gap":
-                # in this Case, i will add a new element
-                self.isochores += [window]
-                logger.debug("%s added to isochore list" % (window))
-
-            # Add a window to an isochore if I have already seen a window
-            elif len(self.isochores) > 0 and window.Class == self.isochores[-1].Class:
-                logger.debug(
-                    "Adding %s to %s" % (window, self.isochores[-1]))
-                self.isochores[-1].AddWindow(window)
-                logger.debug("%s updated" % (self.isochores[-1]))
-
-            else:
-                self.isochores += [Isochore(window=window)]
-                logger.debug("New %s defined" % (self.isochores[-1]))
+            _add_window(self.isochores, window, scheme)
 
         # Merge isocore below a certain limit (1 window)
         # TODO: define a parameter for a minimun size of an isochore
@@ -642,31 +964,10 @@ class Chromosome:
 
         # Now I can cicle in order to remove isochores shorter that
         # ISO_MIN_SIZE dimension
-        for min_length in range(1, constants.ISO_MIN_SIZE):
-            # Updating step number
-            step = (min_length - 1) * 2 + 2
-
-            # Starting even step step
-            logger.debug("Starting Step (%s)..." % (step))
-
-            # filtering short isochores
-            self.__filter_isochores(min_length=min_length)
-
-            logger.debug("Step (%s) completed." % (step))
-
-            # HINT: decomment this line to draw back isochore after even step
-            # return
-
-            # Updating step number
-            step = (min_length - 1) * 2 + 3
-
-            logger.debug("Starting Step (%s)..." % (step))
-
-            self.__merge_isochores()
-
-            logger.debug("Step (%s) completed." % (step))
+        self.n_of_merges = _reduce_isochores(
+            self.isochores, min_size, scheme=scheme)
 
-        # Now isochores have at least constants.ISO_MIN_SIZE dimension
+        # Now isochores have at least min_size dimension
 
         # Print out each isochore instantiation, like windows and gaps
         for isochore in self.isochores:
@@ -674,135 +975,6 @@ class Chromosome:
 
         logger.debug("Isochores calculation finished")
 
-    def __filter_isochores(self, min_length=1):
-        # Now we can merge isochore under a certain size. Since we are modifing
-        # the isochore list by removing indexes, it is safer to procede by
-        # reversing array. To obtain the -2 value, I have to consider
-        # len(isochores) -2 because the length of an array is +1
-        # higher than the last index
-        for i in range(len(self.isochores) - 2, 1, -1):
-            if self.isochores[i].Class == "gap" or len(
-                    self.isochores[i]) > min_length:
-                logger.debug("Ignoring %s" % (self.isochores[i]))
-                continue
-
-            else:
-                # debug
-                logger.debug("Cicle %s. Considering %s:%s, %s:%s and %s:%s" % (
-                    i, i, self.isochores[i], i - 1, self.isochores[i - 1], i + 1, self.isochores[i + 1]))
-
-                # Three test in order to evaluate the most reliable isochore.
-                T1 = None
-                T2 = None
-                T3 = None
-
-                # T1: adding this isochore to the next. Mind the gaps
-                if self.isochores[i + 1].Class != "gap":
-                    T1 = self.isochores[i].TestHypoSTD(self.isochores[i + 1])
-
-                # T2: adding this isochore to the previous one
-                if self.isochores[i - 1].Class != "gap":
-                    T2 = self.isochores[i].TestHypoSTD(self.isochores[i - 1])
-
-                # T3: adding this isochore to the previous and the next one
-                if (self.isochores[i + 1].Class != "gap" and
-                        self.isochores[i - 1].Class != "gap"):
-                    T3 = self.isochores[i].TestHypoSTD(
-                        self.isochores[i + 1], self.isochores[i - 1])
-
-                # Sorting the three test
-                T = dict(T1=T1, T2=T2, T3=T3)
-                T = sorted(T.items(), key=lambda x: x[1])
-
-                # debug
-                logger.debug("Sorted test STDDEV %s" % (T))
-
-                # getting the first element != None
-                for case, value in T:
-                    if value is not None:
-                        if case == "T1":
-                            logger.debug(
-                                "%s hypothesis selected. Adding %s to %s" %
-                                (case, i, i + 1))
-                            self.isochores[i].AddIsochore(
-                                self.isochores[i + 1])
-
-                            # deleting i+1
-                            del(self.isochores[i + 1])
-
-                        elif case == "T2":
-                            logger.debug(
-                                "%s hypothesis selected. Adding isochore %s to %s" %
-                                (case, i - 1, i))
-                            self.isochores[i -
-                                           1].AddIsochore(self.isochores[i])
-
-                            # deleting i
-                            del(self.isochores[i])
-
-                        else:
-                            # case T3
-                            logger.debug(
-                                "%s hypothesis selected. Adding isochore %s to %s and %s" %
-                                (case, i - 1, i, i + 1))
-                            self.isochores[i -
-                                           1].AddIsochore(self.isochores[i])
-                            self.isochores[i -
-                                           1].AddIsochore(self.isochores[i + 1])
-
-                            # deleting i+1
-                            del(self.isochores[i + 1])
-
-                            # deleting i
-                            del(self.isochores[i])
-
-                        # Last
-                        break
-
-                # Finding the better case
-
-            # debug
-            # break
-
-    def __merge_isochores(self):
-        """Merge two isochores with the same class"""
-
-        # Now we could two distinct isochore with the same class, and we want
-        # to merge them
-        for i in range(len(self.isochores) - 2, -1, -1):
-            # debug
-            logger.debug("Evaluating %s and %s" %
-                         (self.isochores[i], self.isochores[i + 1]))
-
-            if self.isochores[i].Class == self.isochores[i + 1].Class:
-                # debug
-                logger.debug("Merging %s to %s" %
-                             (self.isochores[i], self.isochores[i + 1]))
-
-                # cathing the old class
-                old_Class = self.isochores[i].Class
-
-                # merge the isochores
-                self.isochores[i].AddIsochore(self.isochores[i + 1])
-
-                # deleting i+1
-                del(self.isochores[i + 1])
-
-                # debug
-                logger.debug("%s updated" % (self.isochores[i]))
-
-                # May the class change?
-                if self.isochores[i].Class != old_Class:
-                    logger.error(
-                        "The class has changed for %s" %
-                        (self.isochores[i]))
-                    # at this moment, I want to see this event
-                    raise ChromosomeError(
-                        "The class has changed for %s" %
-                        (self.isochores[i]))
-
-            # cicle i
-
     def _handle_output(self, outfile):
         """This function open a file for writing if necessary"""
 
@@ -824,7 +996,8 @@ class Chromosome:
             # I have to close this file once I've finished
             flag_close = True
 
-        elif not isinstance(outfile, types.FileType):
+        # any file-like object could be used (ie StringIO)
+        elif not hasattr(outfile, "write"):
             raise ChromosomeError(
                 "I don't know ho to handle %s : %s" %
                 (outfile, type(outfile)))
@@ -915,26 +1088,10 @@ class Chromosome:
 
         # Here, I must have an open file type
         csv_writer = csv.writer(outfile, lineterminator="\n")
-        csv_writer.writerow(["Start", "End", "Size", "Class", "GClevel"])
+        csv_writer.writerow(WINDOWS_HEADER)
 
         for window in self.windows:
-            # mind the gap element
-            if window.Class == "gap":
-                csv_writer.writerow(
-                    [window.start + 1,
-                     window.end,
-                     window.size,
-                     window.Class,
-                     None])
-
-            else:
-                csv_writer.writerow(
-                        [window.start + 1,
-                         window.end,
-                         window.size,
-                         window.Class,
-                         "%.6f" % (window.GClevel)])
-
+            csv_writer.writerow(_window_row(window))
             outfile.flush()
 
         # closing file if necessary
@@ -995,40 +1152,10 @@ class Chromosome:
 
         # Here, I must have an open file type
         csv_writer = csv.writer(outfile, lineterminator="\n")
-        csv_writer.writerow(
-            ["Start", "End", "Size", "Class", "AVG_GClevel", "STDDEV_GClevel"])
+        csv_writer.writerow(ISOCHORES_HEADER)
 
         for isochore in self.isochores:
-            # mind the gap element. Coordinates are 1-based
-            if isochore.Class == "gap":
-                csv_writer.writerow(
-                    [isochore.start + 1,
-                     isochore.end,
-                     isochore.size,
-                     isochore.Class,
-                     None,
-                     None])
-
-            else:
-                # If isochore is composed by one element, its stddev will be
-                # None
-                if len(isochore) > 1:
-                    csv_writer.writerow(
-                            [isochore.start + 1,
-                             isochore.end,
-                             isochore.size,
-                             isochore.Class,
-                             "%.6f" % (isochore.avg_GClevel),
-                             "%.6f" % (isochore.stddev_GClevel)])
-
-                else:
-                    csv_writer.writerow([isochore.start + 1,
-                                         isochore.end,
-                                         isochore.size,
-                                         isochore.Class,
-                                         "%.6f" % (isochore.avg_GClevel),
-                                         None])
-
+            csv_writer.writerow(_isochore_row(isochore))
             outfile.flush()
 
         # closing file if necessary
@@ -1038,6 +1165,78 @@ class Chromosome:
                 "Isochores CSV file written in %s" %
                 (filename))
 
+    def DumpProfiles(self, outfile=sys.stdout, k_values=(2, 3),
+                     isochores=False):
+        """Dumps windows (or isochores) data in CSV, with the frequencies of
+        their k-mers for each k of k_values (dinucleotides and trinucleotides
+        by default) and their CpG observed/expected ratio. The output could be
+        an open file handle or a filename to write on. Coordinates are 1
+        based"""
+
+        if isochores is True:
+            elements, header, row = (
+                self.isochores, ISOCHORES_HEADER, _isochore_row)
+
+            if elements == []:
+                raise ChromosomeError(
+                    "Isochores must be calculated to call this function")
+
+        else:
+            elements, header, row = self.windows, WINDOWS_HEADER, _window_row
+
+            if elements == []:
+                raise ChromosomeError(
+                    "Windows must be calculated with ValueWindows "
+                    "to call this function")
+
+        # bases and dinucleotides are needed by CpG ratio
+        k_values = tuple(sorted(set(k_values)))
+        self.BuildKmerIndex(sorted(set((1, 2) + k_values)))
+
+        # k-mers counts are calculated for all elements at once. Gaps have no
+        # profile
+        selected = [element for element in elements if element.Class != "gap"]
+        starts = [element.start for element in selected]
+        ends = [element.end for element in selected]
+
+        frequencies = [
+            Profiles.Frequencies(self.kmer_index.Counts(starts, ends, k))
+            for k in k_values]
+
+        ratios = Profiles.CpGRatio(
+            self.kmer_index.Counts(starts, ends, 1),
+            self.kmer_index.Counts(starts, ends, 2))
+
+        # the columns of each element
+        columns = {}
+
+        for i, element in enumerate(selected):
+            values = numpy.concatenate(
+                [profile[i] for profile in frequencies] + [ratios[i:i + 1]])
+            columns[id(element)] = [
+                None if numpy.isnan(value) else "%.6f" % (value)
+                for value in values]
+
+        kmers = [kmer for k in k_values for kmer in Profiles.Kmers(k)]
+        empty = [None] * (len(kmers) + 1)
+
+        # Assuming to work with a open filehandle
+        filename, outfile, flag_close = self._handle_output(outfile)
+
+        # Here, I must have an open file type
+        csv_writer = csv.writer(outfile, lineterminator="\n")
+        csv_writer.writerow(header + kmers + ["CpG_OE"])
+
+        for element in elements:
+            csv_writer.writerow(
+                row(element) + columns.get(id(element), empty))
+            outfile.flush()
+
+        # closing file if necessary
+        if flag_close is True:
+            outfile.close()
+            logger.info("Profiles CSV file written in %s" % (filename))
+
     def LoadIsochores(self, infile):
         """Load isochores from file into chromosome istance. Filename or open
         file handle are accepted"""
@@ -1192,85 +1391,725 @@ class Chromosome:
 
 # end of class Chromosome
 
-# This class will scan files with a pattern in a user defined directory,
-# in order to read isochores and memorize sizes and GClevels in a dictionary
+# Functions to format windows and isochores as CSV rows. Coordinates are
+# 1-based
 
 
-class Families:
-    """A class to find isochore familes"""
+def _add_window(isochores, window, scheme=None):
+    """Add a window to a list of isochores, like the step (1) of
+    Chromosome.FindIsochores: adjacent windows with the same class are put in
+    the same isochore. scheme is the ClassScheme of isochores"""
 
-    def __init__(self):
+    logger.debug("Current %s" % (window))
 
-        # This will be the list for files to search for
-        self.files = []
-        self.n_of_files = None
+    if window.Class == "gap":
+        # in this Case, i will add a new element
+        isochores += [window]
+        logger.debug("%s added to isochore list" % (window))
 
-        # all other useful attribute
-        self.n_of_bins = None
+    # Add a window to an isochore if I have already seen a window
+    elif len(isochores) > 0 and window.Class == isochores[-1].Class:
+        logger.debug(
+            "Adding %s to %s" % (window, isochores[-1]))
+        isochores[-1].AddWindow(window, scheme)
+        logger.debug("%s updated" % (isochores[-1]))
 
-        # all bins will be put here
-        self.data = {}
-        self.max_value = None
-        self.min_value = None
-        self.precision = None
-        self.bin_size = None
-        self.bins = None
+    else:
+        isochores += [Isochore(window=window)]
+        logger.debug("New %s defined" % (isochores[-1]))
 
-    def __str__(self):
-        """A method useful for debugging"""
 
-        myclass = str(self.__class__)
-        myattributes = self.__dict__
+def _reduce_isochores(isochores, min_size, first=2, scheme=None):
+    """Remove isochores shorter than min_size windows, like the steps after
+    (1) of Chromosome.FindIsochores. Isochores before first are never
+    filtered. scheme is the ClassScheme of isochores. Returns the number of
+    joined isochores"""
 
-        # the returned string
-        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+    n_of_merges = 0
 
-        for key, value in myattributes.iteritems():
-            message += "\t%s -> %s\n" % (key, value)
+    for min_length in range(1, min_size):
+        # Updating step number
+        step = (min_length - 1) * 2 + 2
 
-        return message
+        # Starting even step step
+        logger.debug("Starting Step (%s)..." % (step))
 
-    def __repr__(self):
-        return self.__str__()
+        # filtering short isochores
+        n_of_merges += _filter_isochores(
+            isochores, min_length=min_length, first=first, scheme=scheme)
 
-    def Scan4Files(self, directory, pattern="*"):
-        """Scan a user directory in order to find isochores or window files
-        specified by user defined pattern"""
+        logger.debug("Step (%s) completed." % (step))
 
-        if not os.path.isdir(directory):
-            raise FamilyError("%s seems not to be a directory!" % (directory))
+        # HINT: decomment this line to draw back isochore after even step
+        # return
 
-        # reset the file list
-        self.files = []
+        # Updating step number
+        step = (min_length - 1) * 2 + 3
 
-        # determine all files in a directory
-        all_files = os.listdir(directory)
+        logger.debug("Starting Step (%s)..." % (step))
 
-        # Now search for file with pattern
-        for myfile in all_files:
-            if re.search(pattern, myfile):
-                self.files += [myfile]
+        n_of_merges += _merge_isochores(isochores, scheme)
 
-        # determine the realtive path for each file
-        self.files = [os.path.join(directory, myfile) for myfile in self.files]
-        self.n_of_files = len(self.files)
+        logger.debug("Step (%s) completed." % (step))
 
-        # Maybe if I found no files I have to throw an Exception. For the
-        # moment, I print an Error log with 0 priority
-        if self.n_of_files == 0:
-            logger.error(
-                "No files found for pattern '%s' in '%s' directory" %
+    return n_of_merges
+
+
+def _filter_isochores(isochores, min_length=1, first=2, scheme=None):
+    """Join isochores not longer than min_length windows to the most similar
+    neighbours. Gaps are never joined, and isochores before first are never
+    filtered. scheme is the ClassScheme of isochores. Returns the number of
+    joined isochores"""
+
+    n_of_merges = 0
+
+    # Now we can merge isochore under a certain size. Since we are modifing
+    # the isochore list by removing indexes, it is safer to procede by
+    # reversing array. To obtain the -2 value, I have to consider
+    # len(isochores) -2 because the length of an array is +1
+    # higher than the last index
+    for i in range(len(isochores) - 2, first - 1, -1):
+        if isochores[i].Class == "gap" or len(
+                isochores[i]) > min_length:
+            logger.debug("Ignoring %s" % (isochores[i]))
+            continue
+
+        else:
+            # debug
+            logger.debug("Cicle %s. Considering %s:%s, %s:%s and %s:%s" % (
+                i, i, isochores[i], i - 1, isochores[i - 1], i + 1, isochores[i + 1]))
+
+            # Three test in order to evaluate the most reliable isochore.
+            T1 = None
+            T2 = None
+            T3 = None
+
+            # T1: adding this isochore to the next. Mind the gaps
+            if isochores[i + 1].Class != "gap":
+                T1 = isochores[i].TestHypoSTD(isochores[i + 1])
+
+            # T2: adding this isochore to the previous one
+            if isochores[i - 1].Class != "gap":
+                T2 = isochores[i].TestHypoSTD(isochores[i - 1])
+
+            # T3: adding this isochore to the previous and the next one
+            if (isochores[i + 1].Class != "gap" and
+                    isochores[i - 1].Class != "gap"):
+                T3 = isochores[i].TestHypoSTD(
+                    isochores[i + 1], isochores[i - 1])
+
+            # Sorting the three test
+            T = dict(T1=T1, T2=T2, T3=T3)
+            T = sorted(T.items(), key=lambda x: x[1])
+
+            # debug
+            logger.debug("Sorted test STDDEV %s" % (T))
+
+            # getting the first element != None
+            for case, value in T:
+                if value is not None:
+                    if case == "T1":
+                        logger.debug(
+                            "%s hypothesis selected. Adding %s to %s" %
+                            (case, i, i + 1))
+                        isochores[i].AddIsochore(
+                            isochores[i + 1], scheme)
+
+                        # deleting i+1
+                        del(isochores[i + 1])
+
+                    elif case == "T2":
+                        logger.debug(
+                            "%s hypothesis selected. Adding isochore %s to %s" %
+                            (case, i - 1, i))
+                        isochores[i -
+                                       1].AddIsochore(isochores[i], scheme)
+
+                        # deleting i
+                        del(isochores[i])
+
+                    else:
+                        # case T3
+                        logger.debug(
+                            "%s hypothesis selected. Adding isochore %s to %s and %s" %
+                            (case, i - 1, i, i + 1))
+                        isochores[i -
+                                       1].AddIsochore(isochores[i], scheme)
+                        isochores[i - 1].AddIsochore(
+                            isochores[i + 1], scheme)
+
+                        # deleting i+1
+                        del(isochores[i + 1])
+
+                        # deleting i
+                        del(isochores[i])
+
+                    n_of_merges += 1
+
+                    # Last
+                    break
+
+            # Finding the better case
+
+        # debug
+        # break
+
+    return n_of_merges
+
+
+def _merge_isochores(isochores, scheme=None):
+    """Merge adjacent isochores with the same class. scheme is the
+    ClassScheme of isochores. Returns the number of merged isochores"""
+
+    n_of_merges = 0
+
+    # Now we could two distinct isochore with the same class, and we want
+    # to merge them
+    for i in range(len(isochores) - 2, -1, -1):
+        # debug
+        logger.debug("Evaluating %s and %s" %
+                     (isochores[i], isochores[i + 1]))
+
+        if isochores[i].Class == isochores[i + 1].Class:
+            # debug
+            logger.debug("Merging %s to %s" %
+                         (isochores[i], isochores[i + 1]))
+
+            # cathing the old class
+            old_Class = isochores[i].Class
+
+            # merge the isochores
+            isochores[i].AddIsochore(isochores[i + 1], scheme)
+
+            # deleting i+1
+            del(isochores[i + 1])
+
+            n_of_merges += 1
+
+            # debug
+            logger.debug("%s updated" % (isochores[i]))
+
+            # May the class change?
+            if isochores[i].Class != old_Class:
+                logger.error(
+                    "The class has changed for %s" %
+                    (isochores[i]))
+                # at this moment, I want to see this event
+                raise ChromosomeError(
+                    "The class has changed for %s" %
+                    (isochores[i]))
+
+        # cicle i
+
+    return n_of_merges
+
+
+# The header of windows and isochores CSV files
+WINDOWS_HEADER = ["Start", "End", "Size", "Class", "GClevel"]
+ISOCHORES_HEADER = [
+    "Start", "End", "Size", "Class", "AVG_GClevel", "STDDEV_GClevel"]
+
+
+def _window_row(window):
+    """Returns a CSV row for a window"""
+
+    # mind the gap element
+    if window.Class == "gap":
+        return [window.start + 1, window.end, window.size, window.Class, None]
+
+    return [window.start + 1, window.end, window.size, window.Class,
+            "%.6f" % (window.GClevel)]
+
+
+def _isochore_row(isochore):
+    """Returns a CSV row for an isochore"""
+
+    # mind the gap element
+    if isochore.Class == "gap":
+        return [isochore.start + 1, isochore.end, isochore.size,
+                isochore.Class, None, None]
+
+    # If isochore is composed by one element, its stddev will be None
+    stddev_GClevel = None
+
+    if len(isochore) > 1:
+        stddev_GClevel = "%.6f" % (isochore.stddev_GClevel)
+
+    return [isochore.start + 1, isochore.end, isochore.size, isochore.Class,
+            "%.6f" % (isochore.avg_GClevel), stddev_GClevel]
+
+# The chromosome used by _windows_chunk. Like _region_chromosomes, it's read
+# by forked processes without pickling
+_windows_chromosome = None
+
+
+def _windows_chunk(task):
+    """Returns the windows of a chunk of _windows_chromosome"""
+
+    gaps, window_size, From, To = task
+
+    return _windows_chromosome._WindowsRange(gaps, window_size, From, To)
+
+
+def _window_chunks(gaps, window_size, From, To, n_of_chunks):
+    """Split From-To in about n_of_chunks chunks. Returns the chunk bounds.
+    Windows restart after each gap, so a chunk may start at the end of a gap
+    or at a window start (before the next gap): windows of each chunk are the
+    same of a whole calculation. gaps are the gaps bigger than gap tolerance,
+    sorted by position"""
+
+    # the stretches of sequence between gaps. Windows start at stretch start
+    stretches = []
+    start = From
+
+    for gap in gaps:
+        if gap.start > start:
+            stretches.append((start, min(gap.start, To)))
+
+        start = max(start, gap.end)
+
+    if start < To:
+        stretches.append((start, To))
+
+    bounds = set()
+
+    for i in range(1, n_of_chunks):
+        target = From + (To - From) * i // n_of_chunks
+
+        for stretch_start, stretch_end in stretches:
+            # target is in the gap before this stretch
+            if target < stretch_start:
+                bounds.add(stretch_start)
+                break
+
+            # the nearest window start, before the stretch end
+            if target < stretch_end:
+                n_of_windows = min(
+                    int(round(float(target - stretch_start) / window_size)),
+                    (stretch_end - stretch_start - 1) // window_size)
+                bounds.add(stretch_start + n_of_windows * window_size)
+                break
+
+    bounds = [bound for bound in sorted(bounds) if From < bound < To]
+
+    return [From] + bounds + [To]
+
+
+def _segment_chromosome(task):
+    """Calculate windows and isochores of a sequence, or of a Chromosome.
+    Called by SegmentChromosomes, even in a thread"""
+
+    sequence, settings = task
+
+    if isinstance(sequence, Chromosome):
+        chromosome = sequence
+
+    else:
+        # gaps and G+C counts are calculated in this thread too
+        chromosome = Chromosome(sequence, settings=settings)
+
+    chromosome.ValueWindows()
+    chromosome.FindIsochores()
+
+    logger.debug(
+        "%s: %s windows, %s isochores" %
+        (chromosome.name, len(chromosome.windows), len(chromosome.isochores)))
+
+    return chromosome
+
+
+def SegmentChromosomes(sequences, settings=None, threads=1):
+    """Calculate windows and isochores of many sequences (Bio.SeqRecord,
+    Utility.FastaRecord or Utility.SharedSequence objects) or Chromosome
+    instances, with a pool of threads. Threads share sequences without
+    copies, and gaps, G+C counts and windows are calculated by numpy without
+    the GIL. Sequences are segmented with settings, chromosomes with their
+    own settings. Returns the chromosomes, in sequences order"""
+
+    tasks = [(sequence, settings) for sequence in sequences]
+
+    if threads == 1:
+        return [_segment_chromosome(task) for task in tasks]
+
+    pool = multiprocessing.pool.ThreadPool(processes=threads)
+
+    try:
+        # one chromosome at a time for each thread, to balance the load
+        chromosomes = pool.map(_segment_chromosome, tasks, chunksize=1)
+        pool.close()
+
+    except BaseException:
+        pool.terminate()
+        raise
+
+    finally:
+        pool.join()
+
+    return chromosomes
+
+# The chromosomes used by _segment_region. It's a module variable, so that
+# processes forked by multiprocessing can read chromosomes without pickling
+_region_chromosomes = {}
+
+
+def _segment_region(task):
+    """Calculate windows and isochores for a region. Returns the region and
+    the list of its windows and isochores"""
+
+    region, window_size, gap_tolerance, min_size = task
+
+    Chrom = _region_chromosomes[region.chrom]
+
+    # BED coordinates are 0-based, like python coordinates
+    Chrom.ValueWindows(
+        window_size=window_size,
+        From=region.start,
+        To=min(region.end, Chrom.size),
+        gap_tolerance=gap_tolerance)
+
+    Chrom.FindIsochores(min_size=min_size)
+
+    return region, Chrom.windows, Chrom.isochores
+
+# This class will segment many regions, in one or more chromosomes, reading
+# each chromosome only once
+
+
+class Regions:
+    """A class to calculate windows and isochores in a list of regions, ie read
+    from a BED file"""
+
+    def __init__(self, regions=None):
+
+        # a list of Utility.Region
+        if regions is None:
+            regions = []
+
+        self.regions = list(regions)
+
+        # Chromosomes instances, by name
+        self.chromosomes = {}
+
+        # windows and isochores for each region
+        self.windows = []
+        self.isochores = []
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def LoadRegions(self, bed_file):
+        """Read regions from a BED file"""
+
+        self.regions = Utility.ReadBed(bed_file)
+
+        logger.info(
+            "%s regions read from %s" % (len(self.regions), bed_file))
+
+    def GetChromosomeNames(self):
+        """Returns the names of chromosomes needed by regions"""
+
+        names = []
+
+        for region in self.regions:
+            if region.chrom not in names:
+                names += [region.chrom]
+
+        return names
+
+    def AddChromosome(self, chromosome):
+        """Add a Chromosome instance. Chromosome sequence and gaps will be
+        used for all regions with its name"""
+
+        if chromosome.__class__ != Chromosome or chromosome.seqRecord is None:
+            raise RegionsError(
+                "You can add only a Chromosome instance with a sequence")
+
+        self.chromosomes[chromosome.name] = chromosome
+
+    def Segment(self, window_size=None, gap_tolerance=None, min_size=None,
+                processes=1):
+        """Calculate windows and isochores for each region. Regions could be
+        processed by a pool of processes"""
+
+        global _region_chromosomes
+
+        if len(self.regions) == 0:
+            raise RegionsError("No regions to segment")
+
+        # all chromosomes must be defined before starting
+        for name in self.GetChromosomeNames():
+            if name not in self.chromosomes:
+                raise RegionsError("Chromosome %s not found" % (name))
+
+        for region in self.regions:
+            if region.start >= self.chromosomes[region.chrom].size:
+                raise RegionsError(
+                    "%s starts after the end of %s" % (region, region.chrom))
+
+            if region.end > self.chromosomes[region.chrom].size:
+                logger.warning(
+                    "%s ends after the end of %s. Region will be truncated" %
+                    (region, region.chrom))
+
+        # G+C counts are calculated once for each chromosome, before forking
+        for chromosome in self.chromosomes.values():
+            chromosome.BuildGCIndex()
+
+        tasks = [(region, window_size, gap_tolerance, min_size)
+                 for region in self.regions]
+
+        self.windows = []
+        self.isochores = []
+
+        _region_chromosomes = self.chromosomes
+
+        try:
+            if processes == 1:
+                results = itertools.imap(_segment_region, tasks)
+                self._CollectResults(results)
+
+            else:
+                pool = multiprocessing.Pool(processes=processes)
+
+                try:
+                    # results are returned in regions order
+                    chunksize = max(1, len(tasks) // (processes * 4))
+                    results = pool.imap(
+                        _segment_region, tasks, chunksize=chunksize)
+                    self._CollectResults(results)
+                    pool.close()
+
+                except BaseException:
+                    pool.terminate()
+                    raise
+
+                finally:
+                    pool.join()
+
+        finally:
+            _region_chromosomes = {}
+
+        logger.info("%s regions segmented" % (len(self.regions)))
+
+    def _CollectResults(self, results):
+        """Record windows and isochores of each region"""
+
+        for region, windows, isochores in results:
+            logger.debug(
+                "%s: %s windows, %s isochores" %
+                (region.name, len(windows), len(isochores)))
+
+            self.windows += [windows]
+            self.isochores += [isochores]
+
+    def _handle_output(self, outfile):
+        """This function open a file for writing if necessary"""
+
+        # A flag to determine if I have to close the file (don't close stdout)
+        flag_close = False
+
+        # The output filename
+        filename = None
+
+        if isinstance(outfile, types.StringType):
+            # testing for file existance
+            if os.path.exists(outfile):
+                raise RegionsError(
+                    "File %s exists. I cannot overwrite it" % (outfile))
+
+            # else
+            filename = outfile
+            outfile = open(filename, "w")
+
+            # I have to close this file once I've finished
+            flag_close = True
+
+        elif not isinstance(outfile, types.FileType):
+            raise RegionsError(
+                "I don't know ho to handle %s : %s" %
+                (outfile, type(outfile)))
+
+        return filename, outfile, flag_close
+
+    def DumpWindows(self, outfile=sys.stdout):
+        """Dumps windows of all regions in a CSV file. Each row is tagged with
+        its region name and chromosome. Coordinates are 1 based"""
+
+        if self.windows == []:
+            raise RegionsError(
+                "Regions must be segmented to call this function")
+
+        filename, outfile, flag_close = self._handle_output(outfile)
+
+        csv_writer = csv.writer(outfile, lineterminator="\n")
+        csv_writer.writerow(
+            ["Region", "Chrom", "Start", "End", "Size", "Class", "GClevel"])
+
+        for region, windows in zip(self.regions, self.windows):
+            for window in windows:
+                csv_writer.writerow(
+                    [region.name, region.chrom] + _window_row(window))
+
+        outfile.flush()
+
+        # closing file if necessary
+        if flag_close is True:
+            outfile.close()
+            logger.info("Windows CSV file written in %s" % (filename))
+
+    def DumpIsochores(self, outfile=sys.stdout):
+        """Dumps isochores of all regions in a CSV file. Each row is tagged
+        with its region name and chromosome. Coordinates are 1 based"""
+
+        if self.isochores == []:
+            raise RegionsError(
+                "Regions must be segmented to call this function")
+
+        filename, outfile, flag_close = self._handle_output(outfile)
+
+        csv_writer = csv.writer(outfile, lineterminator="\n")
+        csv_writer.writerow(
+            ["Region", "Chrom", "Start", "End", "Size", "Class",
+             "AVG_GClevel", "STDDEV_GClevel"])
+
+        for region, isochores in zip(self.regions, self.isochores):
+            for isochore in isochores:
+                csv_writer.writerow(
+                    [region.name, region.chrom] + _isochore_row(isochore))
+
+        outfile.flush()
+
+        # closing file if necessary
+        if flag_close is True:
+            outfile.close()
+            logger.info("Isochores CSV file written in %s" % (filename))
+
+# This class will scan files with a pattern in a user defined directory,
+# in order to read isochores and memorize sizes and GClevels in a dictionary
+
+
+class Families:
+    """A class to find isochore familes"""
+
+    def __init__(self):
+
+        # This will be the list for files to search for, with their sizes
+        self.directory = None
+        self.files = []
+        self.sizes = []
+        self.n_of_files = None
+
+        # all other useful attribute
+        self.n_of_bins = None
+
+        # all bins will be put here
+        self.data = {}
+        self.max_value = None
+        self.min_value = None
+        self.precision = None
+        self.bin_size = None
+        self.bins = None
+
+        # 2-D histograms: sizes for each GC bin and isochore size bin, and
+        # for each GC bin and group (subdirectory)
+        self.bin_values = None
+        self.size_bins = None
+        self.n_of_size_bins = None
+        self.size_data = None
+        self.size_counts = None
+        self.groups = []
+        self.group_data = None
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def Scan4Files(self, directory, pattern="*", recursive=False,
+                   glob=False):
+        """Scan a user directory in order to find isochores or window files
+        specified by user defined pattern (a regular expression, or a shell
+        pattern if glob is True). Subdirectories are scanned if recursive is
+        True. Files are sorted by size, largest first"""
+
+        if not os.path.isdir(directory):
+            raise FamilyError("%s seems not to be a directory!" % (directory))
+
+        # reset the file list
+        self.directory = directory
+        self.files = []
+        self.sizes = []
+
+        # Now search for file with pattern
+        if glob is True:
+            def match(name):
+                return fnmatch.fnmatch(name, pattern)
+
+        else:
+            regexp = re.compile(pattern)
+
+            def match(name):
+                return regexp.search(name) is not None
+
+        entries = [(size, path) for path, size in
+                   _scan_files(directory, recursive)
+                   if match(os.path.basename(path))]
+
+        # largest files first: workers will finish evenly
+        entries.sort(key=lambda entry: entry[0], reverse=True)
+
+        # determine the realtive path for each file
+        self.files = [path for size, path in entries]
+        self.sizes = [size for size, path in entries]
+        self.n_of_files = len(self.files)
+
+        # Maybe if I found no files I have to throw an Exception. For the
+        # moment, I print an Error log with 0 priority
+        if self.n_of_files == 0:
+            logger.error(
+                "No files found for pattern '%s' in '%s' directory" %
                 (pattern, directory))
 
         else:
             logger.info(
-                "%s files found for pattern '%s' in '%s' directory" %
-                (self.n_of_files, pattern, directory))
+                "%s files (%s bytes) found for pattern '%s' in '%s' directory" %
+                (self.n_of_files, sum(self.sizes), pattern, directory))
 
-    def GroupByIsochores(self, min_value=30, max_value=65, bin_size=1):
+    def GroupByIsochores(self, min_value=30, max_value=65, bin_size=1,
+                         processes=1, index=None, size_bins=None):
         """Put Isochores sizes in bins relying on their average GC values. The
         user can specify the lower and the upper values of the bins graph, and
-        also the bin dimensions."""
+        also the bin dimensions. Isochores are binned also by their size
+        (size_bins are the bin edges) and by the subdirectory of their file
+        (the group, ie the species). Files could be read and binned by a pool
+        of processes. If an index file is provided, only new or modified files
+        are read, and the index is updated"""
 
         if len(self.files) == 0:
             raise FamilyError("No files can be used to derive families")
@@ -1293,67 +2132,121 @@ class Families:
         # initialize self.data
         self.data = {}
 
-        # A counter to count how many file will be processed by this function
-        counter = 0
-
         # record isochore length and how many isochore belongs to this bin
+        bins = []
+
         for i in range(self.n_of_bins):
             bin = min_value + i * bin_size
+            bins += [bin]
 
             # the first number will be the size of the isochore, the second
             # will be the number of isochore belonging to this bin
             self.data[bin] = {"size": 0, "n_of_isochores": 0}
 
-        # Now scanning files for isochores:
+        # bins are sorted, in order to find the nearest bin with a bisection
+        bins_array = numpy.array(bins, dtype=numpy.float64)
+        self.bin_values = bins_array
+
+        # isochore size bins edges
+        if size_bins is None:
+            size_bins = constants.FAMILIES_SIZE_BINS
+
+        self.size_bins = numpy.array(size_bins, dtype=numpy.float64)
+        self.n_of_size_bins = len(self.size_bins) - 1
+
+        # the sum of sizes and isochores of all files for each GC and size bin
+        shape = (self.n_of_bins, self.n_of_size_bins)
+        self.size_data = numpy.zeros(shape, dtype=numpy.int64)
+        self.size_counts = numpy.zeros(shape, dtype=numpy.int64)
+
+        # the sum of sizes for each GC bin and group
+        self.groups = []
+        self.group_data = None
+        group_data = {}
+
+        # one task for each isochore file not in index
+        tasks = []
+
+        if index is not None:
+            families_index = FamiliesIndex(
+                index, min_value, max_value, bin_size,
+                [float(edge) for edge in self.size_bins])
+
+        else:
+            families_index = None
+
         for myfile in self.files:
-            logger.debug("Processing file %s" % (myfile))
-            Chrom = Chromosome()
-            Chrom.LoadIsochores(myfile)
-
-            # Iterating along of Chrom isochores
-            for isochore in Chrom.isochores:
-                if isochore.Class != "gap":
-                    # since bin_size could be 0.5, It's difficult to round
-                    # GCvalue near its bin. So I will calculate all the
-                    # distance between bins and GClevel, then I will assign
-                    # isochore size to the best bin
-                    best_distance = None
-                    best_bin = None
-
-                    # test if avg_GClevel is outside max and min GCvalue
-                    if isochore.avg_GClevel < min_value or isochore.avg_GClevel > max_value:
-                        logger.warning(
-                            "%s avg_GClevel outside margin. Maybe min_value (%s) and max_value (%s) have to be modified" %
-                            (isochore, max_value, min_value))
-
-                    # a bin is a key of self.data (a GClevel value)
-                    for bin in self.data.keys():
-                        # valuating distance
-                        distance = abs(isochore.avg_GClevel - bin)
-
-                        # controlling that best distance is defined of distance
-                        # is better than best distance
-                        if distance <= best_distance or best_distance is None:
-                            best_distance = distance
-                            best_bin = bin
-
-                    # now adding isochore size to the best isochore bin
-                    logger.debug(
-                        "Adding %s to bin %s" %
-                        (isochore, best_bin))
-                    self.data[best_bin]["size"] += isochore.size
-                    self.data[best_bin]["n_of_isochores"] += 1
-
-                # Condition Class != Gap
-
-            # Iteration on Element (Gap or Isochore)
-            logger.debug("file %s processed" % (myfile))
+            partial = None
+
+            if families_index is not None:
+                partial = families_index.GetPartial(myfile)
+
+            if partial is not None:
+                self._AddPartial(myfile, partial[0], partial[1], group_data)
+
+            else:
+                # md5 is needed only to update the index
+                tasks += [(myfile, bins_array, self.size_bins, min_value,
+                           max_value, families_index is not None)]
+
+        if families_index is not None:
+            logger.info(
+                "%s files read from index, %s files to process" %
+                (len(self.files) - len(tasks), len(tasks)))
+
+        start_time = time.time()
 
-            # Incrementing the counter
-            counter += 1
+        if processes == 1:
+            self._ReducePartials(
+                itertools.imap(_group_isochores_file, tasks), group_data,
+                start_time, len(tasks), families_index)
+
+        else:
+            pool = multiprocessing.Pool(processes=processes)
+
+            try:
+                # the order of partial histograms doesn't matter
+                partials = pool.imap_unordered(
+                    _group_isochores_file, tasks, chunksize=4)
+
+                self._ReducePartials(
+                    partials, group_data, start_time, len(tasks),
+                    families_index)
+                pool.close()
+
+            except BaseException:
+                pool.terminate()
+                raise
+
+            finally:
+                pool.join()
+
+        counter = len(tasks)
+        elapsed = time.time() - start_time
 
         # Iteration on Isochore file
-        logger.info("%s files processed" % (counter))
+        logger.info(
+            "%s files processed in %.2f seconds (%.1f files/s)" %
+            (counter, elapsed, counter / max(elapsed, 1e-6)))
+
+        if families_index is not None:
+            families_index.Dump(self.files)
+
+        # sizes and number of isochores for each GC bin
+        sizes = self.size_data.sum(axis=1)
+        n_of_isochores = self.size_counts.sum(axis=1)
+
+        # a column for each group
+        self.groups = sorted(group_data.keys())
+        self.group_data = numpy.zeros(
+            (self.n_of_bins, len(self.groups)), dtype=numpy.int64)
+
+        for j, group in enumerate(self.groups):
+            self.group_data[:, j] = group_data[group]
+
+        for i, bin in enumerate(bins):
+            self.data[bin]["size"] = int(sizes[i])
+            self.data[bin]["n_of_isochores"] = int(n_of_isochores[i])
 
         # Setting the bins labels list
         self.bins = self.data.keys()
@@ -1383,6 +2276,56 @@ class Families:
 
         return filename, outfile, flag_close
 
+    def GetGroup(self, myfile):
+        """Returns the group of a file, which is its subdirectory relative to
+        the scanned directory ('.' for files in the scanned directory)"""
+
+        dirname = os.path.dirname(myfile)
+
+        if self.directory is not None:
+            relative = os.path.relpath(dirname, self.directory)
+
+            if not relative.startswith(os.pardir):
+                return relative
+
+        return dirname
+
+    def _AddPartial(self, myfile, partial_sizes, partial_n_of_isochores,
+                    group_data):
+        """Sum the partial histograms of a file"""
+
+        self.size_data += partial_sizes
+        self.size_counts += partial_n_of_isochores
+
+        group = self.GetGroup(myfile)
+
+        if group not in group_data:
+            group_data[group] = numpy.zeros(self.n_of_bins, dtype=numpy.int64)
+
+        group_data[group] += partial_sizes.sum(axis=1)
+
+    def _ReducePartials(self, partials, group_data, start_time, n_of_tasks,
+                        families_index=None):
+        """Sum partial histograms, logging progress. Partial histograms are
+        recorded in index, if provided"""
+
+        for counter, (myfile, partial_sizes, partial_n_of_isochores, md5) in \
+                enumerate(partials, 1):
+            self._AddPartial(
+                myfile, partial_sizes, partial_n_of_isochores, group_data)
+
+            if families_index is not None:
+                families_index.SetPartial(
+                    myfile, partial_sizes, partial_n_of_isochores, md5)
+
+            logger.debug("file %s processed" % (myfile))
+
+            if counter % 100 == 0:
+                elapsed = time.time() - start_time
+                logger.info(
+                    "%s/%s files processed (%.1f files/s)" %
+                    (counter, n_of_tasks, counter / max(elapsed, 1e-6)))
+
     def DumpFamilies(self, outfile=sys.stdout):
         """Dumps families in a CSV file"""
 
@@ -1409,38 +2352,538 @@ class Families:
             outfile.close()
             logger.info("Families CSV file written in %s" % (filename))
 
+# This class will store partial families histograms of each isochore file in a
+# JSON file, in order to read again only new or modified files
+
+
+class FamiliesIndex:
+    """A persistent index of partial families histograms. Files are identified
+    by path, size, modification time and md5"""
+
+    def __init__(self, filename, min_value=30, max_value=65, bin_size=1,
+                 size_bins=constants.FAMILIES_SIZE_BINS):
+
+        self.filename = filename
+
+        # partial histograms are valid only for the same bins
+        self.parameters = {
+            "min_value": min_value,
+            "max_value": max_value,
+            "bin_size": bin_size,
+            "size_bins": list(size_bins)}
+
+        # file informations, keyed by absolute path
+        self.files = {}
+
+        if os.path.exists(self.filename):
+            self.Load()
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def Load(self):
+        """Read the index file. The index is discarded if bins are different"""
+
+        with open(self.filename) as handle:
+            try:
+                data = json.load(handle)
+
+            except ValueError as message:
+                raise FamiliesIndexError(
+                    "Cannot read index %s: %s" % (self.filename, message))
+
+        if data.get("parameters") != self.parameters:
+            logger.warning(
+                "Bins in %s are different from %s. Index discarded" %
+                (self.filename, self.parameters))
+            return
+
+        self.files = data["files"]
+
+        logger.info(
+            "%s files read from index %s" % (len(self.files), self.filename))
+
+    def GetPartial(self, myfile):
+        """Returns sizes and number of isochores of each GC and size bin for
+        an unchanged file, or None if the file is new or modified"""
+
+        record = self.files.get(os.path.abspath(myfile))
+
+        if record is None:
+            return None
+
+        stat = os.stat(myfile)
+
+        if record["size"] != stat.st_size:
+            logger.debug("%s size changed" % (myfile))
+            return None
+
+        # a different modification time could be a simple touch
+        if record["mtime"] != stat.st_mtime:
+            if record["md5"] != _md5sum(myfile):
+                logger.debug("%s content changed" % (myfile))
+                return None
+
+            record["mtime"] = stat.st_mtime
+
+        return (numpy.array(record["sizes"], dtype=numpy.int64),
+                numpy.array(record["n_of_isochores"], dtype=numpy.int64))
+
+    def SetPartial(self, myfile, sizes, n_of_isochores, md5=None):
+        """Record sizes and number of isochores of each GC and size bin for a
+        file"""
+
+        if md5 is None:
+            md5 = _md5sum(myfile)
+
+        stat = os.stat(myfile)
+
+        self.files[os.path.abspath(myfile)] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "md5": md5,
+            "sizes": numpy.asarray(sizes).tolist(),
+            "n_of_isochores": numpy.asarray(n_of_isochores).tolist()}
+
+    def Dump(self, files=None):
+        """Write the index file. If a list of files is provided, only those
+        files are kept in index"""
+
+        if files is not None:
+            paths = set([os.path.abspath(myfile) for myfile in files])
+
+            for path in self.files.keys():
+                if path not in paths:
+                    del(self.files[path])
+
+        data = {"parameters": self.parameters, "files": self.files}
+
+        # write a temporary file, then rename it: a broken run can't corrupt
+        # the index
+        tmpfile = self.filename + ".tmp"
+
+        with open(tmpfile, "w") as handle:
+            json.dump(data, handle)
+
+        os.rename(tmpfile, self.filename)
+
+        logger.info(
+            "%s files written in index %s" % (len(self.files), self.filename))
+
+# A function to list files and their sizes in a directory, with a single
+# system call for each entry when scandir is available
+
+
+def _scan_files(directory, recursive=False):
+    """Yields path and size of each file in a directory. Subdirectories are
+    scanned if recursive is True. Symbolic links to directories are not
+    followed"""
+
+    # directories to be scanned
+    directories = [directory]
+
+    while len(directories) > 0:
+        current = directories.pop()
+
+        if scandir is not None:
+            for entry in scandir(current):
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        directories.append(entry.path)
+
+                elif entry.is_file():
+                    yield entry.path, entry.stat().st_size
+
+        else:
+            for name in os.listdir(current):
+                path = os.path.join(current, name)
+
+                if os.path.isdir(path) and not os.path.islink(path):
+                    if recursive:
+                        directories.append(path)
+
+                elif os.path.isfile(path):
+                    yield path, os.path.getsize(path)
+
+# A function to load an isochore file and to put its isochores in bins. It's
+# defined at module level in order to be used by multiprocessing
+
+
+def _group_isochores_file(task):
+    """Load isochores from a file and returns the size and the number of
+    isochores in each GC and size bin"""
+
+    myfile, bins, size_bins, min_value, max_value, with_md5 = task
+
+    logger.debug("Processing file %s" % (myfile))
+    Chrom = Chromosome()
+    Chrom.LoadIsochores(myfile)
+
+    # Considering only isochores (Class != gap)
+    isochores = [isochore for isochore in Chrom.isochores
+                 if isochore.Class != "gap"]
+
+    GClevels = numpy.array(
+        [isochore.avg_GClevel for isochore in isochores],
+        dtype=numpy.float64)
+    isochore_sizes = numpy.array(
+        [isochore.size for isochore in isochores], dtype=numpy.int64)
+
+    # test if avg_GClevel is outside max and min GCvalue
+    for i in numpy.flatnonzero(
+            (GClevels < min_value) | (GClevels > max_value)):
+        logger.warning(
+            "%s avg_GClevel outside margin. Maybe min_value (%s) and max_value (%s) have to be modified" %
+            (isochores[i], max_value, min_value))
+
+    # assign each isochore to the nearest GC bin and to its size bin. Sizes
+    # outside edges are assigned to the first or to the last size bin
+    n_of_size_bins = len(size_bins) - 1
+
+    size_indexes = numpy.searchsorted(
+        size_bins, isochore_sizes, side="right") - 1
+    size_indexes = numpy.clip(size_indexes, 0, n_of_size_bins - 1)
+
+    indexes = BinGClevels(GClevels, bins) * n_of_size_bins + size_indexes
+
+    # then sum sizes and isochores for each bin
+    length = len(bins) * n_of_size_bins
+    shape = (len(bins), n_of_size_bins)
+
+    sizes = numpy.bincount(
+        indexes, weights=isochore_sizes,
+        minlength=length).astype(numpy.int64).reshape(shape)
+    n_of_isochores = numpy.bincount(
+        indexes, minlength=length).astype(numpy.int64).reshape(shape)
+
+    md5 = None
+
+    if with_md5:
+        md5 = _md5sum(myfile)
+
+    return myfile, sizes, n_of_isochores, md5
+
+
+def _md5sum(filename, blocksize=2 ** 20):
+    """Returns the md5 hexdigest of a file"""
+
+    md5 = hashlib.md5()
+
+    with open(filename, "rb") as handle:
+        for block in iter(lambda: handle.read(blocksize), b""):
+            md5.update(block)
+
+    return md5.hexdigest()
+
+# A function to assign GClevels to the nearest families bin
+
+
+def BinGClevels(GClevels, bins):
+    """Returns the index of the nearest bin for each GClevel. Bins must be
+    sorted. If a GClevel is equidistant from two bins, the chosen bin is the
+    same of the old loop on Families.data keys: the last one in dictionary
+    order"""
+
+    GClevels = numpy.asarray(GClevels, dtype=numpy.float64)
+    bins = numpy.asarray(bins, dtype=numpy.float64)
+
+    if len(bins) == 1:
+        return numpy.zeros(GClevels.shape, dtype=numpy.int64)
+
+    # the nearest bin is the last bin lower than GClevel or the next one.
+    # GClevels outside bins are assigned to the first or to the last bin
+    lower = numpy.searchsorted(bins, GClevels, side="right") - 1
+    lower = numpy.clip(lower, 0, len(bins) - 2)
+    upper = lower + 1
+
+    # Families.data keys are the bins, inserted in order. A dictionary with
+    # the same keys inserted in the same order has the same keys order
+    data = {}
+
+    for bin in bins.tolist():
+        data[bin] = None
+
+    position = dict((bin, i) for i, bin in enumerate(data.keys()))
+    ranks = numpy.array([position[bin] for bin in bins.tolist()])
+
+    # with the '<=' rule, the last equidistant bin in keys order is chosen
+    lower_distances = numpy.abs(GClevels - bins[lower])
+    upper_distances = numpy.abs(GClevels - bins[upper])
+
+    is_upper = ((upper_distances < lower_distances) |
+                ((upper_distances == lower_distances) &
+                 (ranks[upper] > ranks[lower])))
+
+    return numpy.where(is_upper, upper, lower)
+
+# Isochore classes are assigned by bisection on their sorted GClevel limits
+
+
+class ClassScheme:
+    """Isochore classes and their GClevel upper limits (a dictionary like
+    constants.CLASS_TO_LEVEL or a sequence of items, any number of classes).
+    A GClevel belongs to the first class whose limit is not lower than
+    GClevel, or to the last class. Classes are coded as int8 indexes of
+    labels, sorted by limits"""
+
+    def __init__(self, class_to_level=None):
+        if class_to_level is None:
+            class_to_level = constants.CLASS_TO_LEVEL
+
+        # a dictionary, or a sequence of classes and limits
+        class_to_level = dict(class_to_level)
+
+        if len(class_to_level) == 0 or len(class_to_level) > 127:
+            raise ElementError(
+                "Cannot define %s classes" % (len(class_to_level)))
+
+        items = sorted(class_to_level.items(), key=lambda x: x[1])
+
+        self.class_to_level = class_to_level
+
+        # the code to label table
+        self.labels = [Class for Class, level in items]
+        self.levels = [level for Class, level in items]
+
+        # the last class has no upper limit
+        self.n_of_limits = len(self.levels) - 1
+        self.thresholds = numpy.array(self.levels[:-1], dtype=numpy.float64)
+        self._label_table = numpy.array(self.labels, dtype=object)
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def GetCodes(self, GClevels):
+        """Returns the class codes of an array of GClevels"""
+
+        GClevels = numpy.asarray(GClevels, dtype=numpy.float64)
+
+        return numpy.searchsorted(
+            self.thresholds, GClevels, side="left").astype(numpy.int8)
+
+    def GetLabels(self, codes):
+        """Returns the class labels of an array of codes"""
+
+        return self._label_table[numpy.asarray(codes, dtype=numpy.intp)]
+
+    def GetClass(self, GClevel):
+        """Returns the class label of a GClevel"""
+
+        return self.labels[
+            bisect.bisect_left(self.levels, GClevel, 0, self.n_of_limits)]
+
+# The schemes already built, by their sorted classes and limits. Settings
+# share the same scheme
+_class_schemes = {}
+
+# The scheme of constants.CLASS_TO_LEVEL, built again if constants change
+_class_scheme = None
+
+
+def _class_items(class_to_level):
+    """Returns classes and limits sorted by limit (a hashable tuple)"""
+
+    return tuple(sorted(dict(class_to_level).items(),
+                        key=lambda x: (x[1], x[0])))
+
+
+def GetClassScheme(class_to_level=None):
+    """Returns the ClassScheme of class_to_level (a dictionary or a sequence
+    of classes and limits, default: constants.CLASS_TO_LEVEL)"""
+
+    global _class_scheme
+
+    if class_to_level is None:
+        if (_class_scheme is None or
+                _class_scheme.class_to_level != constants.CLASS_TO_LEVEL):
+            _class_scheme = GetClassScheme(constants.CLASS_TO_LEVEL)
+
+        return _class_scheme
+
+    items = _class_items(class_to_level)
+
+    # a dictionary lookup is atomic, so schemes are shared by threads. At
+    # worst, the same scheme is built twice
+    scheme = _class_schemes.get(items)
+
+    if scheme is None:
+        scheme = ClassScheme(items)
+        _class_schemes[items] = scheme
+
+    return scheme
+
+# The parameters of a segmentation. Settings are immutable, so segmentations
+# with different settings can run in the same process, and settings can be
+# used as dictionary keys
+
+_Settings = collections.namedtuple(
+    "Settings", ["window_size", "gap_tolerance", "min_size",
+                 "class_to_level", "y_min", "y_max"])
+
+
+class Settings(_Settings):
+    """The window size and the gap tolerance (bp), the minimum size of an
+    isochore (windows), the class limits (classes and limits sorted by limit)
+    and the y range of graphs. Missing values are read from GClib.constants"""
+
+    __slots__ = ()
+
+    def __new__(cls, window_size=None, gap_tolerance=None, min_size=None,
+                class_to_level=None, y_min=None, y_max=None):
+
+        if window_size is None:
+            window_size = constants.WINDOW_SIZE
+
+        if gap_tolerance is None:
+            gap_tolerance = constants.GAP_TOLERANCE
+
+        if min_size is None:
+            min_size = constants.ISO_MIN_SIZE
+
+        if class_to_level is None:
+            class_to_level = constants.CLASS_TO_LEVEL
+
+        if y_min is None:
+            y_min = constants.GRAPH_GC_MIN
+
+        if y_max is None:
+            y_max = constants.GRAPH_GC_MAX
+
+        if window_size <= 0:
+            raise SettingsError(
+                "window size must be greater than 0 (%s)" % (window_size))
+
+        if gap_tolerance < 0:
+            raise SettingsError(
+                "gap tolerance can't be negative (%s)" % (gap_tolerance))
+
+        if min_size < 1:
+            raise SettingsError(
+                "isochore min size must be at least 1 (%s)" % (min_size))
+
+        # like Graphs.BaseGraph.SetMinMaxValues
+        if y_min > y_max:
+            y_min, y_max = y_max, y_min
+
+        if y_min == y_max:
+            raise SettingsError(
+                "y_min and y_max can't be equal (%s)" % (y_min))
+
+        class_to_level = _class_items(class_to_level)
+
+        if len(class_to_level) == 0:
+            raise SettingsError("At least a class must be defined")
+
+        return _Settings.__new__(
+            cls, window_size, gap_tolerance, min_size, class_to_level, y_min,
+            y_max)
+
+    def Replace(self, **kwargs):
+        """Returns new Settings, with some values replaced"""
+
+        values = self._asdict()
+        values.update(kwargs)
+
+        return Settings(**values)
+
+    def GetClassToLevel(self):
+        """Returns class limits as a dictionary, like
+        constants.CLASS_TO_LEVEL"""
+
+        return dict(self.class_to_level)
+
+    def GetClassScheme(self):
+        """Returns the ClassScheme of these settings"""
+
+        return GetClassScheme(self.class_to_level)
+
+
+def GetSettings(settings=None):
+    """Returns settings, or the Settings of GClib.constants if settings is
+    None"""
+
+    if settings is None:
+        return Settings()
+
+    return settings
+
 # A function to define the class of a sequence window
 
+# the types of a GClevel
+_GClevel_types = (types.IntType, types.FloatType, numpy.float64)
 
-def CalcClass(GClevel):
-    """Returns the isochore class of a %GC"""
+
+def CalcClass(GClevel, scheme=None):
+    """Returns the isochore class of a %GC, with a ClassScheme (default:
+    constants.CLASS_TO_LEVEL)"""
 
     # Calculating class starting from integer or float
-    if type(GClevel) not in [types.IntType, types.FloatType, numpy.float64]:
+    if type(GClevel) not in _GClevel_types:
         raise Exception(
             "GClevel must be integer or float %s:%s" %
             (GClevel, type(GClevel)))
 
-    Class = None
+    if scheme is None:
+        scheme = _class_scheme
 
-    # L1 = 37
-    if GClevel <= constants.CLASS_TO_LEVEL["L1"]:
-        Class = "L1"
+        if (scheme is None or
+                scheme.class_to_level != constants.CLASS_TO_LEVEL):
+            scheme = GetClassScheme()
 
-    # L2 = 41
-    elif GClevel > constants.CLASS_TO_LEVEL["L1"] and GClevel <= constants.CLASS_TO_LEVEL["L2"]:
-        Class = "L2"
+    return scheme.labels[
+        bisect.bisect_left(scheme.levels, GClevel, 0, scheme.n_of_limits)]
 
-    #H1 = 46
-    elif GClevel > constants.CLASS_TO_LEVEL["L2"] and GClevel <= constants.CLASS_TO_LEVEL["H1"]:
-        Class = "H1"
 
-    #H2 = 53
-    elif GClevel > constants.CLASS_TO_LEVEL["H1"] and GClevel <= constants.CLASS_TO_LEVEL["H2"]:
-        Class = "H2"
+def ClassifyWindows(windows, scheme=None):
+    """Set the class of windows (gaps are ignored) with a vector operation.
+    scheme is a ClassScheme (default: constants.CLASS_TO_LEVEL). Returns the
+    class codes of windows, -1 for gaps"""
 
-    # Otherwise is an H3 class
-    else:
-        Class = "H3"
+    if scheme is None:
+        scheme = GetClassScheme()
+
+    codes = numpy.full(len(windows), -1, dtype=numpy.int8)
+
+    indexes = [i for i, window in enumerate(windows)
+               if window.Class != "gap"]
+
+    if len(indexes) == 0:
+        return codes
+
+    GClevels = numpy.array(
+        [windows[i].GClevel for i in indexes], dtype=numpy.float64)
+
+    codes[indexes] = scheme.GetCodes(GClevels)
+
+    for i, Class in zip(indexes, scheme.GetLabels(codes[indexes])):
+        windows[i].Class = Class
 
-    return Class
+    return codes
@@ -38,10 +38,17 @@ draw_chromosome.pl (2002 Jan Paces, http://genomat.img.cas.cz)
 
 import gd
 import os
+import json
+import zlib
+import numpy
 import shutil
+import struct
 import types
+import StringIO
+import itertools
 import tempfile
 import logging
+import multiprocessing
 
 from PIL import Image
 from PIL import ImageDraw
@@ -78,14 +85,31 @@ class DrawFamiliesError(Exception):
     pass
 
 
+class DrawKaryotypeError(BaseGraphError):
+    pass
+
+
 class MoreGraphsError(Exception):
     pass
 
 
+class ImageStackError(MoreGraphsError):
+    pass
+
+
+class TilePyramidError(Exception):
+    pass
+
+
 class BaseGraph():
-    """A base class to make graps like draw chromosomes"""
+    """A base class to make graps like draw chromosomes. Class limits and the
+    y range are read from settings (an Elements.Settings, default:
+    GClib.constants)"""
+
+    def __init__(self, sequence_start=0, settings=None):
+        # the segmentation settings
+        self.settings = Elements.GetSettings(settings)
 
-    def __init__(self, sequence_start=0):
         # default values in points (pixel)
         self.scale = 30000  # 17500 #higher values shrink images
         # the white space on the left and on the right of the figure
@@ -276,10 +300,9 @@ class BaseGraph():
             # setting the flag value in class attribute
             self.colored_by_class = True
 
-            # One color for each class. Getting the possible values sorted by GClevel
-            # note that constants.CLASS_TO_LEVEL is a dictionary, so keys could be
-            # in random order
-            items = sorted(constants.CLASS_TO_LEVEL.items(), key=lambda x: x[1])
+            # One color for each class. The possible values are sorted by
+            # GClevel in settings
+            items = self.settings.class_to_level
 
             # items are somethin like this: [('L1', 37), ('L2', 41), ('H1',
             # 46), ('H2', 53), ('H3', 100)]
@@ -294,11 +317,8 @@ class BaseGraph():
             # Each self.graph.colorAllocate call assign one of 256 true
             # colors in PNG image and return an ordinal integer of the
             # color already instantiated
-            mycolorslist += [self.graph.colorAllocate((0, 100, 255))]
-            mycolorslist += [self.graph.colorAllocate((0, 200, 255))]
-            mycolorslist += [self.graph.colorAllocate((255, 255, 0))]
-            mycolorslist += [self.graph.colorAllocate((255, 130, 0))]
-            mycolorslist += [self.graph.colorAllocate((255, 0, 0))]
+            for color in _class_colors(len(items)):
+                mycolorslist += [self.graph.colorAllocate(color)]
 
         else:
             # try to define a continue color palette
@@ -368,13 +388,13 @@ class BaseGraph():
 
     def GetLabelByGClevel(self, GClevel):
         """Starting from a GClevel values, returns the class using
-        GClib.Elements.CalcClass"""
+        GClib.Elements.CalcClass with the class limits of settings"""
 
         if self.colorslist is None:
             raise BaseGraphError(
                 "SetColorsList must be called before retrive class by GClevel")
 
-        return Elements.CalcClass(GClevel)
+        return Elements.CalcClass(GClevel, self.settings.GetClassScheme())
 
     def DrawChName(self, chname):
         """Draws chromosome name inside the graph"""
@@ -709,15 +729,16 @@ class BaseGraph():
 class DrawChromosome(BaseGraph):
     """The main class which simulates the behaviour of draw_chromsome.pl"""
 
-    def __init__(self, sequence_start=0):
+    def __init__(self, sequence_start=0, settings=None):
         """Instantiate the class"""
 
         # Instantiate the base methods and the default attribute class
-        BaseGraph.__init__(self, sequence_start=sequence_start)
+        BaseGraph.__init__(
+            self, sequence_start=sequence_start, settings=settings)
 
         # The y max and min values are decided by graph type. In this case,
-        # GClevel values comprised by 30 and 65 are expected
-        self.SetMinMaxValues(constants.GRAPH_GC_MIN, constants.GRAPH_GC_MAX)
+        # GClevel values comprised by settings (30 and 65) are expected
+        self.SetMinMaxValues(self.settings.y_min, self.settings.y_max)
 
     def DrawGenericProfile(self, elements, attribute, color, myshift):
         """This function draw elements with a line, which heigth is equal to 'attribute'
@@ -1001,11 +1022,12 @@ class DrawChromosome(BaseGraph):
 class DrawBarChromosome(BaseGraph):
     """The main class which simulates the behaviour of draw_chromsome.pl"""
 
-    def __init__(self, sequence_start=0):
+    def __init__(self, sequence_start=0, settings=None):
         """Instantiate the class"""
 
         # Instantiate the base methods and the default attribute class
-        BaseGraph.__init__(self, sequence_start=sequence_start)
+        BaseGraph.__init__(
+            self, sequence_start=sequence_start, settings=settings)
 
         # re modulate bottom border
         self.bottom = 70
@@ -1034,10 +1056,9 @@ class DrawBarChromosome(BaseGraph):
             # setting the flag value in class attribute
             self.colored_by_class = True
 
-            # One color for each class. Getting the possible values sorted by GClevel
-            # note that constants.CLASS_TO_LEVEL is a dictionary, so keys could be
-            # in random order
-            items = sorted(constants.CLASS_TO_LEVEL.items(), key=lambda x: x[1])
+            # One color for each class. The possible values are sorted by
+            # GClevel in settings
+            items = self.settings.class_to_level
 
             # items are somethin like this: [('L1', 37), ('L2', 41), ('H1',
             # 46), ('H2', 53), ('H3', 100)]
@@ -1052,11 +1073,8 @@ class DrawBarChromosome(BaseGraph):
             # Each self.graph.colorAllocate call assign one of 256 true
             # colors in PNG image and return an ordinal integer of the
             # color already instantiated
-            mycolorslist += [self.graph.colorAllocate((0, 100, 255))]
-            mycolorslist += [self.graph.colorAllocate((0, 200, 255))]
-            mycolorslist += [self.graph.colorAllocate((255, 255, 0))]
-            mycolorslist += [self.graph.colorAllocate((255, 130, 0))]
-            mycolorslist += [self.graph.colorAllocate((255, 0, 0))]
+            for color in _class_colors(len(items)):
+                mycolorslist += [self.graph.colorAllocate(color)]
 
         else:
             # try to define a continue color palette
@@ -1300,6 +1318,178 @@ class DrawBarChromosome(BaseGraph):
 
 # End of DrawBarChromosome class
 
+# Write a PNG image one strip of rows at a time
+def _png_chunk(tag, data):
+    """Return a PNG chunk"""
+
+    return "".join([
+        struct.pack(">I", len(data)),
+        tag,
+        data,
+        struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)])
+
+
+def _write_png(filename, width, height, strips):
+    """Write a 8 bit RGB PNG file of width x height pixels. Strips is an
+    iterable of numpy arrays (rows x width x 3) which are compressed as soon
+    as they are received, so the whole image is never in memory"""
+
+    compressor = zlib.compressobj()
+    n_of_rows = 0
+
+    with open(filename, "wb") as handle:
+        # the PNG file signature
+        handle.write("\x89PNG\r\n\x1a\n")
+
+        # 8 bit RGB image, no interlace
+        handle.write(_png_chunk("IHDR", struct.pack(
+            ">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+
+        for strip in strips:
+            # each row starts with the filter type byte (0, no filter)
+            rows = numpy.zeros(
+                (strip.shape[0], width * 3 + 1), dtype=numpy.uint8)
+            rows[:, 1:] = strip.reshape(strip.shape[0], width * 3)
+            n_of_rows += strip.shape[0]
+
+            data = compressor.compress(rows.tostring())
+
+            if len(data) > 0:
+                handle.write(_png_chunk("IDAT", data))
+
+        handle.write(_png_chunk("IDAT", compressor.flush()))
+        handle.write(_png_chunk("IEND", ""))
+
+    if n_of_rows != height:
+        raise BaseGraphError(
+            "%s rows written in %s, %s expected" %
+            (n_of_rows, filename, height))
+
+
+# A class to put two or more images one above the other in the same image,
+# without building intermediate images
+class ImageStack():
+    """Stack images vertically. Only image headers are read when adding an
+    image, then each image is decoded once and written in the final PNG file
+    as a strip of rows, so memory is bounded by the largest image"""
+
+    def __init__(self):
+        """Instantiate the class"""
+
+        # Set image dimension
+        self.x = 0
+        self.y = 0
+
+        # image sources (filenames or file objects) and their sizes
+        self.sources = []
+        self.sizes = []
+
+        # This records the number of images loaded in this stack
+        self.n_of_images = 0
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def AddImage(self, source):
+        """Add an image (a filename or an open file object) to the bottom of
+        the stack. Only the image header is read"""
+
+        # PIL reads image size without decoding the image
+        image = Image.open(source)
+        x, y = image.size
+
+        # don't keep file open: filenames will be opened again when writing
+        if isinstance(source, types.StringTypes):
+            image.fp.close()
+
+        self.sources += [source]
+        self.sizes += [(x, y)]
+
+        # updating class attributes
+        self.n_of_images += 1
+        self.x = max(self.x, x)
+        self.y += y
+
+    def _open(self, source):
+        """Open and decode an image source as a RGB image"""
+
+        # rewind file objects, since they were read by AddImage
+        if not isinstance(source, types.StringTypes):
+            source.seek(0)
+
+        return Image.open(source).convert("RGB")
+
+    def IterStrips(self):
+        """Yields the final image as a numpy array of rows for each added
+        image. Images are padded with white on the right side"""
+
+        if self.n_of_images == 0:
+            raise ImageStackError("No images were added to this stack")
+
+        for source, (x, y) in zip(self.sources, self.sizes):
+            image = self._open(source)
+
+            strip = numpy.empty((y, self.x, 3), dtype=numpy.uint8)
+            strip[:, x:] = 255
+            strip[:, :x] = numpy.asarray(image, dtype=numpy.uint8)
+
+            # release image as soon as possible
+            del(image)
+
+            yield strip
+
+    def GetImage(self):
+        """Return the stacked images as a PIL image. The final image is
+        allocated once"""
+
+        if self.n_of_images == 0:
+            raise ImageStackError("No images were added to this stack")
+
+        image = Image.new('RGB', (self.x, self.y), color=(255, 255, 255))
+        y = 0
+
+        for source, size in zip(self.sources, self.sizes):
+            image.paste(self._open(source), (0, y))
+            y += size[1]
+
+        return image
+
+    def SaveFigure(self, filename, check=True):
+        """Write stacked images in a PNG file, one strip at a time. Other
+        formats (by filename extension, like PIL does) need the whole image.
+        Check for file existance"""
+
+        if self.n_of_images == 0:
+            # I have no image to save
+            raise ImageStackError("No images were added to this stack")
+
+        # checking for file existance
+        if os.path.exists(filename) and check is True:
+            raise ImageStackError("File %s exists!!!" % (filename))
+
+        if os.path.splitext(filename)[1].lower() == ".png":
+            _write_png(filename, self.x, self.y, self.IterStrips())
+
+        else:
+            self.GetImage().save(filename)
+
+        logger.info("Image saved in %s" % (filename))
+
+
 # Now a class to put two or more BaseGraph instances in the same image
 class MoreGraphs():
     """This class allows to put two BaseGraph images in the same image"""
@@ -1311,8 +1501,8 @@ class MoreGraphs():
         self.x = 0
         self.y = 0
 
-        # The image class attribute
-        self.image = None
+        # The images are stacked here
+        self.stack = ImageStack()
 
         # This records the number of BaseGraph classed loaded in this image
         self.n_of_graphs = 0
@@ -1348,55 +1538,26 @@ class MoreGraphs():
                 "%s doesn't seem to be initialized" %
                 (Graph))
 
-        # Ok. If I had a basegraph object, I need to save the figure in a
-        # temporary file
-        fd, imagefile = tempfile.mkstemp(suffix=".png")
+        # Keep the PNG image in memory, since Graph could be modified after
+        # this call. If labels were enlarged, the image is in a temporary file
+        if Graph.tempfile is None:
+            graph_image = StringIO.StringIO()
+            Graph.graph.writePng(graph_image)
 
-        # Save the image for the first time
-        Graph.SaveFigure(imagefile, check=False)
-
-        # Open the image file
-        graph_image = Image.open(imagefile)
-
-        # get current size
-        x, y = graph_image.size
-
-        # create a new temporary image
-        tmp_image = Image.new(
-            'RGB',
-            (max(
-                x,
-                self.x),
-                y + self.y),
-            color=(
-                255,
-                255,
-                255))
-
-        # Copy old data in the new image if necessary
-        if self.n_of_graphs > 0:
-            box = (0, 0, self.x, self.y)
-            region = self.image.crop(box)
-            tmp_image.paste(region, box)
-
-        # cut the graph_image. Define a box
-        box = (0, 0, x, y)
-        region = graph_image.crop(box)
-
-        # Define a box in which put an image. X will ne 0, by Y will be image
-        # heigth
-        box = (0, self.y, x, y + self.y)
-        tmp_image.paste(region, box)
+        else:
+            with open(Graph.tempfile, "rb") as handle:
+                graph_image = StringIO.StringIO(handle.read())
+
+        self.stack.AddImage(graph_image)
 
         # updating class attributes
-        self.image = tmp_image
         self.n_of_graphs += 1
-        self.x, self.y = self.image.size
+        self.x, self.y = self.stack.x, self.stack.y
 
     def SaveFigure(self, filename, check=True):
         """Save figure to a file. Check file existance"""
 
-        if self.image is None:
+        if self.n_of_graphs == 0:
             # I have no image to save
             raise MoreGraphsError(
                 "No BaseGraph or derivate were added to this class instance")
@@ -1405,17 +1566,647 @@ class MoreGraphs():
         if os.path.exists(filename) and check is True:
             raise MoreGraphsError("File %s exists!!!" % (filename))
 
-        # Determing if the Image is already drawn in temporary files
-        self.image.save(filename)
+        # write images one after the other
+        self.stack.SaveFigure(filename, check=check)
+
+
+# Functions used to draw elements as columns of pixels (a column for each
+# 'resolution' bp) without a GD image. They are used by TilePyramid
+def _aggregate_elements(elements, attribute, start, resolution, n_of_pixels):
+    """Summarize elements (windows, isochores or gaps) in pixel columns of
+    'resolution' bp, starting from 'start' position. Returns the average
+    values of 'attribute' (weighted by the bp of each element in a column), a
+    boolean array for gaps (a column is a gap if it is mostly covered by gaps)
+    and a boolean array of the columns which are covered by elements"""
+
+    # elements are sorted and not overlapping: the cumulative length (and
+    # the cumulative value) is a piecewise linear function of the position,
+    # and can be evaluated on columns boundaries with numpy.interp
+    starts = numpy.array([element.start for element in elements],
+                         dtype=numpy.float64)
+    ends = numpy.array([element.end for element in elements],
+                       dtype=numpy.float64)
+    is_gap = numpy.array([element.Class == "gap" for element in elements])
+    values = numpy.array(
+        [0.0 if element.Class == "gap" else getattr(element, attribute)
+         for element in elements], dtype=numpy.float64)
 
-        logger.info("Image saved in %s" % (filename))
+    sizes = ends - starts
+    covered_bp = numpy.where(is_gap, 0.0, sizes)
+    gap_bp = numpy.where(is_gap, sizes, 0.0)
+
+    # the position in which the function is known
+    xp = numpy.column_stack((starts, ends)).ravel()
+
+    # the columns boundaries
+    positions = start + numpy.arange(n_of_pixels + 1,
+                                     dtype=numpy.float64) * resolution
+
+    def columns_sum(lengths):
+        cumulative = numpy.cumsum(lengths)
+        fp = numpy.column_stack((cumulative - lengths, cumulative)).ravel()
+        return numpy.diff(numpy.interp(positions, xp, fp))
+
+    covered = columns_sum(covered_bp)
+    gaps = columns_sum(gap_bp)
+    weighted = columns_sum(values * covered_bp)
+
+    averages = numpy.zeros(n_of_pixels, dtype=numpy.float64)
+    mask = covered > 0
+    averages[mask] = weighted[mask] / covered[mask]
+
+    return averages, gaps > covered, (covered + gaps) > 0
+
+
+def _class_colors(n_of_classes):
+    """Returns a RGB color for each class, sorted by GClevel. With the
+    default five classes, they are constants.CLASS_COLORS. Otherwise colors
+    are interpolated between constants.CLASS_COLORS, from the GC poorest to
+    the GC richest class"""
+
+    if n_of_classes == len(constants.CLASS_COLORS):
+        return list(constants.CLASS_COLORS)
+
+    reference = numpy.linspace(0, 1, len(constants.CLASS_COLORS))
+    positions = numpy.linspace(0, 1, n_of_classes)
+
+    channels = [
+        numpy.interp(positions, reference,
+                     [color[i] for color in constants.CLASS_COLORS])
+        for i in range(3)]
+
+    return [tuple(int(round(channel[j])) for channel in channels)
+            for j in range(n_of_classes)]
+
+
+def _render_columns(values, gaps, covered, height, y_min, y_max,
+                    thresholds=None):
+    """Draw columns as a RGB numpy array with the same colors of
+    DrawChromosome rectangles (colored by class). thresholds are the sorted
+    class limits (default: constants.CLASS_TO_LEVEL)"""
+
+    width = len(values)
+
+    # The thresholds of each class, like BaseGraph.SetColorsList
+    if thresholds is None:
+        thresholds = Elements.GetClassScheme().levels
+
+    thresholds = numpy.array(thresholds)
+    palette = numpy.array(
+        _class_colors(len(thresholds)) + [constants.GAP_COLOR],
+        dtype=numpy.uint8)
+
+    # like GetColorByGClevel, a value higher than the last threshold is
+    # colored like the last class
+    colors = numpy.minimum(
+        numpy.searchsorted(thresholds, values, side="left"),
+        len(thresholds) - 1)
+    colors[gaps] = len(palette) - 1
+
+    # the height of each column. Values outside the limits are drawn on the
+    # limits. Gaps fill the whole column
+    tops = numpy.round(
+        height - (values - y_min) * float(height) / (y_max - y_min))
+    tops = numpy.clip(tops, 0, height).astype(numpy.int64)
+    tops[gaps] = 0
+    tops[~covered] = height
+
+    rows = numpy.arange(height).reshape(height, 1)
+    mask = rows >= tops.reshape(1, width)
+
+    image = numpy.empty((height, width, 3), dtype=numpy.uint8)
+    image[:] = 255
+    image[mask] = palette[colors][numpy.nonzero(mask)[1]]
+
+    return image
+
+
+def _render_tile(task):
+    """Draw a single tile in a PNG file. Called by TilePyramid.SaveTiles,
+    even in a worker process"""
+
+    filename, values, gaps, covered, height, y_min, y_max, thresholds = task
+
+    image = _render_columns(
+        values, gaps, covered, height, y_min, y_max, thresholds)
+    Image.fromarray(image, "RGB").save(filename)
+
+    return filename
+
+
+def _track_directory(directory, name):
+    """Returns the directory of a track inside directory, or None if name is
+    not a plain directory name (ie "", ".", ".." or a path)"""
+
+    if (not isinstance(name, types.StringTypes) or
+            name in ("", os.curdir, os.pardir) or os.sep in name or
+            (os.altsep is not None and os.altsep in name) or
+            os.path.isabs(name)):
+        return None
+
+    path = os.path.join(directory, name)
+    root = os.path.realpath(directory)
+
+    if os.path.dirname(os.path.realpath(path)) != root:
+        return None
+
+    return path
+
+
+# A class to render isochores in tiles at different zoom levels
+class TilePyramid():
+    """Render isochores and windows profiles in a pyramid of tiles (one
+    directory for each zoom level) suitable for an interactive viewer. Each
+    level has a resolution (bp for each pixel) which is two times the
+    resolution of the next level. Only tiles with some elements are drawn"""
+
+    def __init__(self, sequence_start=0, tile_size=constants.TILE_SIZE,
+                 min_resolution=constants.TILE_MIN_RESOLUTION, settings=None):
+        """Instantiate the class. Class limits and the y range are read from
+        settings (an Elements.Settings, default: GClib.constants)"""
+
+        self.sequence_start = sequence_start
+        self.tile_size = tile_size
+        self.settings = Elements.GetSettings(settings)
+
+        # the resolution (bp for pixel) of the most detailed level
+        self.min_resolution = min_resolution
+
+        # GClevel values comprised by settings (30 and 65) are expected
+        self.y_min = self.settings.y_min
+        self.y_max = self.settings.y_max
+
+        # defined by SetSequenceLength
+        self.sequence_length = None
+        self.n_of_levels = None
+        self.resolutions = None
+
+        # the track names and the elements to draw
+        self.tracks = []
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def SetMinMaxValues(self, min_value, max_value):
+        """Set the maximum and minimum values printable in tiles"""
+
+        if min_value > max_value:
+            min_value, max_value = max_value, min_value
+
+        self.y_min = min_value
+        self.y_max = max_value
+
+    def SetSequenceLength(self, sequence_length):
+        """Set sequence length and the number of zoom levels. The first level
+        (zoom 0) is a single tile with the whole sequence"""
+
+        self.sequence_length = int(sequence_length) - self.sequence_start
+
+        if self.sequence_length <= 0:
+            raise TilePyramidError(
+                "Sequence length must be higher than sequence start")
+
+        # doubling resolution until the whole sequence fits a single tile
+        resolution = self.min_resolution
+        self.resolutions = [resolution]
+
+        while resolution * self.tile_size < self.sequence_length:
+            resolution *= 2
+            self.resolutions.insert(0, resolution)
+
+        self.n_of_levels = len(self.resolutions)
+
+        # debug
+        logger.debug(
+            "Sequence %s bp; %s zoom levels (%s bp per pixel)" %
+            (self.sequence_length, self.n_of_levels, self.resolutions))
+
+    def AddTrack(self, name, elements, attribute):
+        """Add a list of elements to draw in a track. Attribute is the
+        elements value which determines the columns height"""
+
+        if len(elements) == 0:
+            raise TilePyramidError("No elements to draw for %s" % (name))
+
+        if name in [track[0] for track in self.tracks]:
+            raise TilePyramidError("Track %s already defined" % (name))
+
+        self.tracks += [(name, elements, attribute)]
+
+    def AddIsochoreTrack(self, isochores, name="isochores"):
+        """Add an isochore list to draw"""
+
+        self.AddTrack(name, isochores, "avg_GClevel")
+
+    def AddWindowTrack(self, windows, name="windows"):
+        """Add a window list to draw"""
+
+        self.AddTrack(name, windows, "GClevel")
+
+    def GetTasks(self, directory):
+        """Aggregate elements at each zoom level and return the tiles to
+        draw (the non empty ones)"""
+
+        # tiles are colored by the class limits of settings
+        thresholds = self.settings.GetClassScheme().levels
+
+        tasks = []
+
+        for name, elements, attribute in self.tracks:
+            for zoom, resolution in enumerate(self.resolutions):
+                # the columns of the whole sequence at this zoom level
+                n_of_tiles = int(numpy.ceil(
+                    float(self.sequence_length) /
+                    (resolution * self.tile_size)))
+                n_of_pixels = n_of_tiles * self.tile_size
+
+                values, gaps, covered = _aggregate_elements(
+                    elements, attribute, self.sequence_start, resolution,
+                    n_of_pixels)
+
+                for i in range(n_of_tiles):
+                    tile = slice(i * self.tile_size, (i + 1) * self.tile_size)
+
+                    # no tile without elements
+                    if not covered[tile].any():
+                        continue
+
+                    filename = os.path.join(
+                        directory, name, str(zoom), "%s.png" % (i))
+
+                    tasks += [(filename, values[tile], gaps[tile],
+                               covered[tile], self.tile_size, self.y_min,
+                               self.y_max, thresholds)]
+
+        return tasks
+
+    def _ClearTiles(self, directory):
+        """Remove the zoom levels (<track>/<zoom> directories) of the tracks
+        of this pyramid and of a previous one (described by its tiles.json)
+        from directory. Other files are not removed"""
+
+        names = [track[0] for track in self.tracks]
+        metadata_file = os.path.join(directory, "tiles.json")
+
+        if os.path.exists(metadata_file):
+            try:
+                with open(metadata_file) as handle:
+                    names += json.load(handle)["tracks"]
+
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Cannot read tracks from %s" % (metadata_file))
+
+            os.remove(metadata_file)
+
+        for name in set(names):
+            path = _track_directory(directory, name)
+
+            if path is None:
+                logger.warning("Ignoring track %r in %s" % (name, directory))
+                continue
+
+            if not os.path.isdir(path):
+                continue
+
+            # only the zoom levels written by a pyramid are removed
+            logger.debug("Removing old tiles in %s" % (path))
+
+            for zoom in os.listdir(path):
+                if zoom.isdigit() and os.path.isdir(os.path.join(path, zoom)):
+                    shutil.rmtree(os.path.join(path, zoom))
+
+            if os.listdir(path) == []:
+                os.rmdir(path)
+
+    def SaveTiles(self, directory, processes=1, check=True):
+        """Draw tiles in a directory (<track>/<zoom>/<tile>.png) and write
+        a tiles.json file which describes the pyramid. Tiles are drawn in
+        'processes' worker processes. Check for directory existance before
+        writing. Without check, the tiles of a previous pyramid in directory
+        are removed"""
+
+        if self.resolutions is None:
+            raise TilePyramidError(
+                "Sequence length must be defined by SetSequenceLength")
+
+        if self.tracks == []:
+            raise TilePyramidError("No tracks were added to this pyramid")
+
+        if os.path.exists(directory) and check is True:
+            raise TilePyramidError("Directory %s exists!!!" % (directory))
+
+        tasks = self.GetTasks(directory)
+
+        # tiles of a bigger or deeper pyramid would be mixed with the new ones
+        if os.path.exists(directory):
+            self._ClearTiles(directory)
+
+        # create all the directories before drawing tiles
+        for name, elements, attribute in self.tracks:
+            for zoom in range(self.n_of_levels):
+                path = os.path.join(directory, name, str(zoom))
+
+                if not os.path.exists(path):
+                    os.makedirs(path)
+
+        logger.debug("Drawing %s tiles with %s processes" %
+                     (len(tasks), processes))
+
+        if processes == 1:
+            for task in tasks:
+                _render_tile(task)
+
+        else:
+            pool = multiprocessing.Pool(processes=processes)
+
+            try:
+                pool.map(_render_tile, tasks, chunksize=16)
+                pool.close()
+
+            except BaseException:
+                pool.terminate()
+                raise
+
+            finally:
+                pool.join()
+
+        # describe the pyramid
+        levels = []
+
+        for zoom, resolution in enumerate(self.resolutions):
+            levels += [{
+                "zoom": zoom,
+                "resolution": resolution,
+                "n_of_tiles": int(numpy.ceil(
+                    float(self.sequence_length) /
+                    (resolution * self.tile_size)))}]
+
+        metadata = {
+            "sequence_start": self.sequence_start,
+            "sequence_length": self.sequence_length,
+            "tile_size": self.tile_size,
+            "y_min": self.y_min,
+            "y_max": self.y_max,
+            "tracks": [track[0] for track in self.tracks],
+            "levels": levels}
+
+        with open(os.path.join(directory, "tiles.json"), "w") as handle:
+            json.dump(metadata, handle, indent=2)
+
+        logger.info("%s tiles written in %s" % (len(tasks), directory))
+
+
+def _render_karyotype_row(task):
+    """Draw a chromosome row of a karyotype as a RGB numpy array. Called by
+    DrawKaryotype.SaveFigure, even in a worker process"""
+
+    (name, elements, width, border, scale, row_height, row_space, y_min,
+     y_max, thresholds) = task
+
+    strip = numpy.empty((row_space + row_height, width, 3), dtype=numpy.uint8)
+    strip[:] = 255
+
+    # chromosomes are drawn from their first position with the same scale
+    n_of_pixels = int(numpy.ceil(float(elements[-1].end) / scale))
+
+    values, gaps, covered = _aggregate_elements(
+        elements, "avg_GClevel", 0, scale, n_of_pixels)
+
+    strip[row_space:, border:border + n_of_pixels] = _render_columns(
+        values, gaps, covered, row_height, y_min, y_max, thresholds)
+
+    # write the chromosome name on the left side of the row
+    image = Image.fromarray(strip, "RGB")
+    draw = ImageDraw.Draw(image)
+    myfont = ImageFont.truetype(constants.graph_font_type, 30)
+    draw.text((10, row_space + row_height / 2 - 15), name, font=myfont,
+              fill=(0, 0, 0))
+
+    return numpy.asarray(image, dtype=numpy.uint8)
+
+
+# A class to draw many chromosomes in the same image
+class DrawKaryotype():
+    """Draw the isochores of many chromosomes (a row for each chromosome)
+    with the same scale and a single legend. Rows are drawn in parallel and
+    written directly in the final image"""
+
+    def __init__(self, scale=30000, settings=None):
+        """Instantiate the class. Class limits and the y range are read from
+        settings (an Elements.Settings, default: GClib.constants)"""
+
+        # the bp for each pixel, shared by all chromosomes
+        self.scale = scale
+        self.settings = Elements.GetSettings(settings)
+
+        # the space on the left (chromosome names) and on the right
+        self.border = 110
+        self.right_border = 20
+
+        # the upper space for legend and ruler
+        self.top = 70
+
+        # the height of a chromosome and the space between rows
+        self.row_height = 100
+        self.row_space = 15
+
+        # GClevel values comprised by settings (30 and 65) are expected
+        self.y_min = self.settings.y_min
+        self.y_max = self.settings.y_max
+
+        # the chromosome names and their isochores
+        self.chromosomes = []
+
+        # image size, defined by SetImageSize
+        self.x = None
+        self.y = None
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def SetMinMaxValues(self, min_value, max_value):
+        """Set the maximum and minimum values printable in the graphs"""
+
+        if min_value > max_value:
+            min_value, max_value = max_value, min_value
+
+        self.y_min = min_value
+        self.y_max = max_value
+
+    def AddIsochores(self, name, isochores):
+        """Add a chromosome by its name and its isochores list"""
+
+        if len(isochores) == 0:
+            raise DrawKaryotypeError("No isochores to draw for %s" % (name))
+
+        self.chromosomes += [(str(name), isochores)]
+
+    def AddChromosome(self, chromosome, name=None):
+        """Add a GClib.Elements.Chromosome instance with isochores"""
+
+        if name is None:
+            name = chromosome.name
+
+        self.AddIsochores(name, chromosome.isochores)
+
+    def LoadIsochores(self, infile, name=None):
+        """Add a chromosome from an isochore CSV file (as written by
+        Chromosome.DumpIsochores). The file name is the default name"""
+
+        if name is None:
+            name = os.path.splitext(os.path.basename(infile))[0]
+
+        chromosome = Elements.Chromosome()
+        chromosome.LoadIsochores(infile)
+
+        self.AddIsochores(name, chromosome.isochores)
+
+    def SetImageSize(self):
+        """Determine image size relying on the longest chromosome"""
+
+        if self.chromosomes == []:
+            raise DrawKaryotypeError(
+                "No chromosomes were added to this karyotype")
+
+        max_length = max([isochores[-1].end
+                          for name, isochores in self.chromosomes])
+
+        self.x = (self.border + int(numpy.ceil(float(max_length) / self.scale))
+                  + self.right_border)
+        self.y = self.top + len(self.chromosomes) * (
+            self.row_space + self.row_height)
+
+        # debug
+        logger.debug(
+            "%s chromosomes (max %s bp); image size %sx%s pixels" %
+            (len(self.chromosomes), max_length, self.x, self.y))
+
+    def DrawHeader(self):
+        """Draw the legend and the Mb ruler. Returns a RGB numpy array"""
+
+        image = Image.new('RGB', (self.x, self.top), color=(255, 255, 255))
+        draw = ImageDraw.Draw(image)
+        myfont = ImageFont.truetype(constants.graph_font_type, 20)
+
+        # One color for each class. The possible values are sorted by
+        # GClevel in settings
+        items = self.settings.class_to_level
+        labels = [element[0] for element in items] + ["gap"]
+        colors = _class_colors(len(items)) + [constants.GAP_COLOR]
+
+        # a box and a label for each class
+        position = self.border
+
+        for label, color in zip(labels, colors):
+            draw.rectangle((position, 10, position + 20, 30), fill=color,
+                           outline=(0, 0, 0))
+            draw.text((position + 25, 8), label, font=myfont, fill=(0, 0, 0))
+            position += 80
+
+        # the ruler, with a tick every 10 Mb and a label every 50 Mb
+        y1 = self.top - 10
+        x2 = self.x - self.right_border
+        draw.line((self.border, y1, x2, y1), fill=(0, 0, 0), width=2)
+
+        tick = 10000000
+
+        for i in range(0, (x2 - self.border) * self.scale + 1, tick):
+            position = self.border + int(i / self.scale)
+            draw.line((position, y1 - 5, position, y1), fill=(0, 0, 0))
+
+            if i % (tick * 5) == 0:
+                draw.text((position + 3, y1 - 25), str(i / 1000000),
+                          font=myfont, fill=(0, 0, 0))
+
+        draw.text((10, y1 - 25), "Mb", font=myfont, fill=(0, 0, 0))
+
+        return numpy.asarray(image, dtype=numpy.uint8)
+
+    def GetTasks(self):
+        """Return the arguments to draw each row"""
+
+        thresholds = self.settings.GetClassScheme().levels
+
+        return [(name, isochores, self.x, self.border, self.scale,
+                 self.row_height, self.row_space, self.y_min, self.y_max,
+                 thresholds)
+                for name, isochores in self.chromosomes]
+
+    def SaveFigure(self, filename, processes=1, check=True):
+        """Draw the karyotype in a PNG file. Rows are drawn by 'processes'
+        worker processes and written as soon as they are drawn. Check for
+        file existance before writing"""
+
+        # checking for file existance
+        if os.path.exists(filename) and check is True:
+            raise DrawKaryotypeError("File %s exists!!!" % (filename))
+
+        self.SetImageSize()
+
+        tasks = self.GetTasks()
+
+        if processes == 1:
+            rows = itertools.imap(_render_karyotype_row, tasks)
+
+            _write_png(filename, self.x, self.y,
+                       itertools.chain([self.DrawHeader()], rows))
+
+        else:
+            pool = multiprocessing.Pool(processes=processes)
+
+            try:
+                # imap returns rows in the same order of tasks
+                rows = pool.imap(_render_karyotype_row, tasks)
+
+                _write_png(filename, self.x, self.y,
+                           itertools.chain([self.DrawHeader()], rows))
+                pool.close()
+
+            except BaseException:
+                pool.terminate()
+                raise
+
+            finally:
+                pool.join()
+
+        logger.info("Image written in %s" % (filename))
 
 
 class DrawFamilies:
     """A class to plot isochores families in histograms"""
 
-    def __init__(self, families=None):
-        """Instantiate the class starting from Families Element"""
+    def __init__(self, families=None, settings=None):
+        """Instantiate the class starting from Families Element. Bins are
+        colored by the class limits of settings (an Elements.Settings,
+        default: GClib.constants)"""
 
         if families.__class__ != Elements.Families or families.data == {}:
             raise DrawFamiliesError(
@@ -1434,25 +2225,29 @@ class DrawFamilies:
         self.fig = pyplot.figure(figsize=(13, 13 / scale))
         self.fontsize = 20  # "x-large"
 
-        levels = sorted(constants.CLASS_TO_LEVEL.items(), key=lambda x: x[1])
+        # classes and limits, sorted by limit
+        levels = Elements.GetSettings(settings).class_to_level
 
-        mycolorslist = ["#0064FF", "#00C8FF", "#FFFF00", "#FF8200", "#FF0000"]
+        mycolorslist = ["#%02X%02X%02X" % (color)
+                        for color in _class_colors(len(levels))]
 
-        # instantiate a bar graph
-        for bin, bin_data in self.families.data.iteritems():
-            #print "%s:%s" %(bins[i], data[i]),
-            length = bin_data["size"]
+        # sizes (in Mb) of each bin, in bins order
+        bins = numpy.array(sorted(self.families.data.keys()))
+        lengths = numpy.array(
+            [self.families.data[bin]["size"] for bin in bins])
+        lengths = numpy.floor(lengths / 1e6 + 0.5)
 
-            for i, (name, level) in enumerate(levels):
-                if bin <= level:
-                    break
-            color = mycolorslist[i]
+        # each bin get the color of the first class whose level is greater
+        # or equal than bin
+        indexes = numpy.searchsorted(
+            [level for name, level in levels], bins, side="left")
+        indexes = numpy.clip(indexes, 0, len(levels) - 1)
+        colors = [mycolorslist[i] for i in indexes]
 
-            self.all_bar += [
-                pyplot.bar(
-                    bin - families.bin_size * 0.2, int(round(length / 1e6, 0)),
-                    width=0.4 * families.bin_size, bottom=0, color=color,
-                )]
+        # instantiate a bar graph with all bins
+        self.all_bar = pyplot.bar(
+            bins - families.bin_size * 0.2, lengths,
+            width=0.4 * families.bin_size, bottom=0, color=colors)
 
         # setting axes
         self.x_min = int(round(families.min_value / families.precision, 0))
@@ -1570,6 +2365,143 @@ class DrawFamilies:
 
         logger.info("Image written in %s" % (filename))
 
+
+def _format_size(size):
+    """Format a size in bp as a label"""
+
+    for unit, value in (("Mb", 1e6), ("Kb", 1e3)):
+        if size >= value:
+            return "%g %s" % (round(size / value, 1), unit)
+
+    return "%g bp" % (round(size, 1))
+
+
+class DrawFamilies2D(DrawFamilies):
+    """A class to plot 2-D isochores families histograms: GC bins by isochore
+    size bins, or GC bins by groups (ie species)"""
+
+    def __init__(self, families=None, dimension="size", normalize=False):
+        """Instantiate the class starting from Families Element. dimension
+        could be 'size' or 'group'. If normalize is True, each row is
+        expressed as the percentage of its total size"""
+
+        if families.__class__ != Elements.Families or families.data == {}:
+            raise DrawFamiliesError(
+                "This class must be instantiated only by a valid Families "
+                "Element Class""")
+
+        if dimension not in ("size", "group"):
+            raise DrawFamiliesError(
+                "dimension must be 'size' or 'group', not %s" % (dimension))
+
+        # setting families element
+        self.families = families
+        self.dimension = dimension
+
+        # Image proportions
+        scale = 20.0 / 12
+
+        self.fig = pyplot.figure(figsize=(13, 13 / scale))
+        self.axes = self.fig.add_subplot(1, 1, 1)
+        self.fontsize = 20  # "x-large"
+
+        # a row for each size bin or group, a column for each GC bin
+        if dimension == "size":
+            data = families.size_data.T
+
+        else:
+            data = families.group_data.T
+
+        data = data.astype(numpy.float64)
+
+        if normalize:
+            totals = data.sum(axis=1)[:, numpy.newaxis]
+            data = numpy.where(
+                totals > 0, data * 100.0 / numpy.maximum(totals, 1), 0)
+
+        else:
+            data = data / 1e6
+
+        self.data = data
+        self.normalize = normalize
+
+        # the whole histogram is drawn as a single image
+        half_bin = families.bin_size / 2.0
+        extent = [families.min_value - half_bin,
+                  families.max_value + half_bin, 0, data.shape[0]]
+
+        self.image = self.axes.imshow(
+            data, origin="lower", aspect="auto", interpolation="nearest",
+            extent=extent, cmap="viridis")
+
+        colorbar = self.fig.colorbar(self.image, ax=self.axes)
+        colorbar.set_label("%" if normalize else "Mb", size=self.fontsize)
+
+        # setting axes
+        self.x_min = int(round(families.min_value / families.precision, 0))
+        self.x_max = int(round(families.max_value / families.precision, 0))
+
+    def DrawAxisLabels(self):
+        """Set axis label"""
+
+        self.axes.set_xlabel('GC', size=self.fontsize)
+
+        if self.dimension == "size":
+            # ticks on size bins edges. Label only powers of ten, if any
+            edges = self.families.size_bins
+            logs = numpy.log10(edges)
+            powers = numpy.isclose(logs, numpy.round(logs))
+
+            if not powers.any():
+                powers[:] = True
+
+            mylabels = [_format_size(edge) if power else ''
+                        for edge, power in zip(edges, powers)]
+
+            self.axes.set_yticks(numpy.arange(len(edges)))
+            self.axes.set_yticklabels(mylabels, size=self.fontsize)
+            self.axes.set_ylabel('Isochore size', size=self.fontsize)
+
+        else:
+            # a label in the middle of each group
+            self.axes.set_yticks(numpy.arange(len(self.families.groups)) + 0.5)
+            self.axes.set_yticklabels(self.families.groups, size=self.fontsize)
+
+        for label in self.axes.get_xticklabels():
+            label.set_size(self.fontsize)
+
+    def SetAxisLimits(self, axis=[0, 0, 0, 0]):
+        """Setting axis [Xmin, Xmax]. Y values are defined by histogram rows"""
+
+        # function call without parameters. Setting axis relying on x_max,
+        # x_min if both are equal to 0
+        if axis[0] == 0 and axis[1] == 0:
+            axis = [self.x_min, self.x_max]
+
+        self.axes.set_xlim(axis[0], axis[1])
+
+    def DrawGrid(self):
+        """Draw grid in grapsh"""
+
+        self.axes.grid(linewidth=1)
+
+    def DrawTitle(self, title):
+        """Draws title in graph"""
+
+        self.axes.set_title(title, size=self.fontsize)
+
+    def SaveFigure(self, filename, dpi=100):
+        """Draw the image in a new file. DPI quality can be specified"""
+
+        # checking for file existance
+        if os.path.exists(filename):
+            raise DrawFamiliesError("File %s exists!!!" % (filename))
+
+        # save picture in file
+        self.fig.savefig(filename, dpi=dpi)
+
+        logger.info("Image written in %s" % (filename))
+
 # debug: define a test function to works on BaseGraph
 
 
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+
+Created on Mon Oct 19 17:20:31 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A module to measure the steps of a segmentation: elapsed time, peak memory
+(resident set size) and some counters (windows, gaps, isochores, ...) for each
+stage. A stage could be profiled with cProfile
+
+"""
+
+import sys
+import json
+import time
+import cProfile
+import logging
+import resource
+import contextlib
+
+from . import __copyright__, __license__, __version__
+
+__author__ = "Paolo Cozzi <paolo.cozzi@ptp.it>"
+
+# for logging messages
+logger = logging.getLogger(__name__)
+
+
+# Exceptions definitions
+class ProfilerError(Exception):
+    pass
+
+
+def PeakRSS():
+    """Returns the peak resident memory of this process (MB)"""
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on OSX, Kb elsewhere
+    if sys.platform == "darwin":
+        return peak / 1024.0 ** 2
+
+    return peak / 1024.0
+
+
+# A class to measure the stages of a pipeline
+class Profiler:
+    """Record elapsed time, peak memory and counters of each stage. A stage
+    starts with Start(name) and ends with Stop() or when another stage starts.
+    If profile_stage is defined, that stage is profiled with cProfile and
+    statistics are written in profile_file"""
+
+    def __init__(self, profile_stage=None, profile_file=None):
+        # a list of dictionaries, one for each stage
+        self.stages = []
+
+        # the running stage
+        self.current = None
+        self.start_time = None
+
+        self.profile_stage = profile_stage
+        self.profile_file = profile_file
+        self.profile = None
+
+        if profile_stage is not None:
+            if profile_file is None:
+                self.profile_file = "%s.prof" % (profile_stage)
+
+            self.profile = cProfile.Profile()
+
+        # when the profiler was created
+        self.created = time.time()
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def Start(self, name):
+        """Start a new stage (the running stage is stopped)"""
+
+        if self.current is not None:
+            self.Stop()
+
+        self.current = {
+            "name": name,
+            "peak_rss_before": PeakRSS(),
+            "counters": {}}
+
+        if self.profile is not None and name == self.profile_stage:
+            self.profile.enable()
+
+        self.start_time = time.time()
+
+    def Stop(self):
+        """Stop the running stage"""
+
+        if self.current is None:
+            raise ProfilerError("No stage is running")
+
+        elapsed = time.time() - self.start_time
+
+        if self.profile is not None and \
+                self.current["name"] == self.profile_stage:
+            self.profile.disable()
+
+        self.current["elapsed"] = elapsed
+        self.current["peak_rss"] = PeakRSS()
+
+        logger.debug(
+            "Stage %s completed in %.3f seconds (peak RSS %.1f MB)" %
+            (self.current["name"], elapsed, self.current["peak_rss"]))
+
+        self.stages.append(self.current)
+        self.current = None
+
+    @contextlib.contextmanager
+    def Stage(self, name):
+        """Measure a with block as a stage"""
+
+        self.Start(name)
+
+        try:
+            yield self
+
+        finally:
+            self.Stop()
+
+    def Count(self, name, value):
+        """Set a counter of the running stage, or of the last stage if no
+        stage is running"""
+
+        if self.current is not None:
+            stage = self.current
+
+        elif len(self.stages) > 0:
+            stage = self.stages[-1]
+
+        else:
+            raise ProfilerError("No stage to count %s" % (name))
+
+        stage["counters"][name] = value
+
+    def GetReport(self):
+        """Returns a dictionary with all stages"""
+
+        if self.current is not None:
+            self.Stop()
+
+        return {
+            "elapsed": time.time() - self.created,
+            "peak_rss": PeakRSS(),
+            "stages": self.stages}
+
+    def DumpReport(self, filename):
+        """Write the report in a JSON file, and cProfile statistics if a stage
+        was profiled"""
+
+        with open(filename, "w") as handle:
+            json.dump(self.GetReport(), handle, indent=2)
+
+        if self.profile is not None:
+            self.profile.dump_stats(self.profile_file)
+            logger.info(
+                "cProfile statistics of %s written in %s" %
+                (self.profile_stage, self.profile_file))
+
+        logger.info("Profile report written in %s" % (filename))
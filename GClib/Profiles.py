@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+
+
+Created on Mon Oct 19 22:14:37 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A module to calculate dinucleotide (DN) and trinucleotide (TN) profiles. The
+sequence is encoded once, and the cumulative k-mer counts are stored in blocks
+(like Elements.GCIndex does for G+C): the k-mer counts of any window or
+isochore are calculated without reading its sequence again
+
+"""
+
+import logging
+import itertools
+
+import numpy
+
+from . import Utility
+
+from . import __copyright__, __license__, __version__
+
+__author__ = "Paolo Cozzi <paolo.cozzi@ptp.it>"
+
+# for logging messages
+logger = logging.getLogger(__name__)
+
+
+# Exceptions definitions
+class ProfileError(Exception):
+    pass
+
+
+# the bases of k-mers. Their index is the code of each base
+BASES = "ACGT"
+
+# a lookup table for base codes. Other bases (N, S, ...) have code 4, and
+# break the k-mers
+BASE_CODES = numpy.zeros(256, dtype=numpy.uint8) + len(BASES)
+
+for code, base in enumerate(BASES):
+    BASE_CODES[ord(base)] = code
+    BASE_CODES[ord(base.lower())] = code
+
+
+def Kmers(k):
+    """Returns the k-mers of length k, in the same order of their codes"""
+
+    return ["".join(kmer) for kmer in itertools.product(BASES, repeat=k)]
+
+
+def _encode(codes, k):
+    """Returns the k-mer codes of every position of an array of base codes,
+    and a boolean mask of the k-mers made only by A, C, G and T"""
+
+    n_of_kmers = max(0, len(codes) - k + 1)
+
+    kmers = numpy.zeros(n_of_kmers, dtype=numpy.intp)
+    valid = numpy.ones(n_of_kmers, dtype=numpy.bool_)
+
+    for i in range(k):
+        bases = codes[i:i + n_of_kmers]
+        kmers *= len(BASES)
+        kmers += bases
+        valid &= (bases < len(BASES))
+
+    return kmers, valid
+
+
+class KmerIndex:
+    """Cumulative k-mer counts of a sequence in blocks of block_size bp, for
+    each k of k_values. A k-mer is counted at its first base. sequence could be
+    a string, a bytearray or a Utility.SharedSequence"""
+
+    def __init__(self, sequence, k_values=(1, 2, 3), block_size=4096):
+
+        if isinstance(sequence, Utility.SharedSequence):
+            sequence = sequence.data
+
+        if len(k_values) == 0 or min(k_values) < 1:
+            raise ProfileError("k values must be positive: %s" % (k_values))
+
+        # a read-only view of the sequence string, without copying it
+        self.sequence = numpy.frombuffer(sequence, dtype=numpy.uint8)
+        self.k_values = tuple(sorted(set(k_values)))
+        self.block_size = block_size
+        self.size = len(self.sequence)
+
+        n_of_blocks = self.size // block_size
+
+        # blocks[k][i] are the k-mer counts of the first i blocks
+        self.blocks = {}
+
+        for k in self.k_values:
+            self.blocks[k] = numpy.zeros(
+                (n_of_blocks + 1, len(BASES) ** k), dtype=numpy.int64)
+
+        # the k-mers starting in the last bases of a block end in the next one
+        overlap = max(self.k_values) - 1
+
+        # encoding bases in chunks of blocks, to limit memory usage. Each chunk
+        # is encoded once for all k values
+        chunk = max(1, 2 ** 20 // block_size)
+
+        for i in range(0, n_of_blocks, chunk):
+            j = min(i + chunk, n_of_blocks)
+            codes = numpy.take(
+                BASE_CODES,
+                self.sequence[i * block_size:j * block_size + overlap])
+
+            # the block of each k-mer in this chunk
+            rows = numpy.arange((j - i) * block_size) // block_size
+
+            for k in self.k_values:
+                kmers, valid = _encode(codes, k)
+
+                # the last k-mers of the sequence could be missing
+                kmers = kmers[:len(rows)]
+                valid = valid[:len(rows)]
+
+                n_of_kmers = len(BASES) ** k
+                counts = numpy.bincount(
+                    rows[:len(kmers)][valid] * n_of_kmers + kmers[valid],
+                    minlength=(j - i) * n_of_kmers)
+
+                self.blocks[k][i + 1:j + 1] = counts.reshape(
+                    j - i, n_of_kmers)
+
+        for k in self.k_values:
+            numpy.cumsum(self.blocks[k], axis=0, out=self.blocks[k])
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        mystr = "%s instance at %s\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            if key in ("sequence", "blocks"):
+                continue
+
+            mystr += "\t\"%s\" => %s\n" % (key, value)
+
+        return mystr
+
+    def __repr__(self):
+        return self.__str__()
+
+    def _CheckK(self, k):
+        """Raise an exception if k-mers of length k aren't counted"""
+
+        if k not in self.blocks:
+            raise ProfileError(
+                "%s-mers are not indexed (k values: %s)" % (k, self.k_values))
+
+    def _CountKmers(self, start, stop, k):
+        """Count the k-mers starting between start and stop"""
+
+        if stop <= start:
+            return numpy.zeros(len(BASES) ** k, dtype=numpy.int64)
+
+        kmers, valid = _encode(
+            numpy.take(BASE_CODES, self.sequence[start:stop + k - 1]), k)
+
+        return numpy.bincount(
+            kmers[valid], minlength=len(BASES) ** k).astype(numpy.int64)
+
+    def Count(self, start, end, k):
+        """Returns the counts of each k-mer (see Kmers) between start and end
+        (python coordinates). Only the k-mers inside the interval are
+        counted"""
+
+        self._CheckK(k)
+
+        # the k-mers inside the interval start before stop
+        stop = max(start, end - k + 1)
+
+        # the first and the last whole block inside the interval
+        first = -(-start // self.block_size)
+        last = stop // self.block_size
+
+        if first >= last:
+            return self._CountKmers(start, stop, k)
+
+        return (self.blocks[k][last] - self.blocks[k][first] +
+                self._CountKmers(start, first * self.block_size, k) +
+                self._CountKmers(last * self.block_size, stop, k))
+
+    def _Prefixes(self, positions, k, chunk=2 ** 20):
+        """Returns the counts of the k-mers starting before each position. The
+        bases of the partial blocks are read about chunk bases at a time"""
+
+        positions = numpy.asarray(positions, dtype=numpy.int64)
+        blocks = positions // self.block_size
+        offsets = positions - blocks * self.block_size
+
+        prefixes = self.blocks[k][blocks]
+
+        # only the positions inside a block need its bases
+        inside = numpy.flatnonzero(offsets > 0)
+        groups = numpy.cumsum(offsets[inside]) // chunk
+        n_of_kmers = len(BASES) ** k
+
+        for selected in numpy.split(
+                inside, numpy.flatnonzero(numpy.diff(groups)) + 1):
+            if len(selected) == 0:
+                continue
+
+            # the positions of the bases before each position in its block:
+            # row is the index of the position in this selection
+            lengths = offsets[selected]
+            rows = numpy.repeat(numpy.arange(len(selected)), lengths)
+            firsts = numpy.cumsum(lengths) - lengths
+            bases = (numpy.arange(len(rows)) - firsts[rows] +
+                     blocks[selected][rows] * self.block_size)
+
+            kmers = numpy.zeros(len(rows), dtype=numpy.intp)
+            valid = numpy.ones(len(rows), dtype=numpy.bool_)
+
+            for i in range(k):
+                # the last k-mers of the sequence are incomplete
+                outside = (bases + i >= self.size)
+                codes = numpy.take(BASE_CODES, numpy.take(
+                    self.sequence, numpy.minimum(bases + i, self.size - 1)))
+                codes[outside] = len(BASES)
+
+                kmers *= len(BASES)
+                kmers += codes
+                valid &= (codes < len(BASES))
+
+            counts = numpy.bincount(
+                rows[valid] * n_of_kmers + kmers[valid],
+                minlength=len(selected) * n_of_kmers)
+
+            prefixes[selected] += counts.reshape(len(selected), n_of_kmers)
+
+        return prefixes
+
+    def Counts(self, starts, ends, k):
+        """Returns the k-mer counts between starts and ends (arrays of python
+        coordinates), one row for each interval. Counts are calculated by
+        numpy, without the GIL"""
+
+        self._CheckK(k)
+
+        starts = numpy.asarray(starts, dtype=numpy.int64)
+        stops = numpy.maximum(
+            starts, numpy.asarray(ends, dtype=numpy.int64) - k + 1)
+
+        prefixes = self._Prefixes(numpy.concatenate([starts, stops]), k)
+
+        return prefixes[len(starts):] - prefixes[:len(starts)]
+
+
+def Frequencies(counts):
+    """Returns the frequencies of k-mer counts (one row for each interval).
+    Intervals without k-mers have NaN frequencies"""
+
+    counts = numpy.asarray(counts, dtype=numpy.float64)
+    totals = counts.sum(axis=-1)[..., numpy.newaxis]
+
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        return counts / totals
+
+
+def CpGRatio(bases, dinucleotides):
+    """Returns the CpG observed/expected ratio from base counts and
+    dinucleotide counts (see KmerIndex.Counts), as (CG / dinucleotides) /
+    (C / bases * G / bases). The ratio is NaN without C or G"""
+
+    bases = numpy.asarray(bases, dtype=numpy.float64)
+    dinucleotides = numpy.asarray(dinucleotides, dtype=numpy.float64)
+
+    C, G = BASES.index("C"), BASES.index("G")
+    CG = C * len(BASES) + G
+
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        observed = dinucleotides[..., CG] / dinucleotides.sum(axis=-1)
+        expected = (bases[..., C] * bases[..., G] /
+                    bases.sum(axis=-1) ** 2)
+
+        ratio = observed / expected
+
+    # no expected CpG
+    return numpy.where(expected > 0, ratio, numpy.nan)
@@ -0,0 +1,536 @@
+# -*- coding: utf-8 -*-
+"""
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+
+Created on Mon Oct 19 15:40:12 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A local HTTP server to segment chromosomes. Chromosomes are read once and kept
+in memory (with their gaps and G+C counts) in a LRU cache, so that requests
+with different coordinates, window sizes or isochore sizes don't need to read
+FASTA files again
+
+"""
+
+import copy
+import json
+import time
+import logging
+import StringIO
+import urlparse
+import threading
+import collections
+import SocketServer
+import BaseHTTPServer
+import multiprocessing
+import multiprocessing.pool
+
+from . import Elements
+from . import Streaming
+from . import constants
+
+from . import __copyright__, __license__, __version__
+
+__author__ = "Paolo Cozzi <paolo.cozzi@ptp.it>"
+
+# for logging messages
+logger = logging.getLogger(__name__)
+
+
+# Exceptions definitions
+class ServerError(Exception):
+    pass
+
+
+class JobError(ServerError):
+    pass
+
+
+class ServerBusyError(ServerError):
+    pass
+
+
+class JobTimeoutError(ServerError):
+    pass
+
+
+# This class keeps the last used chromosomes in memory
+class ChromosomeCache:
+    """A LRU cache of Chromosome instances, with their gaps and G+C counts.
+    Genomes are a dictionary of names and FASTA files"""
+
+    def __init__(self, genomes, capacity=4):
+        self.genomes = dict(genomes)
+        self.capacity = capacity
+
+        # the last used chromosome is the last item
+        self.chromosomes = collections.OrderedDict()
+
+        # a lock to access chromosomes, and a lock to read a FASTA file at a
+        # time
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+
+        # the sequence ids of each genome, known after reading its whole FASTA
+        # file
+        self.ids = {}
+
+        # cache statistics
+        self.hits = 0
+        self.misses = 0
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def _GetCached(self, key):
+        """Returns a cached chromosome and marks it as the last used, or None
+        if it isn't in cache"""
+
+        with self.lock:
+            chromosome = self.chromosomes.pop(key, None)
+
+            if chromosome is not None:
+                self.chromosomes[key] = chromosome
+                self.hits += 1
+
+        return chromosome
+
+    def Get(self, genome, chrom):
+        """Returns a Chromosome instance, reading it if necessary"""
+
+        key = (genome, chrom)
+
+        chromosome = self._GetCached(key)
+
+        if chromosome is not None:
+            return chromosome
+
+        with self.load_lock:
+            # the chromosome could be read by another thread in the meanwhile
+            chromosome = self._GetCached(key)
+
+            if chromosome is not None:
+                return chromosome
+
+            chromosome = self.Load(genome, chrom)
+
+            with self.lock:
+                self.misses += 1
+                self.chromosomes[key] = chromosome
+
+                # removing the least recently used chromosomes
+                while len(self.chromosomes) > self.capacity:
+                    old_key, old_chromosome = self.chromosomes.popitem(
+                        last=False)
+                    logger.info("%s:%s removed from cache" % old_key)
+
+        return chromosome
+
+    def Load(self, genome, chrom):
+        """Read a chromosome from a genome FASTA file, and calculate its gaps
+        and G+C counts"""
+
+        if genome not in self.genomes:
+            raise JobError("Unknown genome %s" % (genome))
+
+        if genome in self.ids and chrom not in self.ids[genome]:
+            raise JobError("Chromosome %s not found in %s" % (chrom, genome))
+
+        start_time = time.time()
+
+        # reading stops at the requested chromosome: the other sequences are
+        # skipped without storing their bases
+        ids = set()
+        record = None
+        stream = Streaming.StreamFastaFile(self.genomes[genome])
+
+        try:
+            for record, chunks in stream:
+                ids.add(record.id)
+
+                if record.id != chrom:
+                    continue
+
+                for bases in chunks:
+                    record.data += bases
+
+                break
+
+            else:
+                # the whole file was read, so all its ids are known
+                self.ids[genome] = ids
+                raise JobError(
+                    "Chromosome %s not found in %s" % (chrom, genome))
+
+        finally:
+            stream.close()
+
+        chromosome = Elements.Chromosome(record)
+        chromosome.BuildGCIndex()
+
+        logger.info(
+            "%s:%s read in %.2f seconds" %
+            (genome, chrom, time.time() - start_time))
+
+        return chromosome
+
+    def GetStatus(self):
+        """Returns a dictionary with cache status"""
+
+        with self.lock:
+            return {
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "genomes": sorted(self.genomes.keys()),
+                "chromosomes": ["%s:%s" % key for key in self.chromosomes]}
+
+
+def _parse_int(params, name, default=None, minimum=0):
+    """Get an integer parameter from a request"""
+
+    value = params.get(name)
+
+    if value is None:
+        return default
+
+    try:
+        value = int(value)
+
+    except ValueError:
+        raise JobError("%s must be an integer, not %s" % (name, value))
+
+    if value < minimum:
+        raise JobError("%s must be at least %s" % (name, minimum))
+
+    return value
+
+
+def ParseJob(params):
+    """Check the parameters of a segmentation request. Coordinates are
+    1-based, like in isoSegmenter.py. Returns a dictionary of parameters"""
+
+    for name in ["genome", "chrom"]:
+        if name not in params:
+            raise JobError("%s must be specified" % (name))
+
+    job = {
+        "genome": params["genome"],
+        "chrom": params["chrom"],
+        "start": _parse_int(params, "start", default=1, minimum=1),
+        "end": _parse_int(params, "end", minimum=1),
+        "window_size": _parse_int(
+            params, "window_size", default=constants.WINDOW_SIZE, minimum=1),
+        "gap_tolerance": _parse_int(
+            params, "gap_tolerance", default=constants.GAP_TOLERANCE),
+        "min_size": _parse_int(
+            params, "min_size", default=constants.ISO_MIN_SIZE, minimum=1),
+        "y_min": _parse_int(params, "y_min", default=constants.GRAPH_GC_MIN),
+        "y_max": _parse_int(params, "y_max", default=constants.GRAPH_GC_MAX),
+        "format": params.get("format", "csv")}
+
+    if job["format"] not in ("csv", "json", "png"):
+        raise JobError("format must be csv, json or png")
+
+    if job["end"] is not None and job["end"] < job["start"]:
+        raise JobError("end must be greater than start")
+
+    # the settings of this job only: jobs are executed by threads of the
+    # same process
+    try:
+        job["settings"] = Elements.Settings(
+            window_size=job["window_size"],
+            gap_tolerance=job["gap_tolerance"],
+            min_size=job["min_size"],
+            y_min=job["y_min"],
+            y_max=job["y_max"])
+
+    except Elements.SettingsError as message:
+        raise JobError(str(message))
+
+    return job
+
+
+def Segment(chromosome, start=0, end=None, window_size=None,
+            gap_tolerance=None, min_size=None, settings=None):
+    """Calculate windows and isochores on a copy of a chromosome, which shares
+    sequence, gaps and G+C counts with the original one. Coordinates are
+    0-based. settings (an Elements.Settings) are used by the copy only"""
+
+    job_chromosome = copy.copy(chromosome)
+    job_chromosome.windows = []
+    job_chromosome.isochores = []
+
+    if settings is not None:
+        job_chromosome.settings = settings
+
+    job_chromosome.ValueWindows(
+        window_size=window_size,
+        From=start,
+        To=end,
+        gap_tolerance=gap_tolerance)
+
+    job_chromosome.FindIsochores(min_size=min_size)
+
+    return job_chromosome
+
+
+def FormatIsochores(chromosome, format="csv"):
+    """Returns isochores as CSV or JSON string"""
+
+    if format == "csv":
+        handle = StringIO.StringIO()
+        chromosome.DumpIsochores(handle)
+        return handle.getvalue()
+
+    isochores = []
+
+    for isochore in chromosome.isochores:
+        record = {
+            "start": isochore.start + 1,
+            "end": isochore.end,
+            "size": isochore.size,
+            "class": isochore.Class,
+            "avg_GClevel": None,
+            "stddev_GClevel": None}
+
+        if isochore.Class != "gap":
+            record["avg_GClevel"] = isochore.avg_GClevel
+
+            if len(isochore) > 1:
+                record["stddev_GClevel"] = isochore.stddev_GClevel
+
+        isochores.append(record)
+
+    return json.dumps({"chrom": chromosome.name, "isochores": isochores})
+
+
+def DrawIsochores(chromosome, start, end, y_min, y_max):
+    """Draw isochores like isoSegmenter.py does. Returns the PNG image"""
+
+    # the plotting stack is loaded only when an image is requested
+    from . import Graphs
+
+    graph = Graphs.DrawChromosome(
+        sequence_start=start, settings=chromosome.settings)
+    graph.SetMinMaxValues(y_min, y_max)
+    graph.SetSequenceLength(end)
+    graph.InitPicture()
+    graph.SetHorizontalLines(
+        [level for Class, level in graph.settings.class_to_level[:-1]])
+    graph.SetColorsList(colorbyclass=True)
+    graph.DrawIsochoreRectangles(isochores=chromosome.isochores)
+    graph.DrawChName(chromosome.name)
+    graph.FinishPicture(drawlabels=False)
+
+    # the image is written in a temporary file by EnlargeLabels
+    graph.EnlargeLabels()
+
+    with open(graph.tempfile, "rb") as handle:
+        return handle.read()
+
+
+def _run_job(cache, job, slots):
+    """Execute a segmentation job. Returns the response body and its content
+    type"""
+
+    try:
+        chromosome = cache.Get(job["genome"], job["chrom"])
+
+        # coordinates are 0-based
+        start = job["start"] - 1
+        end = job["end"]
+
+        if end is None or end > chromosome.size:
+            end = chromosome.size
+
+        try:
+            job_chromosome = Segment(
+                chromosome, start=start, end=end,
+                window_size=job["window_size"],
+                gap_tolerance=job["gap_tolerance"],
+                min_size=job["min_size"],
+                settings=job["settings"])
+
+        except Elements.ChromosomeError as message:
+            raise JobError(str(message))
+
+        if job["format"] == "png":
+            body = DrawIsochores(
+                job_chromosome, start, end, job["y_min"], job["y_max"])
+            return body, "image/png"
+
+        body = FormatIsochores(job_chromosome, format=job["format"])
+
+        if job["format"] == "json":
+            return body, "application/json"
+
+        return body, "text/csv"
+
+    finally:
+        # this job doesn't occupy the queue anymore
+        slots.release()
+
+
+class SegmentationHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Handle GET /segment and GET /status requests"""
+
+    server_version = "isoSegmenter/%s" % (__version__)
+
+    def _SendResponse(self, code, body, content_type):
+        """Send a response to the client"""
+
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _SendError(self, code, message):
+        """Send an error as JSON"""
+
+        self._SendResponse(
+            code, json.dumps({"error": message}), "application/json")
+
+    def do_GET(self):
+        url = urlparse.urlparse(self.path)
+
+        if url.path == "/status":
+            self._SendResponse(
+                200, json.dumps(self.server.GetStatus()), "application/json")
+
+        elif url.path == "/segment":
+            params = dict(urlparse.parse_qsl(url.query))
+            start_time = time.time()
+
+            try:
+                body, content_type = self.server.Submit(params)
+
+            except JobError as message:
+                self._SendError(400, str(message))
+
+            except ServerBusyError as message:
+                self._SendError(503, str(message))
+
+            except JobTimeoutError as message:
+                self._SendError(504, str(message))
+
+            except Exception as message:
+                # ie an unreadable FASTA file, or a rendering error
+                logger.exception("Error serving %s" % (self.path))
+                self._SendError(500, "Internal error: %s" % (message))
+
+            else:
+                self._SendResponse(200, body, content_type)
+
+                logger.info(
+                    "%s served in %.3f seconds" %
+                    (self.path, time.time() - start_time))
+
+        else:
+            self._SendError(404, "%s not found" % (url.path))
+
+    def log_message(self, format, *args):
+        logger.debug(
+            "%s - %s" % (self.address_string(), format % args))
+
+
+class SegmentationServer(SocketServer.ThreadingMixIn,
+                         BaseHTTPServer.HTTPServer):
+    """A HTTP server to segment chromosomes. Jobs are executed by a bounded
+    pool of threads. At most max_pending jobs could be queued or running, and
+    each request waits its job for job_timeout seconds"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, genomes, cache_size=4, workers=2,
+                 max_pending=16, job_timeout=60):
+
+        BaseHTTPServer.HTTPServer.__init__(self, address, SegmentationHandler)
+
+        self.cache = ChromosomeCache(genomes, capacity=cache_size)
+        self.workers = workers
+        self.pool = multiprocessing.pool.ThreadPool(processes=workers)
+        self.max_pending = max_pending
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.job_timeout = job_timeout
+
+    def Submit(self, params):
+        """Submit a segmentation job, and wait for its result"""
+
+        job = ParseJob(params)
+
+        # slots are released by jobs, when they finish
+        if not self.slots.acquire(False):
+            raise ServerBusyError(
+                "Too many pending jobs (%s)" % (self.max_pending))
+
+        try:
+            result = self.pool.apply_async(
+                _run_job, (self.cache, job, self.slots))
+
+        except BaseException:
+            self.slots.release()
+            raise
+
+        try:
+            return result.get(self.job_timeout)
+
+        except multiprocessing.TimeoutError:
+            raise JobTimeoutError(
+                "Job not completed in %s seconds" % (self.job_timeout))
+
+    def GetStatus(self):
+        """Returns a dictionary with server status"""
+
+        return {
+            "version": __version__,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "job_timeout": self.job_timeout,
+            "cache": self.cache.GetStatus()}
+
+    def server_close(self):
+        BaseHTTPServer.HTTPServer.server_close(self)
+        self.pool.terminate()
+        self.pool.join()
@@ -0,0 +1,592 @@
+# -*- coding: utf-8 -*-
+"""
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+
+
+Created on Mon Oct 19 21:05:12 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A module to segment sequences read in chunks, without storing them: gaps and
+window G+C levels are calculated on the fly, and only windows are kept. The
+windows are the same of Elements.Chromosome.ValueWindows. Isochores could be
+found while windows are evaluated too: they are the same of
+Elements.Chromosome.FindIsochores
+
+"""
+
+import os
+import csv
+import sys
+import types
+import logging
+
+import numpy
+
+from . import Utility
+from . import Elements
+
+from . import __copyright__, __license__, __version__
+
+__author__ = "Paolo Cozzi <paolo.cozzi@ptp.it>"
+
+# for logging messages
+logger = logging.getLogger(__name__)
+
+
+# Exceptions definitions
+class StreamingError(Exception):
+    pass
+
+
+# lookup tables for G+C bases (like Elements.GCIndex) and for gap bases
+IS_GC = numpy.zeros(256, dtype=numpy.bool_)
+IS_N = numpy.zeros(256, dtype=numpy.bool_)
+
+for base in "GCSgcs":
+    IS_GC[ord(base)] = True
+
+for base in "Nn":
+    IS_N[ord(base)] = True
+
+
+class WindowStream:
+    """Evaluates the windows and gaps of a sequence given in chunks. Feed()
+    returns the windows (and the gaps bigger than gap_tolerance) which can't
+    change anymore, Close() the last ones. Only the bases of the current window
+    (and of an N run shorter than gap_tolerance) are kept. Missing values are
+    read from settings (an Elements.Settings, default: GClib.constants)"""
+
+    def __init__(self, window_size=None, From=None, To=None,
+                 gap_tolerance=None, settings=None):
+        settings = Elements.GetSettings(settings)
+
+        if window_size is None:
+            window_size = settings.window_size
+
+        if gap_tolerance is None:
+            gap_tolerance = settings.gap_tolerance
+
+        if From is None:
+            From = 0
+
+        self.settings = settings
+        self.scheme = settings.GetClassScheme()
+        self.window_size = window_size
+        self.gap_tolerance = gap_tolerance
+        self.From = From
+        self.To = To
+
+        # the bases read, their G+C count and all the gaps (N runs)
+        self.size = 0
+        self.n_of_gc = 0
+        self.gaps = []
+
+        # the start of an N run not yet terminated
+        self.run_start = None
+
+        # the start of the next window. counts[i] is the G+C count between
+        # base and base + i. If skip, the bases in an N run bigger than
+        # gap_tolerance are not counted
+        self.start = From
+        self.base = From
+        self.counts = numpy.zeros(1, dtype=numpy.int64)
+        self.skip = False
+
+        self.closed = False
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def _GetTo(self):
+        """The end of the windows: None is the sequence end, unknown until
+        Close()"""
+
+        if self.To is None:
+            return float("inf")
+
+        return self.To
+
+    def _Append(self, bases, offset, start, end):
+        """Count G+C of bases between start and end (bases start at
+        offset)"""
+
+        start = max(start, self.From, self.base + len(self.counts) - 1)
+        end = min(end, self._GetTo())
+
+        if start >= end:
+            return
+
+        gc = IS_GC[bases[start - offset:end - offset]]
+        counts = numpy.cumsum(gc, dtype=numpy.int64)
+        counts += self.counts[-1]
+
+        self.counts = numpy.concatenate((self.counts, counts))
+
+    def _Window(self, start, end):
+        """A new window, like Elements.Chromosome.ValueWindows. Its class is
+        assigned by Feed() or Close()"""
+
+        count = self.counts[end - self.base] - self.counts[start - self.base]
+
+        window = Elements.Window(start=start, end=end)
+        window.GClevel = round(int(count) * 100.0 / (end - start), 6)
+
+        return window
+
+    def _Windows(self, limit):
+        """Returns all the windows which end before limit"""
+
+        windows = []
+        limit = min(limit, self._GetTo())
+
+        while self.start + self.window_size <= limit:
+            windows.append(
+                self._Window(self.start, self.start + self.window_size))
+            self.start += self.window_size
+
+        # G+C counts before the window start aren't needed anymore
+        if self.start > self.base:
+            self.counts = self.counts[self.start - self.base:]
+            self.base = self.start
+
+        return windows
+
+    def _Gap(self, start, end):
+        """Returns the windows before a gap bigger than gap_tolerance, and the
+        gap between From and To"""
+
+        start = max(start, self.From)
+        end = min(end, self._GetTo())
+
+        windows = self._Windows(start)
+
+        # a window ends at gap start
+        if self.start < start:
+            windows.append(self._Window(self.start, start))
+
+        windows.append(Elements.Gap(start=start, end=end))
+
+        # windows start again after the gap
+        self.start = end
+        self.base = end
+        self.counts = numpy.zeros(1, dtype=numpy.int64)
+        self.skip = False
+
+        return windows
+
+    def _Run(self, start, end):
+        """A terminated N run. Returns the windows which can't change
+        anymore"""
+
+        self.gaps.append(Elements.Gap(start=start, end=end))
+
+        # only gaps bigger than gap tolerance, and which overlap user
+        # coordinates, can affect windows
+        if (end - start > self.gap_tolerance and end > self.From and
+                start < self._GetTo()):
+            return self._Gap(start, end)
+
+        return []
+
+    def Feed(self, chunk):
+        """Add a chunk of bases (a string or a bytearray). Returns the windows
+        and gaps which can't change anymore"""
+
+        if self.closed:
+            raise StreamingError("Stream is closed")
+
+        bases = numpy.frombuffer(chunk, dtype=numpy.uint8)
+        offset = self.size
+
+        self.size += len(bases)
+        self.n_of_gc += int(numpy.count_nonzero(IS_GC[bases]))
+
+        # the N runs of this chunk
+        is_n = numpy.zeros(len(bases) + 2, dtype=numpy.int8)
+        is_n[1:-1] = IS_N[bases]
+        changes = numpy.diff(is_n)
+        run_starts = numpy.flatnonzero(changes == 1) + offset
+        run_ends = numpy.flatnonzero(changes == -1) + offset
+
+        windows = []
+
+        # a run terminated at chunk start
+        if self.run_start is not None and (
+                len(run_starts) == 0 or run_starts[0] != offset):
+            windows += self._Run(self.run_start, offset)
+            self.run_start = None
+
+        # the bases counted
+        position = offset
+
+        for start, end in zip(run_starts, run_ends):
+            start, end = int(start), int(end)
+
+            # a run started in a previous chunk
+            if start == offset and self.run_start is not None:
+                start = self.run_start
+
+            # a run which could continue in the next chunk
+            if end == self.size:
+                self.run_start = start
+
+                # a gap bigger than tolerance: its bases aren't needed
+                if (end - start > self.gap_tolerance and
+                        end > self.From and not self.skip):
+                    self._Append(bases, offset, position, start)
+                    self.skip = True
+
+                break
+
+            self.run_start = None
+
+            # bases before a gap are counted before windows are evaluated
+            if not self.skip:
+                self._Append(bases, offset, position, end)
+
+            position = end
+            windows += self._Run(start, end)
+
+        if not self.skip:
+            self._Append(bases, offset, position, self.size)
+
+        # windows could be evaluated until an N run, or the end of the chunk
+        if self.run_start is not None:
+            windows += self._Windows(self.run_start)
+
+        else:
+            windows += self._Windows(self.size)
+
+        Elements.ClassifyWindows(windows, self.scheme)
+
+        return windows
+
+    def Close(self):
+        """Terminate the sequence. Returns the last windows and gaps"""
+
+        if self.closed:
+            return []
+
+        self.closed = True
+
+        if self.From >= self.size:
+            raise StreamingError(
+                "It makes no sense to start from a position higher than "
+                "chromosome length (%s >= %s)" % (self.From + 1, self.size))
+
+        windows = []
+
+        if self.run_start is not None:
+            windows += self._Run(self.run_start, self.size)
+            self.run_start = None
+
+        # the last windows end at sequence end, or at user end
+        if self.To is None or self.To > self.size:
+            self.To = self.size
+
+        windows += self._Windows(self.To)
+
+        if self.start < self.To:
+            windows.append(self._Window(self.start, self.To))
+            self.start = self.To
+
+        Elements.ClassifyWindows(windows, self.scheme)
+
+        return windows
+
+    def GetGClevel(self):
+        """The G+C percentage of the bases read, like Bio.SeqUtils.GC"""
+
+        if self.size == 0:
+            return 0.0
+
+        return self.n_of_gc * 100.0 / self.size
+
+
+def IterWindows(chunks, window_size=None, From=None, To=None,
+                gap_tolerance=None, stream=None, settings=None):
+    """Returns the windows and gaps of a sequence given in chunks, as soon as
+    they can't change anymore. A WindowStream could be passed to read the
+    gaps and G+C content when chunks are terminated"""
+
+    if stream is None:
+        stream = WindowStream(
+            window_size=window_size, From=From, To=To,
+            gap_tolerance=gap_tolerance, settings=settings)
+
+    for chunk in chunks:
+        for window in stream.Feed(chunk):
+            yield window
+
+    for window in stream.Close():
+        yield window
+
+
+def StreamChromosome(chunks, name=None, window_size=None, From=None, To=None,
+                     gap_tolerance=None, settings=None):
+    """Returns an Elements.Chromosome with the windows of a sequence given in
+    chunks. The sequence isn't stored in the chromosome"""
+
+    stream = WindowStream(
+        window_size=window_size, From=From, To=To,
+        gap_tolerance=gap_tolerance, settings=settings)
+
+    chromosome = Elements.Chromosome(settings=settings)
+    chromosome.windows = list(IterWindows(chunks, stream=stream))
+    chromosome.name = name
+    chromosome.size = stream.size
+    chromosome.gaps = stream.gaps
+    chromosome.GClevel = stream.GetGClevel()
+
+    logger.debug("%s windows streamed" % (len(chromosome.windows)))
+
+    return chromosome
+
+
+def StreamFastaFile(fasta_file, block_size=2 ** 20, threads=None):
+    """Returns (record, chunks) tuples of a fasta file (also compressed),
+    like Utility.StreamFasta"""
+
+    # compressed files are recognized by their content
+    if Utility.CompressionFormat(fasta_file) is not None:
+        handle = Utility.CompressedFile(fasta_file, threads=threads)
+
+    else:
+        handle = open(fasta_file, "rb")
+
+    with handle:
+        for record, chunks in Utility.StreamFasta(handle, block_size):
+            yield record, chunks
+
+
+class IsochoreStream:
+    """Finds the isochores of windows given one at a time, like
+    Elements.Chromosome.FindIsochores. Isochores are never joined through a
+    gap, so the isochores before a gap are final when the gap is added: Add()
+    returns them, Close() the last ones. Only the isochores after the last gap
+    are kept. Missing values are read from settings (an Elements.Settings,
+    default: GClib.constants)"""
+
+    def __init__(self, min_size=None, settings=None):
+        settings = Elements.GetSettings(settings)
+
+        if min_size is None:
+            min_size = settings.min_size
+
+        self.settings = settings
+        self.scheme = settings.GetClassScheme()
+        self.min_size = min_size
+
+        # the isochores after the last gap (step 1 of FindIsochores)
+        self.isochores = []
+        self.gap = None
+
+        # the first two isochores of a chromosome are never filtered
+        self.first = True
+
+        self.n_of_windows = 0
+        self.n_of_merges = 0
+        self.closed = False
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def _Reduce(self, gap=None):
+        """Filter and merge the isochores between the last gap and gap (or
+        the chromosome end). Returns the final isochores"""
+
+        if len(self.isochores) == 0:
+            return []
+
+        # gaps are needed to filter isochores like in the whole chromosome
+        before = []
+        after = []
+
+        if self.gap is not None:
+            before = [self.gap]
+
+        if gap is not None:
+            after = [gap]
+
+        isochores = before + self.isochores + after
+
+        # the first isochores after a gap are filtered, but not at
+        # chromosome start
+        if self.first is True:
+            first = 2
+
+        else:
+            first = 1
+
+        self.n_of_merges += Elements._reduce_isochores(
+            isochores, self.min_size, first=first, scheme=self.scheme)
+
+        self.first = False
+        self.isochores = []
+
+        return isochores[len(before):len(isochores) - len(after)]
+
+    def Add(self, window):
+        """Add a window or a gap. Returns the isochores which can't change
+        anymore"""
+
+        if self.closed:
+            raise StreamingError("Stream is closed")
+
+        self.n_of_windows += 1
+
+        if window.Class == "gap":
+            isochores = self._Reduce(gap=window) + [window]
+            self.gap = window
+
+            return isochores
+
+        Elements._add_window(self.isochores, window, self.scheme)
+
+        return []
+
+    def Close(self):
+        """Terminate the windows. Returns the last isochores"""
+
+        if self.closed:
+            return []
+
+        self.closed = True
+
+        if self.n_of_windows == 0:
+            raise StreamingError(
+                "Windows must be calculated to find isochores")
+
+        return self._Reduce()
+
+
+def IterIsochores(windows, min_size=None, stream=None, settings=None):
+    """Returns the isochores of windows (an iterator), as soon as they can't
+    change anymore. An IsochoreStream could be passed to read the number of
+    merges when windows are terminated"""
+
+    if stream is None:
+        stream = IsochoreStream(min_size=min_size, settings=settings)
+
+    for window in windows:
+        for isochore in stream.Add(window):
+            yield isochore
+
+    for isochore in stream.Close():
+        yield isochore
+
+
+def _dump_rows(elements, outfile, header, row):
+    """Write the elements of an iterator in a CSV file while they are
+    returned, and yield them"""
+
+    if isinstance(outfile, types.StringType):
+        if os.path.exists(outfile):
+            raise StreamingError(
+                "File %s exists. I cannot overwrite it" % (outfile))
+
+        handle = open(outfile, "w")
+
+    else:
+        handle = outfile
+
+    try:
+        csv_writer = csv.writer(handle, lineterminator="\n")
+        csv_writer.writerow(header)
+
+        for element in elements:
+            csv_writer.writerow(row(element))
+            handle.flush()
+
+            yield element
+
+    finally:
+        if handle is not outfile:
+            handle.close()
+            logger.info("CSV file written in %s" % (outfile))
+
+
+def Segment(chunks, outfile=sys.stdout, windowfile=None, window_size=None,
+            From=None, To=None, gap_tolerance=None, min_size=None,
+            settings=None):
+    """Segment a sequence given in chunks. Windows (if windowfile is
+    provided) and isochores are written in CSV files, like
+    Elements.Chromosome.DumpWindows and DumpIsochores, as soon as they are
+    final. Returns the WindowStream and the IsochoreStream used"""
+
+    window_stream = WindowStream(
+        window_size=window_size, From=From, To=To,
+        gap_tolerance=gap_tolerance, settings=settings)
+    isochore_stream = IsochoreStream(min_size=min_size, settings=settings)
+
+    windows = IterWindows(chunks, stream=window_stream)
+
+    if windowfile is not None:
+        windows = _dump_rows(
+            windows, windowfile, Elements.WINDOWS_HEADER,
+            Elements._window_row)
+
+    isochores = IterIsochores(windows, stream=isochore_stream)
+
+    if outfile is not None:
+        isochores = _dump_rows(
+            isochores, outfile, Elements.ISOCHORES_HEADER,
+            Elements._isochore_row)
+
+    for isochore in isochores:
+        pass
+
+    return window_stream, isochore_stream
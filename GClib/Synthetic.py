@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+
+Created on Mon Oct 19 17:55:02 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A module to generate synthetic chromosomes with a known isochore structure.
+Isochores are planted with a class (drawn from CLASS_WEIGHTS) and a GC level
+inside the class limits. The local composition follows a first order Markov
+(autoregressive) process around the isochore GC level, and CpG dinucleotides
+are depleted like in vertebrate genomes. Gaps (N) are placed at random and at
+chromosome ends. Sequences are generated in chunks, so they could be written
+in FASTA files of any size with a limited memory. The planted isochores could
+be written like Chromosome.DumpIsochores does, to evaluate a segmentation
+
+"""
+
+import os
+import csv
+import sys
+import gzip
+import numpy
+import logging
+
+from . import constants
+
+from . import __copyright__, __license__, __version__
+
+__author__ = "Paolo Cozzi <paolo.cozzi@ptp.it>"
+
+# for logging messages
+logger = logging.getLogger(__name__)
+
+
+# Exceptions definitions
+class SyntheticError(Exception):
+    pass
+
+
+# The frequency of each isochore class in the human genome (Costantini et al.
+# 2006)
+CLASS_WEIGHTS = {"L1": 0.19, "L2": 0.37, "H1": 0.31, "H2": 0.11, "H3": 0.03}
+
+# The GC limits of L1 and H3 planted isochores (the other limits are
+# constants.CLASS_TO_LEVEL)
+GC_MIN = 33
+GC_MAX = 58
+
+# bases as bytes, G+C first
+BASES = numpy.array([ord(base) for base in "CGAT"], dtype=numpy.uint8)
+
+# the sequence is always generated in units of this size, so that it doesn't
+# depend on the chunk size requested
+UNIT_SIZE = 2 ** 20
+
+# a lookup table of G+C bytes
+IS_GC = numpy.zeros(256, dtype=bool)
+IS_GC[[ord(base) for base in "GCgc"]] = True
+
+
+def ClassLimits(Class):
+    """Returns the GC limits of an isochore class"""
+
+    classes = sorted(
+        constants.CLASS_TO_LEVEL.keys(),
+        key=lambda Class: constants.CLASS_TO_LEVEL[Class])
+
+    index = classes.index(Class)
+
+    lower = GC_MIN if index == 0 else constants.CLASS_TO_LEVEL[
+        classes[index - 1]]
+    upper = GC_MAX if index == len(classes) - 1 else \
+        constants.CLASS_TO_LEVEL[Class]
+
+    return lower, upper
+
+
+# A class to generate a synthetic chromosome
+class SyntheticChromosome:
+    """A synthetic chromosome. The layout (isochores and gaps) is defined when
+    the class is instantiated, while the sequence is generated in chunks by
+    Chunks(). The same seed gives the same sequence"""
+
+    def __init__(self, name="synthetic", size=10 ** 7, isochore_size=10 ** 6,
+                 min_isochore_size=2 * 10 ** 5, class_weights=None,
+                 margin=0.5, block_size=1000, rho=0.9, local_stddev=1.0,
+                 cpg_depletion=0.75, gap_density=1.0,
+                 gap_size=(10000, 100000), telomere_size=10000, seed=None):
+        """size is in bp. Isochores have an exponential size distribution of
+        mean isochore_size (at least min_isochore_size). Their GC level is
+        uniform in class limits, margin far from boundaries. Local GC level
+        changes every block_size bp, with autocorrelation rho and stddev
+        local_stddev (in percentage). A cpg_depletion fraction of CpG is
+        mutated to TpG or CpA. Gaps have a density for Mb and a size between
+        gap_size values"""
+
+        if size <= 2 * telomere_size:
+            raise SyntheticError(
+                "size must be greater than telomeres (%s)" % (
+                    2 * telomere_size))
+
+        if class_weights is None:
+            class_weights = CLASS_WEIGHTS
+
+        # a seed is needed to generate the same sequence many times
+        if seed is None:
+            seed = numpy.random.randint(2 ** 31 - 1)
+
+        self.name = name
+        self.size = int(size)
+        self.isochore_size = isochore_size
+        self.min_isochore_size = min_isochore_size
+        self.class_weights = class_weights
+        self.margin = margin
+        self.block_size = block_size
+        self.rho = rho
+        self.local_stddev = local_stddev
+        self.cpg_depletion = cpg_depletion
+        self.gap_density = gap_density
+        self.gap_size = gap_size
+        self.telomere_size = telomere_size
+        self.seed = seed
+
+        # the chromosome layout: a list of [start, end, Class, GClevel]. Gaps
+        # have a "gap" class and no GClevel
+        self.layout = []
+
+        # the GC level (0-1) of each block of block_size bp
+        self.block_gc = None
+
+        # the G+C count at the start of each layout element (and at the end)
+        self.gc_counts = None
+
+        self._Plan()
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def _Plan(self):
+        """Define isochores, gaps and the local GC levels"""
+
+        random = numpy.random.RandomState(self.seed)
+
+        classes = sorted(self.class_weights.keys())
+        weights = numpy.array(
+            [self.class_weights[Class] for Class in classes], dtype=float)
+        weights /= weights.sum()
+
+        # planted isochores: adjacent isochores have different classes
+        isochores = []
+        start = 0
+        previous = None
+
+        while start < self.size:
+            length = max(
+                int(random.exponential(self.isochore_size)),
+                self.min_isochore_size)
+            end = min(start + length, self.size)
+
+            Class = previous
+
+            while Class == previous:
+                Class = classes[random.choice(len(classes), p=weights)]
+
+            lower, upper = ClassLimits(Class)
+            GClevel = random.uniform(
+                lower + self.margin, upper - self.margin)
+
+            isochores.append([start, end, Class, GClevel])
+
+            start = end
+            previous = Class
+
+        # gaps: telomeres and random gaps, then merged if they overlap
+        gaps = []
+
+        if self.telomere_size > 0:
+            gaps.append([0, self.telomere_size])
+            gaps.append([self.size - self.telomere_size, self.size])
+
+        for i in range(int(self.gap_density * self.size / 1e6)):
+            length = random.randint(self.gap_size[0], self.gap_size[1] + 1)
+            start = random.randint(max(self.size - length, 1))
+            gaps.append([start, min(start + length, self.size)])
+
+        merged = []
+
+        for start, end in sorted(gaps):
+            if len(merged) > 0 and start <= merged[-1][1]:
+                merged[-1][1] = max(end, merged[-1][1])
+
+            else:
+                merged.append([start, end])
+
+        # cutting isochores with gaps
+        self.layout = []
+        position = 0
+
+        for gap_start, gap_end in merged + [[self.size, self.size]]:
+            for start, end, Class, GClevel in isochores:
+                start, end = max(start, position), min(end, gap_start)
+
+                if start < end:
+                    self.layout.append([start, end, Class, GClevel])
+
+            if gap_start < gap_end:
+                self.layout.append([gap_start, gap_end, "gap", None])
+
+            position = gap_end
+
+        # local GC levels: an autoregressive process around the isochore GC
+        # level. Gaps have GC level 0
+        n_of_blocks = (self.size + self.block_size - 1) // self.block_size
+        self.block_gc = numpy.zeros(n_of_blocks)
+
+        noise = random.normal(
+            0, self.local_stddev * numpy.sqrt(1 - self.rho ** 2),
+            n_of_blocks)
+
+        deviation = 0.0
+
+        for start, end, Class, GClevel in isochores:
+            first = start // self.block_size
+            last = (end + self.block_size - 1) // self.block_size
+
+            for i in xrange(first, last):
+                deviation = self.rho * deviation + noise[i]
+                self.block_gc[i] = GClevel + deviation
+
+        self.block_gc = numpy.clip(self.block_gc / 100.0, 0, 1)
+
+        # CpG depletion removes a G+C from cpg_depletion * gc ** 2 / 4 bases:
+        # the G+C probability is raised to keep the expected GC level
+        if self.cpg_depletion > 0:
+            self.block_gc = (1 - numpy.sqrt(
+                1 - self.cpg_depletion * self.block_gc)) / (
+                    self.cpg_depletion / 2)
+
+        logger.debug(
+            "%s planned: %s elements (%s gaps)" %
+            (self.name, len(self.layout), len(merged)))
+
+    def _GenerateChunk(self, random, start, end):
+        """Returns a chunk of the sequence as a uint8 array"""
+
+        # the G+C probability of each base
+        gc = numpy.repeat(
+            self.block_gc[start // self.block_size:
+                          (end - 1) // self.block_size + 1],
+            self.block_size)
+        offset = start % self.block_size
+        gc = gc[offset:offset + end - start]
+
+        # a single random number decides the base: C in [0, gc/2), G in
+        # [gc/2, gc), A in [gc, (1+gc)/2), T in [(1+gc)/2, 1)
+        values = random.random_sample(end - start)
+
+        index = (values >= gc / 2).view(numpy.uint8)
+        index += (values >= gc).view(numpy.uint8)
+        index += (values >= (1 + gc) / 2).view(numpy.uint8)
+
+        chunk = BASES[index]
+
+        # CpG depletion: CG becomes TG or CA
+        if self.cpg_depletion > 0:
+            cpg = numpy.flatnonzero(
+                (chunk[:-1] == ord("C")) & (chunk[1:] == ord("G")))
+            cpg = cpg[random.random_sample(len(cpg)) < self.cpg_depletion]
+            to_tg = random.randint(2, size=len(cpg)).astype(bool)
+
+            chunk[cpg[to_tg]] = ord("T")
+            chunk[cpg[~to_tg] + 1] = ord("A")
+
+        # gaps
+        for gap_start, gap_end, Class, GClevel in self.layout:
+            if Class == "gap" and gap_start < end and gap_end > start:
+                chunk[max(gap_start, start) - start:
+                      min(gap_end, end) - start] = ord("N")
+
+        return chunk
+
+    def _Units(self):
+        """Generate the sequence in units of UNIT_SIZE bp"""
+
+        random = numpy.random.RandomState(self.seed + 1)
+
+        for start in xrange(0, self.size, UNIT_SIZE):
+            yield self._GenerateChunk(
+                random, start, min(start + UNIT_SIZE, self.size))
+
+    def _Resize(self, chunk_size):
+        """Returns units as chunks of chunk_size bp"""
+
+        buffer = numpy.empty(0, dtype=numpy.uint8)
+
+        for unit in self._Units():
+            if len(buffer) > 0:
+                buffer = numpy.concatenate([buffer, unit])
+
+            else:
+                buffer = unit
+
+            while len(buffer) >= chunk_size:
+                yield buffer[:chunk_size]
+                buffer = buffer[chunk_size:]
+
+        if len(buffer) > 0:
+            yield buffer
+
+    def Chunks(self, chunk_size=UNIT_SIZE):
+        """Generate the sequence in chunks of chunk_size bp (uint8 arrays).
+        G+C counts of each layout element are recorded while generating"""
+
+        # the boundaries of layout elements
+        boundaries = numpy.array(
+            [element[0] for element in self.layout] + [self.size])
+
+        gc_counts = numpy.zeros(len(boundaries), dtype=numpy.int64)
+        total = 0
+
+        start = 0
+
+        for chunk in self._Resize(chunk_size):
+            end = start + len(chunk)
+
+            # G+C count at each boundary inside this chunk
+            cumulative = numpy.concatenate(
+                [[0], numpy.cumsum(IS_GC[chunk])])
+
+            first = numpy.searchsorted(boundaries, start, side="right")
+            last = numpy.searchsorted(boundaries, end, side="right")
+            gc_counts[first:last] = total + cumulative[
+                boundaries[first:last] - start]
+
+            total += cumulative[-1]
+            start = end
+
+            yield chunk
+
+        self.gc_counts = gc_counts
+
+    def GetSequence(self):
+        """Returns the whole sequence as a string"""
+
+        return "".join([chunk.tostring() for chunk in self.Chunks()])
+
+    def GetIsochores(self):
+        """Returns the planted isochores and gaps, with their measured GC
+        level, as a list of [start, end, Class, GClevel] (0-based
+        coordinates)"""
+
+        # GC counts are determined while generating the sequence
+        if self.gc_counts is None:
+            for chunk in self.Chunks():
+                pass
+
+        isochores = []
+
+        for i, (start, end, Class, GClevel) in enumerate(self.layout):
+            if Class != "gap":
+                GClevel = float(
+                    self.gc_counts[i + 1] - self.gc_counts[i]) / (
+                        end - start) * 100
+
+            isochores.append([start, end, Class, GClevel])
+
+        return isochores
+
+    def DumpIsochores(self, outfile=sys.stdout):
+        """Dumps the planted isochores in CSV, like Chromosome.DumpIsochores
+        (without STDDEV_GClevel). The output could be an open file handle or a
+        filename to write on"""
+
+        flag_close = False
+
+        if not hasattr(outfile, "write"):
+            if os.path.exists(outfile):
+                raise SyntheticError(
+                    "File %s exists. I cannot overwrite it" % (outfile))
+
+            outfile = open(outfile, "w")
+            flag_close = True
+
+        csv_writer = csv.writer(outfile, lineterminator="\n")
+        csv_writer.writerow(
+            ["Start", "End", "Size", "Class", "AVG_GClevel", "STDDEV_GClevel"])
+
+        for start, end, Class, GClevel in self.GetIsochores():
+            if Class == "gap":
+                csv_writer.writerow(
+                    [start + 1, end, end - start, Class, None, None])
+
+            else:
+                csv_writer.writerow(
+                    [start + 1, end, end - start, Class, "%.6f" % (GClevel),
+                     None])
+
+        if flag_close is True:
+            outfile.close()
+
+# end of class SyntheticChromosome
+
+
+def _format_lines(chunk, line_width):
+    """Add a newline every line_width bases of a chunk. Returns a string"""
+
+    n_of_lines = len(chunk) // line_width
+
+    lines = numpy.empty((n_of_lines, line_width + 1), dtype=numpy.uint8)
+    lines[:, :line_width] = chunk[:n_of_lines * line_width].reshape(
+        n_of_lines, line_width)
+    lines[:, line_width] = ord("\n")
+
+    data = lines.tostring()
+
+    # the last (partial) line
+    if len(chunk) > n_of_lines * line_width:
+        data += chunk[n_of_lines * line_width:].tostring() + "\n"
+
+    return data
+
+
+def WriteFasta(outfile, chromosomes, line_width=60, compresslevel=1):
+    """Write synthetic chromosomes in a FASTA file. outfile could be an open
+    file handle (even an in-memory buffer) or a filename. Filenames ending
+    with .gz are compressed"""
+
+    flag_close = False
+
+    if not hasattr(outfile, "write"):
+        if os.path.splitext(outfile)[1] == ".gz":
+            handle = gzip.open(outfile, "wb", compresslevel)
+
+        else:
+            handle = open(outfile, "wb")
+
+        flag_close = True
+
+    else:
+        handle = outfile
+
+    # chunks must be a multiple of line width
+    chunk_size = line_width * 2 ** 14
+
+    for chromosome in chromosomes:
+        handle.write(">%s\n" % (chromosome.name))
+
+        for chunk in chromosome.Chunks(chunk_size=chunk_size):
+            handle.write(_format_lines(chunk, line_width))
+
+        logger.info(
+            "%s (%s bp) written" % (chromosome.name, chromosome.size))
+
+    if flag_close is True:
+        handle.close()
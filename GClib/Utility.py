@@ -35,9 +35,20 @@ A class in which we can find all utilities to deal with isochores
 """
 
 import os
+import re
+import bz2
 import gzip
+import mmap
+import zlib
+import Queue
+import struct
 import logging
-import Bio.SeqIO
+import tempfile
+import itertools
+import threading
+import collections
+import multiprocessing
+import multiprocessing.pool
 
 __author__ = "Paolo Cozzi <paolo.cozzi@ptp.it>"
 
@@ -51,14 +62,18 @@ logger = logging.getLogger(__name__)
 class FastaFile:
     """A class to deal with fasta files"""
 
-    def __init__(self, fasta_file=None):
+    def __init__(self, fasta_file=None, threads=None, raw=False):
         """To instantiate the class. You may give a fasta path (also
-        compressed)"""
+        compressed). threads is the number of threads decompressing BGZF and
+        bz2 files (default: the number of CPUs). With raw=True sequences are
+        read by ParseFasta as FastaRecord objects, else by Bio.SeqIO"""
 
         self.last_idx = 0
         self.seqs_list = []
         self.seqs_ids = {}
         self.n_of_sequences = 0
+        self.threads = threads
+        self.raw = raw
 
         # Open a fasta file, if requested
         if fasta_file is not None:
@@ -70,19 +85,30 @@ class FastaFile:
         # debug
         logger.info("Opening %s..." % (fasta_file))
 
-        # verify the file extension
-        extension = os.path.splitext(fasta_file)[1]
+        # compressed files are recognized by their content
+        if CompressionFormat(fasta_file) is not None:
+            # decompressed in background
+            fasta_fh = CompressedFile(fasta_file, threads=self.threads)
 
-        if extension == '.gz':
-            # Open handle with gzip
-            fasta_fh = gzip.open(fasta_file, "rb")
+        elif self.raw:
+            # newlines are removed by ParseFasta
+            fasta_fh = open(fasta_file, "rb")
 
         else:
             # open handle in universal mode
             fasta_fh = open(fasta_file, "rU")
 
-        # Parsing sequences with Bio.SeqIO
-        self.seqs_list = list(Bio.SeqIO.parse(fasta_fh, "fasta"))
+        if self.raw:
+            with fasta_fh:
+                self.seqs_list = list(ParseFasta(fasta_fh))
+
+        else:
+            # Parsing sequences with Bio.SeqIO. It's imported here since it's
+            # slow to load and it's not needed by all scripts
+            import Bio.SeqIO
+
+            with fasta_fh:
+                self.seqs_list = list(Bio.SeqIO.parse(fasta_fh, "fasta"))
 
         # How many sequences were read?
         self.n_of_sequences = len(self.seqs_list)
@@ -121,6 +147,783 @@ class FastaFile:
         return self.seqs_list[idx]
 
 
+# A sequence read without Bio.SeqIO
+class FastaRecord:
+    """A fasta sequence stored in a bytearray (one byte for each base), with
+    the id, name and description of a Bio.SeqRecord"""
+
+    def __init__(self, id="", description="", data=None):
+        self.id = id
+        self.name = id
+        self.description = description
+
+        if data is None:
+            data = bytearray()
+
+        self.data = data
+
+    def __str__(self):
+        return "FastaRecord instance at %s : id:%s, size:%s" % (
+            hex(id(self)), self.id, len(self.data))
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__):
+            return (self.id == other.id and
+                    self.description == other.description and
+                    self.data == other.data)
+        else:
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        return str(self.data[key])
+
+
+# whitespaces removed from sequence lines
+FASTA_WHITESPACES = "\r\n\t "
+
+
+def _fasta_blocks(handle, block_size):
+    """Read a fasta file opened in binary mode in blocks of block_size bytes.
+    Returns ("header", title) and ("sequence", bases) tuples: newlines are
+    removed from whole blocks of sequence lines"""
+
+    # an incomplete header line, and if a line starts at the block begin
+    rest = ""
+    line_start = True
+
+    while True:
+        block = handle.read(block_size)
+        data = rest + block
+        rest = ""
+        position = 0
+
+        while position < len(data):
+            if line_start and data[position] == ">":
+                end = data.find("\n", position)
+
+                if end < 0:
+                    # the header continues in the next block
+                    if block != "":
+                        rest = data[position:]
+                        break
+
+                    end = len(data)
+
+                yield "header", data[position + 1:end].rstrip()
+
+                position = end + 1
+                line_start = True
+                continue
+
+            # sequence lines, until the next header
+            header = data.find("\n>", position)
+
+            if header < 0:
+                end = len(data)
+                line_start = data.endswith("\n")
+
+            else:
+                end = header + 1
+                line_start = True
+
+            bases = data[position:end].translate(None, FASTA_WHITESPACES)
+
+            if bases != "":
+                yield "sequence", bases
+
+            position = end
+
+        if block == "":
+            break
+
+
+def _fasta_record(title):
+    """A FastaRecord without bases, with the id of Bio.SeqIO"""
+
+    return FastaRecord(
+        id=title.split(None, 1)[0] if title != "" else "",
+        description=title)
+
+
+def ParseFasta(handle, block_size=2 ** 22):
+    """Read FastaRecord objects from a file opened in binary mode. The file
+    is read in blocks of block_size bytes, and newlines are removed from
+    whole blocks of sequence lines. Ids and descriptions are the same of
+    Bio.SeqIO"""
+
+    record = None
+
+    for kind, value in _fasta_blocks(handle, block_size):
+        if kind == "header":
+            if record is not None:
+                yield record
+
+            record = _fasta_record(value)
+
+        # lines before the first header are ignored, like Bio.SeqIO
+        elif record is not None:
+            record.data.extend(value)
+
+    if record is not None:
+        yield record
+
+
+def StreamFasta(handle, block_size=2 ** 20):
+    """Read a fasta file without storing its sequences. Returns (record,
+    chunks) tuples: record is a FastaRecord without bases, chunks is an
+    iterator over the bases (at most block_size for each chunk), which must be
+    read before the next record"""
+
+    blocks = _fasta_blocks(handle, block_size)
+
+    # the title of the next record
+    titles = [None]
+
+    def chunks():
+        for kind, value in blocks:
+            if kind == "header":
+                titles[0] = value
+                return
+
+            yield value
+
+    # lines before the first header are ignored, like Bio.SeqIO
+    for bases in chunks():
+        pass
+
+    while titles[0] is not None:
+        record = _fasta_record(titles[0])
+        titles[0] = None
+
+        record_chunks = chunks()
+        yield record, record_chunks
+
+        # skipping the bases not read
+        for bases in record_chunks:
+            pass
+
+
+# A sequence shared between processes
+def _shared_directory(size):
+    """Returns /dev/shm if it's writable and has room for size bytes, or None
+    (the default temporary directory). Docker limits /dev/shm to 64 MB"""
+
+    if not os.access("/dev/shm", os.W_OK):
+        return None
+
+    try:
+        stat = os.statvfs("/dev/shm")
+
+    except (OSError, AttributeError):
+        return None
+
+    if stat.f_bavail * stat.f_frsize < size:
+        logger.debug(
+            "/dev/shm is too small for %s bytes: using temporary directory" %
+            (size))
+        return None
+
+    return "/dev/shm"
+
+
+class SharedSequence:
+    """A sequence written in a memory mapped file (in /dev/shm, if possible).
+    A SharedSequence is pickled by its filename: processes which receive it
+    map the same file read-only, without copying the sequence. The file is
+    removed by the instance which created it"""
+
+    def __init__(self, sequence=None, id=None, name=None, description="",
+                 filename=None, directory=None):
+        """sequence could be a string, a Bio.SeqRecord or a FastaRecord. Use
+        filename to attach to an existing sequence file"""
+
+        # id, name and description of a FastaRecord
+        if isinstance(sequence, FastaRecord):
+            id = sequence.id if id is None else id
+            name = sequence.name if name is None else name
+            description = sequence.description
+            sequence = sequence.data
+
+        # id, name and description of a SeqRecord
+        elif hasattr(sequence, "seq"):
+            id = sequence.id if id is None else id
+            name = sequence.name if name is None else name
+            description = sequence.description
+            sequence = str(sequence.seq)
+
+        self.id = id
+        self.name = name if name is not None else id
+        self.description = description
+        self.filename = filename
+        self.data = None
+        self.handle = None
+
+        # only the creator removes the file
+        self.owner = False
+
+        if sequence is not None:
+            if directory is None:
+                directory = _shared_directory(len(sequence))
+
+            fd, self.filename = tempfile.mkstemp(
+                prefix="isoSegmenter_", suffix=".seq", dir=directory)
+            self.owner = True
+
+            # a partial file can't be used: don't leave it behind
+            try:
+                with os.fdopen(fd, "wb") as handle:
+                    handle.write(sequence)
+
+            except BaseException:
+                os.remove(self.filename)
+                self.owner = False
+                raise
+
+        elif filename is None:
+            raise ValueError("A sequence or a filename is needed")
+
+        self._Map()
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def _Map(self):
+        """Map the sequence file read-only"""
+
+        self.handle = open(self.filename, "rb")
+
+        # an empty file can't be mapped
+        if os.path.getsize(self.filename) == 0:
+            self.data = ""
+
+        else:
+            self.data = mmap.mmap(
+                self.handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __getstate__(self):
+        """Only the filename and the names are pickled"""
+
+        return {"id": self.id, "name": self.name,
+                "description": self.description, "filename": self.filename}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.owner = False
+        self._Map()
+
+    def Close(self):
+        """Unmap the sequence, and remove its file if this instance created
+        it"""
+
+        if self.handle is None:
+            return
+
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+        self.handle.close()
+        self.handle = None
+        self.data = None
+
+        if self.owner and os.path.exists(self.filename):
+            os.remove(self.filename)
+            logger.debug("%s removed" % (self.filename))
+
+    def __del__(self):
+        self.Close()
+
+
+# Compressed files. gzip, BGZF (gzip blocks with a BC extra field, written by
+# bgzip) and bz2 (even multi-stream, like pbzip2 output) are supported
+
+# the first bytes of a compressed file, and of a bz2 stream block
+GZIP_MAGIC = "\x1f\x8b"
+BZ2_MAGIC = "BZh"
+BZ2_STREAM = re.compile("BZh[1-9]\x31\x41\x59\x26\x53\x59")
+
+
+def CompressionFormat(filename):
+    """Returns the compression format of a file: "gzip", "bgzf", "bz2" or
+    None for a plain file"""
+
+    with open(filename, "rb") as handle:
+        header = handle.read(18)
+
+    if header.startswith(GZIP_MAGIC):
+        # FEXTRA flag, and a BC subfield
+        if (len(header) == 18 and ord(header[3]) & 4 and
+                header[12:14] == "BC"):
+            return "bgzf"
+
+        return "gzip"
+
+    if header.startswith(BZ2_MAGIC):
+        return "bz2"
+
+    return None
+
+
+def _bgzf_block_size(data, offset):
+    """Returns the size of the BGZF block starting at offset, or None if
+    the block header is incomplete"""
+
+    if offset + 12 > len(data):
+        return None
+
+    xlen = struct.unpack("<H", data[offset + 10:offset + 12])[0]
+
+    if offset + 12 + xlen > len(data):
+        return None
+
+    # searching the BC subfield
+    position = offset + 12
+
+    while position < offset + 12 + xlen:
+        subfield = data[position:position + 2]
+        length = struct.unpack("<H", data[position + 2:position + 4])[0]
+
+        if subfield == "BC":
+            return struct.unpack(
+                "<H", data[position + 4:position + 6])[0] + 1
+
+        position += 4 + length
+
+    raise IOError("Not a BGZF block at %s" % (offset))
+
+
+def _bgzf_units(handle, unit_size):
+    """Read a BGZF file in units of whole blocks"""
+
+    data = ""
+
+    while True:
+        chunk = handle.read(unit_size)
+        data += chunk
+
+        # the end of the last complete block
+        end = 0
+
+        while True:
+            size = _bgzf_block_size(data, end)
+
+            if size is None or end + size > len(data):
+                break
+
+            end += size
+
+        if end > 0:
+            yield data[:end]
+            data = data[end:]
+
+        if chunk == "":
+            if data != "":
+                raise IOError("Truncated BGZF file")
+
+            return
+
+
+def _decompress_bgzf(data):
+    """Decompress whole BGZF blocks"""
+
+    chunks = []
+    offset = 0
+
+    while offset < len(data):
+        size = _bgzf_block_size(data, offset)
+        xlen = struct.unpack("<H", data[offset + 10:offset + 12])[0]
+
+        # raw deflate data, between header and CRC32 + ISIZE
+        chunks.append(zlib.decompress(
+            data[offset + 12 + xlen:offset + size - 8], -zlib.MAX_WBITS))
+
+        offset += size
+
+    return "".join(chunks)
+
+
+def _bz2_units(handle, unit_size, data=""):
+    """Read a bz2 file in units of (probably) whole streams. A stream start
+    is recognized by its magic bytes, which could appear by chance in
+    compressed data too. data are the bytes already read"""
+
+    # only the new bytes are searched (not the first byte of the file)
+    scanned = 1
+
+    while True:
+        chunk = handle.read(unit_size)
+        data += chunk
+
+        if chunk == "":
+            if data != "":
+                yield data
+
+            return
+
+        # the last stream start
+        starts = [match.start() for match in BZ2_STREAM.finditer(
+            data, scanned)]
+
+        if len(starts) > 0:
+            yield data[:starts[-1]]
+            data = data[starts[-1]:]
+
+        # a stream start could begin in the last bytes of data
+        scanned = max(1, len(data) - 9)
+
+
+def _bz2_chunks(handle, unit_size, data="", piece_size=2 ** 16):
+    """Decompress a bz2 file (even with many streams) sequentially. The
+    decompressor receives piece_size bytes at a time, so chunks are small
+    even if a stream is huge. data are the bytes already read"""
+
+    decompressor = bz2.BZ2Decompressor()
+
+    # the decompressor received some bytes of the current stream
+    started = False
+
+    while True:
+        if data == "":
+            data = handle.read(unit_size)
+
+            if data == "":
+                break
+
+        for offset in range(0, len(data), piece_size):
+            piece = data[offset:offset + piece_size]
+
+            while piece != "":
+                try:
+                    chunk = decompressor.decompress(piece)
+
+                except EOFError:
+                    # the stream ended with the previous piece
+                    decompressor = bz2.BZ2Decompressor()
+                    started = False
+                    continue
+
+                started = True
+                yield chunk
+
+                # a new stream starts after the end of the previous one
+                piece = decompressor.unused_data
+
+                if piece != "":
+                    decompressor = bz2.BZ2Decompressor()
+                    started = False
+
+        data = ""
+
+    # a complete stream doesn't accept more data
+    if started:
+        try:
+            decompressor.decompress("")
+
+        except EOFError:
+            return
+
+        raise IOError("Truncated bz2 file")
+
+
+def _decompress_bz2(data):
+    """Decompress whole bz2 streams. Returns None if data is not made of
+    complete streams"""
+
+    chunks = []
+
+    try:
+        while data != "":
+            decompressor = bz2.BZ2Decompressor()
+            chunks.append(decompressor.decompress(data))
+            data = decompressor.unused_data
+
+            # a complete stream doesn't accept more data
+            try:
+                decompressor.decompress("")
+                return None
+
+            except EOFError:
+                pass
+
+    except (IOError, ValueError):
+        return None
+
+    return "".join(chunks)
+
+
+def _gzip_chunks(handle, unit_size):
+    """Decompress a gzip file (even with many members). gzip.GzipFile checks
+    the CRC32 and the size of each member: a truncated or corrupted file
+    raises IOError, like gzip.open"""
+
+    gzip_file = gzip.GzipFile(fileobj=handle, mode="rb")
+
+    try:
+        while True:
+            chunk = gzip_file.read(unit_size)
+
+            if chunk == "":
+                break
+
+            yield chunk
+
+    except EOFError:
+        raise IOError("Truncated gzip file")
+
+    finally:
+        gzip_file.close()
+
+
+# A file-like object on a compressed file
+class CompressedFile:
+    """A read-only file on a compressed file. Data is decompressed by a
+    background thread and passed through a bounded queue. BGZF blocks and bz2
+    streams are decompressed in parallel by a pool of threads (zlib and bz2
+    release the GIL). Read the file by lines (iterating) or by read(), not
+    both"""
+
+    def __init__(self, filename, threads=None, queue_size=8,
+                 unit_size=2 ** 22):
+        if threads is None:
+            threads = multiprocessing.cpu_count()
+
+        self.filename = filename
+        self.format = CompressionFormat(filename)
+        self.threads = threads
+        self.unit_size = unit_size
+        self.closed = False
+
+        if self.format is None:
+            raise IOError("%s is not compressed" % (filename))
+
+        # decompressed chunks, or an exception. None is the end
+        self.queue = Queue.Queue(maxsize=queue_size)
+
+        self.thread = threading.Thread(target=self._Decompress)
+        self.thread.daemon = True
+        self.thread.start()
+
+        # the decompressed chunks, the data not yet read and the lines
+        self._chunks = self._Chunks()
+        self._buffer = ""
+        self._lines = None
+
+    def __str__(self):
+        """A method useful for debugging"""
+
+        myclass = str(self.__class__)
+        myattributes = self.__dict__
+
+        # the returned string
+        message = "\n %s instance at %s\n\n" % (myclass, hex(id(self)))
+
+        for key, value in myattributes.iteritems():
+            message += "\t%s -> %s\n" % (key, value)
+
+        return message
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _Put(self, item):
+        """Put an item in queue, unless the file is closed"""
+
+        while not self.closed:
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+
+            except Queue.Full:
+                continue
+
+        return False
+
+    def _Parallel(self, function, units):
+        """Apply function to units with a pool of threads. Results are
+        returned in order, and only a few units are read in advance"""
+
+        if self.threads == 1:
+            for unit in units:
+                yield unit, function(unit)
+
+            return
+
+        pool = multiprocessing.pool.ThreadPool(self.threads)
+        pending = collections.deque()
+
+        try:
+            for unit in units:
+                pending.append((unit, pool.apply_async(function, (unit, ))))
+
+                if len(pending) >= 2 * self.threads:
+                    unit, result = pending.popleft()
+                    yield unit, result.get()
+
+            while len(pending) > 0:
+                unit, result = pending.popleft()
+                yield unit, result.get()
+
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _Decompressed(self, handle):
+        """Returns the decompressed chunks of the file"""
+
+        if self.format == "gzip":
+            return _gzip_chunks(handle, self.unit_size)
+
+        if self.format == "bgzf":
+            return itertools.imap(
+                lambda item: item[1],
+                self._Parallel(
+                    _decompress_bgzf, _bgzf_units(handle, self.unit_size)))
+
+        return self._Bz2Chunks(handle)
+
+    def _Bz2Chunks(self, handle):
+        """Decompress bz2 units. If a unit was split on a false stream
+        start, it's joined with the next units. A file without a new stream
+        in its first unit (like bzip2 output) is decompressed sequentially,
+        in small chunks"""
+
+        data = handle.read(self.unit_size)
+
+        if BZ2_STREAM.search(data, 1) is None:
+            for chunk in _bz2_chunks(handle, self.unit_size, data):
+                yield chunk
+
+            return
+
+        units = _bz2_units(handle, self.unit_size, data)
+        data = ""
+
+        for unit, chunk in self._Parallel(_decompress_bz2, units):
+            if data == "" and chunk is not None:
+                yield chunk
+                continue
+
+            data += unit
+            chunk = _decompress_bz2(data)
+
+            if chunk is not None:
+                yield chunk
+                data = ""
+
+        if data != "":
+            raise IOError("Invalid bz2 data in %s" % (self.filename))
+
+    def _Decompress(self):
+        """Decompress the file and put chunks in queue. Executed by a
+        thread"""
+
+        try:
+            with open(self.filename, "rb") as handle:
+                for chunk in self._Decompressed(handle):
+                    if chunk != "" and not self._Put(chunk):
+                        return
+
+        except Exception as message:
+            self._Put(message)
+
+        self._Put(None)
+
+    def _Chunks(self):
+        """Returns the decompressed chunks from queue"""
+
+        while True:
+            item = self.queue.get()
+
+            if item is None:
+                return
+
+            if isinstance(item, Exception):
+                raise item
+
+            yield item
+
+    def read(self, size=-1):
+        """Read size bytes, or the whole file"""
+
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += self._chunks.next()
+
+            except StopIteration:
+                break
+
+        if size < 0:
+            size = len(self._buffer)
+
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+
+        return data
+
+    def _IterLines(self):
+        """Returns the lines of the file"""
+
+        rest = self._buffer
+        self._buffer = ""
+
+        for chunk in self._chunks:
+            lines = (rest + chunk).split("\n")
+            rest = lines.pop()
+
+            for line in lines:
+                yield line + "\n"
+
+        if rest != "":
+            yield rest
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if self._lines is None:
+            self._lines = self._IterLines()
+
+        return self._lines.next()
+
+    def close(self):
+        """Stop decompressing"""
+
+        self.closed = True
+
+
 # a function to check file existance and remove file if needed
 def FileExists(filename, remove_if_exists=False):
     """Testing for file existance and removing file if needed"""
@@ -140,4 +943,59 @@ def FileExists(filename, remove_if_exists=False):
 
     # this function return nothing is successful
 
+
+# A region of a chromosome. Coordinates are 0-based, like BED and python
+Region = collections.namedtuple("Region", ["chrom", "start", "end", "name"])
+
+
+# a function to read regions from a BED file
+def ReadBed(bed_file):
+    """Read the first four columns of a BED file (also compressed). Returns a
+    list of Region. Regions without a name are named like chrom:start-end
+    (1-based)"""
+
+    # verify the file extension
+    extension = os.path.splitext(bed_file)[1]
+
+    if extension == '.gz':
+        # Open handle with gzip
+        handle = gzip.open(bed_file, "rb")
+
+    else:
+        # open handle in universal mode
+        handle = open(bed_file, "rU")
+
+    regions = []
+
+    with handle:
+        for i, line in enumerate(handle):
+            # skip empty lines, comments and headers
+            if (line.strip() == "" or
+                    line.startswith(("#", "track", "browser"))):
+                continue
+
+            fields = line.strip().split("\t")
+
+            if len(fields) < 3:
+                raise ValueError(
+                    "Line %s of %s has less than 3 columns" %
+                    (i + 1, bed_file))
+
+            chrom, start, end = fields[0], int(fields[1]), int(fields[2])
+
+            if start < 0 or end <= start:
+                raise ValueError(
+                    "Line %s of %s is not a valid region: %s" %
+                    (i + 1, bed_file, line.strip()))
+
+            if len(fields) > 3 and fields[3] != "":
+                name = fields[3]
+
+            else:
+                name = "%s:%s-%s" % (chrom, start + 1, end)
+
+            regions += [Region(chrom, start, end, name)]
+
+    return regions
+
 # end of library
@@ -44,6 +44,7 @@ __email__ = "bunop@libero.it"
 __status__ = "beta"
 
 
-import Graphs
+# Graphs is not imported here: it loads gd, PIL and matplotlib, which are not
+# needed to calculate isochores. Import GClib.Graphs explicitly to draw graphs
 import Utility
 import Elements
@@ -53,3 +53,18 @@ ISO_MIN_SIZE = 2
 # The maximum and minumu values of DrawChromosome graph (in percentage)
 GRAPH_GC_MAX = 65
 GRAPH_GC_MIN = 30
+
+# The RGB colors of each class, sorted like CLASS_TO_LEVEL values, and the
+# color of gaps
+CLASS_COLORS = [(0, 100, 255), (0, 200, 255), (255, 255, 0), (255, 130, 0),
+                (255, 0, 0)]
+GAP_COLOR = (230, 230, 230)
+
+# The size (in pixels) of a tile and the resolution (bp per pixel) of the
+# most detailed level of a tile pyramid
+TILE_SIZE = 256
+TILE_MIN_RESOLUTION = 1000
+
+# isochore size bins edges (bp) for families histograms. Log spaced, from 10 Kb
+# to 100 Mb, four bins for each order of magnitude
+FAMILIES_SIZE_BINS = [10 ** (4 + i * 0.25) for i in range(17)]
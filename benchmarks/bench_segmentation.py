@@ -0,0 +1,384 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+
+Created on Mon Oct 19 16:58:20 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A benchmark of the segmentation pipeline. Synthetic genomes (of a given size,
+with planted isochores and gaps) and test/chr21.fa.gz are segmented with
+different window sizes. Each stage is timed, and the peak resident memory is
+recorded after each stage. Every case is run in a new process, so that memory
+peaks are not shared between cases. Results could be written in a JSON file
+and compared with a previous run
+
+"""
+
+import os
+import sys
+import json
+import time
+import Queue
+import shutil
+import logging
+import argparse
+import resource
+import tempfile
+import multiprocessing
+
+# the directory of isoSegmenter modules
+module_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, module_path)
+
+from GClib import Elements, Utility, Synthetic
+
+# the stages of the pipeline, in order
+STAGES = ["load", "scan4gaps", "value_windows", "find_isochores",
+          "dump_windows", "dump_isochores", "draw_isochores",
+          "group_by_isochores"]
+
+# the bundled chromosome
+chr21_file = os.path.join(module_path, "test", "chr21.fa.gz")
+
+parser = argparse.ArgumentParser(
+    description='Measure time and memory of the segmentation pipeline')
+parser.add_argument(
+    '-s',
+    '--sizes',
+    type=str,
+    required=False,
+    default="10,50",
+    help="Comma separated sizes (Mb) of synthetic chromosomes (default: "
+         "'%(default)s')")
+parser.add_argument(
+    '-w',
+    '--window_sizes',
+    type=str,
+    required=False,
+    default="100000,300000",
+    help="Comma separated window sizes (default: '%(default)s')")
+parser.add_argument(
+    '--isochore_size',
+    type=int,
+    required=False,
+    default=1000000,
+    help="Mean size of planted isochores (default: '%(default)s')")
+parser.add_argument(
+    '--gap_density',
+    type=float,
+    required=False,
+    default=1.0,
+    help="Number of gaps for each Mb (default: '%(default)s')")
+parser.add_argument(
+    '--seed',
+    type=int,
+    required=False,
+    default=42,
+    help="Random seed for synthetic chromosomes (default: '%(default)s')")
+parser.add_argument(
+    '--no_chr21',
+    action='store_true',
+    help="Don't benchmark %s" % (os.path.relpath(chr21_file)))
+parser.add_argument(
+    '--graphs',
+    action='store_true',
+    help="Benchmark graph rendering too")
+parser.add_argument(
+    '-r',
+    '--repeat',
+    type=int,
+    required=False,
+    default=3,
+    help="Number of runs for each case (default: '%(default)s')")
+parser.add_argument(
+    '-o',
+    '--output',
+    type=str,
+    required=False,
+    help="Write results in a JSON file")
+parser.add_argument(
+    '-b',
+    '--baseline',
+    type=str,
+    required=False,
+    help="Compare results with a JSON file written by a previous run")
+parser.add_argument(
+    '--threshold',
+    type=float,
+    required=False,
+    default=0.2,
+    help="Relative slowdown reported as a regression (default: "
+         "'%(default)s')")
+parser.add_argument(
+    '--min_time',
+    type=float,
+    required=False,
+    default=0.01,
+    help="Slowdowns shorter than this (seconds) are not regressions "
+         "(default: '%(default)s')")
+parser.add_argument(
+    '--memory_threshold',
+    type=float,
+    required=False,
+    default=0.2,
+    help="Relative memory increase reported as a regression (default: "
+         "'%(default)s')")
+
+
+def peak_rss():
+    """Returns the peak resident memory of this process (MB)"""
+
+    # ru_maxrss is in Kb on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_case(fasta_file, window_size, outdir, graphs, results):
+    """Segment the first chromosome of a FASTA file. Put stage times and
+    memory peaks in results queue. Executed in a new process"""
+
+    stages = []
+
+    # Dump methods don't overwrite files written by a previous run
+    for filename in os.listdir(outdir):
+        os.remove(os.path.join(outdir, filename))
+
+    def stage(name, start):
+        stages.append((name, time.time() - start, peak_rss()))
+
+    start = time.time()
+    fasta = Utility.FastaFile(fasta_file, raw=True)
+    seqRecord = fasta.GetNextSeq()
+    stage("load", start)
+
+    start = time.time()
+    Chrom = Elements.Chromosome(seqRecord)
+    stage("scan4gaps", start)
+
+    start = time.time()
+    Chrom.ValueWindows(window_size=window_size)
+    stage("value_windows", start)
+
+    start = time.time()
+    Chrom.FindIsochores()
+    stage("find_isochores", start)
+
+    start = time.time()
+    Chrom.DumpWindows(os.path.join(outdir, "windows.csv"))
+    stage("dump_windows", start)
+
+    start = time.time()
+    Chrom.DumpIsochores(os.path.join(outdir, "isochores.csv"))
+    stage("dump_isochores", start)
+
+    if graphs:
+        from GClib import Graphs
+
+        start = time.time()
+        Graph = Graphs.DrawChromosome()
+        Graph.SetSequenceLength(Chrom.size)
+        Graph.InitPicture()
+        Graph.SetHorizontalLines([37, 41, 46, 53])
+        Graph.SetColorsList(colorbyclass=True)
+        Graph.DrawIsochoreRectangles(isochores=Chrom.isochores)
+        Graph.FinishPicture(drawlabels=False)
+        Graph.EnlargeLabels()
+        Graph.SaveFigure(os.path.join(outdir, "isochores.png"))
+        stage("draw_isochores", start)
+
+    results.put(stages)
+
+
+def run_families(directory, results):
+    """Group all isochores files of a directory. Executed in a new process"""
+
+    start = time.time()
+    families = Elements.Families()
+    families.Scan4Files(directory, pattern="isochores.csv", recursive=True)
+    families.GroupByIsochores()
+    results.put([("group_by_isochores", time.time() - start, peak_rss())])
+
+
+def in_process(target, *args):
+    """Call target in a new process. Returns what target put in queue"""
+
+    results = multiprocessing.Queue()
+
+    process = multiprocessing.Process(target=target, args=args + (results, ))
+    process.start()
+
+    # the process could die before putting its results
+    while True:
+        try:
+            stages = results.get(timeout=1)
+            break
+
+        except Queue.Empty:
+            if not process.is_alive():
+                raise Exception("%s exited with %s" % (
+                    target.__name__, process.exitcode))
+
+    process.join()
+
+    return stages
+
+
+def add_stages(results, case, stages):
+    """Keep the min time and the max memory of each stage"""
+
+    case_results = results.setdefault(case, {})
+
+    for name, elapsed, memory in stages:
+        if name not in case_results:
+            case_results[name] = {"time": elapsed, "peak_rss": memory}
+
+        else:
+            case_results[name]["time"] = min(
+                elapsed, case_results[name]["time"])
+            case_results[name]["peak_rss"] = max(
+                memory, case_results[name]["peak_rss"])
+
+
+def compare(results, baseline, threshold, min_time, memory_threshold):
+    """Compare results with baseline. Returns a list of regressions"""
+
+    regressions = []
+
+    for case in sorted(results.keys()):
+        if case not in baseline:
+            continue
+
+        for name in STAGES:
+            if name not in results[case] or name not in baseline[case]:
+                continue
+
+            result = results[case][name]
+            reference = baseline[case][name]
+
+            time_ratio = result["time"] / max(reference["time"], 1e-6)
+            memory_ratio = result["peak_rss"] / reference["peak_rss"]
+
+            print("%-40s %-20s %8.3f -> %8.3f s (%+.1f%%) %8.1f -> %8.1f MB "
+                  "(%+.1f%%)" % (
+                      case, name, reference["time"], result["time"],
+                      (time_ratio - 1) * 100, reference["peak_rss"],
+                      result["peak_rss"], (memory_ratio - 1) * 100))
+
+            if (time_ratio > 1 + threshold and
+                    result["time"] - reference["time"] > min_time):
+                regressions.append("%s %s time" % (case, name))
+
+            if memory_ratio > 1 + memory_threshold:
+                regressions.append("%s %s memory" % (case, name))
+
+    return regressions
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    sizes = [float(size) for size in args.sizes.split(",") if size]
+    window_sizes = [int(size) for size in args.window_sizes.split(",")]
+
+    workdir = tempfile.mkdtemp(prefix="isoSegmenter_bench_")
+
+    try:
+        # the genomes to be segmented: name, FASTA file
+        genomes = []
+
+        for size in sizes:
+            name = "synthetic_%gMb" % (size)
+            fasta_file = os.path.join(workdir, name + ".fa.gz")
+
+            Synthetic.WriteFasta(fasta_file, [Synthetic.SyntheticChromosome(
+                name=name, size=int(size * 1e6),
+                isochore_size=args.isochore_size,
+                gap_density=args.gap_density, seed=args.seed)])
+
+            genomes.append((name, fasta_file))
+
+        if not args.no_chr21 and os.path.exists(chr21_file):
+            genomes.append(("chr21", chr21_file))
+
+        results = {}
+
+        for name, fasta_file in genomes:
+            for window_size in window_sizes:
+                case = "%s/w%s" % (name, window_size)
+                outdir = os.path.join(workdir, name, str(window_size))
+                os.makedirs(outdir)
+
+                for i in range(args.repeat):
+                    add_stages(results, case, in_process(
+                        run_case, fasta_file, window_size, outdir,
+                        args.graphs))
+
+        for i in range(args.repeat):
+            add_stages(results, "families", in_process(run_families, workdir))
+
+    finally:
+        shutil.rmtree(workdir)
+
+    print("%-40s %-20s %10s %10s" % ("case", "stage", "time (s)",
+                                     "peak (MB)"))
+
+    for case in sorted(results.keys()):
+        for name in STAGES:
+            if name not in results[case]:
+                continue
+
+            result = results[case][name]
+            print("%-40s %-20s %10.3f %10.1f" % (
+                case, name, result["time"], result["peak_rss"]))
+
+    if args.output is not None:
+        with open(args.output, "w") as handle:
+            json.dump(
+                {"python": sys.version.split()[0],
+                 "parameters": vars(args),
+                 "results": results},
+                handle, indent=2, sort_keys=True)
+
+    regressions = []
+
+    if args.baseline is not None:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)["results"]
+
+        regressions = compare(
+            results, baseline, args.threshold, args.min_time,
+            args.memory_threshold)
+
+    if len(regressions) > 0:
+        print("Regressions: %s" % (", ".join(regressions)))
+        sys.exit(1)
@@ -0,0 +1,163 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+
+Created on Mon Oct 19 15:32:40 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A benchmark to measure the startup time of GClib modules and scripts. Each
+command is run in a new python interpreter. Results could be written in a JSON
+file and compared with a previous run
+
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+# the directory of isoSegmenter scripts
+scripts_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "scripts")
+
+# the commands to be measured: name, python arguments
+COMMANDS = [
+    ("python", ["-c", "pass"]),
+    ("import GClib", ["-c", "import GClib"]),
+    ("import GClib.Elements", ["-c", "import GClib.Elements"]),
+    ("import GClib.Graphs", ["-c", "import GClib.Graphs"]),
+    ("isoSegmenter.py --help",
+     [os.path.join(scripts_path, "isoSegmenter.py"), "--help"]),
+    ("isoFamily.py --help",
+     [os.path.join(scripts_path, "isoFamily.py"), "--help"]),
+]
+
+parser = argparse.ArgumentParser(
+    description='Measure startup time of GClib modules and scripts')
+parser.add_argument(
+    '-r',
+    '--repeat',
+    type=int,
+    required=False,
+    default=10,
+    help="Number of runs for each command (default: '%(default)s')")
+parser.add_argument(
+    '-o',
+    '--output',
+    type=str,
+    required=False,
+    help="Write results in a JSON file")
+parser.add_argument(
+    '-b',
+    '--baseline',
+    type=str,
+    required=False,
+    help="Compare results with a JSON file written by a previous run")
+parser.add_argument(
+    '--threshold',
+    type=float,
+    required=False,
+    default=0.2,
+    help="Relative slowdown reported as a regression (default: "
+         "'%(default)s')")
+
+
+def measure(arguments, repeat):
+    """Run a python command repeat times. Returns the elapsed times"""
+
+    times = []
+
+    with open(os.devnull, "w") as devnull:
+        for i in range(repeat):
+            start = time.time()
+            subprocess.check_call(
+                [sys.executable] + arguments, stdout=devnull, stderr=devnull)
+            times.append(time.time() - start)
+
+    return times
+
+
+def median(values):
+    """Returns the median of a list of values"""
+
+    values = sorted(values)
+    middle = len(values) // 2
+
+    if len(values) % 2 == 1:
+        return values[middle]
+
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    results = {}
+
+    print("%-30s %10s %10s" % ("command", "min (s)", "median (s)"))
+
+    for name, arguments in COMMANDS:
+        times = measure(arguments, args.repeat)
+        results[name] = {"min": min(times), "median": median(times)}
+
+        print("%-30s %10.3f %10.3f" % (name, min(times), median(times)))
+
+    if args.output is not None:
+        with open(args.output, "w") as handle:
+            json.dump(
+                {"python": sys.version.split()[0], "results": results},
+                handle, indent=2, sort_keys=True)
+
+    # compare min times with baseline
+    regressions = []
+
+    if args.baseline is not None:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)["results"]
+
+        for name, result in sorted(results.items()):
+            if name not in baseline:
+                continue
+
+            reference = baseline[name]["min"]
+            ratio = result["min"] / reference
+
+            print("%-30s %10.3f -> %.3f (%+.1f%%)" % (
+                name, reference, result["min"], (ratio - 1) * 100))
+
+            if ratio > 1 + args.threshold:
+                regressions.append(name)
+
+    if len(regressions) > 0:
+        print("Startup regressions: %s" % (", ".join(regressions)))
+        sys.exit(1)
@@ -0,0 +1,188 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+
+Created on Mon Oct 19 16:37:01 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A benchmark of multi-chromosome segmentation with a pool of threads. Synthetic
+chromosomes are kept in memory and shared by all threads. Gaps, G+C counts and
+windows are calculated by numpy kernels which release the GIL, so the
+segmentation should scale with the number of threads up to the number of CPUs.
+Results could be written in a JSON file
+
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+
+# the directory of isoSegmenter modules
+module_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, module_path)
+
+from GClib import Elements, Utility, Synthetic
+
+parser = argparse.ArgumentParser(
+    description='Measure the thread scaling of multi-chromosome segmentation')
+parser.add_argument(
+    '-n',
+    '--n_of_chromosomes',
+    type=int,
+    required=False,
+    default=8,
+    help="Number of synthetic chromosomes (default: '%(default)s')")
+parser.add_argument(
+    '-s',
+    '--size',
+    type=float,
+    required=False,
+    default=20,
+    help="Size (Mb) of each synthetic chromosome (default: '%(default)s')")
+parser.add_argument(
+    '-w',
+    '--window_size',
+    type=int,
+    required=False,
+    default=100000,
+    help="Window size (default: '%(default)s')")
+parser.add_argument(
+    '-t',
+    '--threads',
+    type=str,
+    required=False,
+    default=",".join([str(2 ** i) for i in range(4)
+                      if 2 ** i <= multiprocessing.cpu_count()]),
+    help="Comma separated numbers of threads. Speedup is relative to the "
+         "first one (default: '%(default)s')")
+parser.add_argument(
+    '--seed',
+    type=int,
+    required=False,
+    default=42,
+    help="Random seed for synthetic chromosomes (default: '%(default)s')")
+parser.add_argument(
+    '-r',
+    '--repeat',
+    type=int,
+    required=False,
+    default=3,
+    help="Number of runs for each number of threads (default: "
+         "'%(default)s')")
+parser.add_argument(
+    '-o',
+    '--output',
+    type=str,
+    required=False,
+    help="Write results in a JSON file")
+
+
+def synthetic_records(n_of_chromosomes, size, seed):
+    """Returns synthetic chromosomes as Utility.FastaRecord objects"""
+
+    records = []
+
+    for i in range(n_of_chromosomes):
+        chromosome = Synthetic.SyntheticChromosome(
+            name="chr%s" % (i + 1), size=int(size * 1e6), seed=seed + i)
+
+        records.append(Utility.FastaRecord(
+            id=chromosome.name, data=bytearray(chromosome.GetSequence())))
+
+    return records
+
+
+def measure(records, settings, threads, repeat):
+    """Segment records repeat times. Returns the elapsed times and the
+    isochores of the last run"""
+
+    times = []
+
+    for i in range(repeat):
+        start = time.time()
+        chromosomes = Elements.SegmentChromosomes(
+            records, settings=settings, threads=threads)
+        times.append(time.time() - start)
+
+    return times, [chromosome.isochores for chromosome in chromosomes]
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    threads_list = [int(threads) for threads in args.threads.split(",")]
+
+    records = synthetic_records(
+        args.n_of_chromosomes, args.size, args.seed)
+
+    settings = Elements.Settings(window_size=args.window_size)
+
+    results = {}
+    reference = None
+
+    print("%-10s %10s %10s %10s" % (
+        "threads", "min (s)", "speedup", "efficiency"))
+
+    for threads in threads_list:
+        times, isochores = measure(records, settings, threads, args.repeat)
+
+        # threads must give the same isochores of a single thread
+        if reference is None:
+            reference = (min(times), isochores)
+
+        elif isochores != reference[1]:
+            raise Exception(
+                "Isochores with %s threads are different" % (threads))
+
+        speedup = reference[0] / min(times)
+
+        results[threads] = {
+            "min": min(times), "speedup": speedup,
+            "efficiency": speedup / threads}
+
+        print("%-10s %10.3f %10.2f %10.2f" % (
+            threads, min(times), speedup, speedup / threads))
+
+    if args.output is not None:
+        with open(args.output, "w") as handle:
+            json.dump(
+                {"python": sys.version.split()[0],
+                 "cpus": multiprocessing.cpu_count(),
+                 "parameters": vars(args),
+                 "results": results},
+                handle, indent=2, sort_keys=True)
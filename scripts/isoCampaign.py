@@ -0,0 +1,154 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+
+Created on Mon Oct 19 16:34:12 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+Segment many genomes described in a JSON manifest. An interrupted campaign
+restarts from the chromosomes not yet completed
+
+"""
+
+import os
+import sys
+import logging
+import argparse
+
+# Modules for dealing with GC content
+from GClib import Campaign
+
+# programname
+program_name = os.path.basename(sys.argv[0])
+
+# Add epilog on bottom of help message
+epilog = """
+
+Manifest example:
+
+    {
+        "output_dir": "campaign",
+        "defaults": {"window_size": 100000, "gap_tolerance": 5000,
+                     "min_size": 2, "windows": false},
+        "genomes": [
+            {"name": "hg38", "fasta": "hg38.fa.gz"},
+            {"name": "mm10", "fasta": "mm10.fa.gz", "chromosomes": ["chr1"]}
+        ]
+    }
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+"""
+
+notice = """
+
+isoSegmenter  Copyright (C) 2013-2021 ITB - CNR
+This program comes with ABSOLUTELY NO WARRANTY; for details type:
+
+    `isoCampaign.py --help'.
+
+This is free software, and you are welcome to redistribute it
+under certain conditions; show LICENSE.md for more details.
+
+"""
+
+parser = argparse.ArgumentParser(
+    description='Segment many genomes described in a JSON manifest',
+    epilog=epilog,
+    formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument(
+    '-m',
+    '--manifest',
+    type=str,
+    required=True,
+    help="The JSON manifest of the campaign")
+parser.add_argument(
+    '-j',
+    '--jobs',
+    type=int,
+    required=False,
+    default=1,
+    help="Number of chromosomes segmented in parallel (default: "
+         "'%(default)s')")
+parser.add_argument(
+    '--prefetch',
+    type=int,
+    required=False,
+    default=2,
+    help="Number of chromosomes read in advance (default: '%(default)s')")
+parser.add_argument(
+    '--retries',
+    type=int,
+    required=False,
+    default=2,
+    help="Attempts for a failed chromosome (default: '%(default)s')")
+parser.add_argument(
+    '-v',
+    '--verbose',
+    action='store_true',
+    help="Set logging to debug mode")
+args = parser.parse_args()
+
+# get debugging level
+mylevel = logging.INFO
+
+if args.verbose:
+    mylevel = logging.DEBUG
+
+# get a logger with a defined name
+logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=mylevel)
+logger = logging.getLogger(program_name)
+
+
+if __name__ == "__main__":
+    # print out notice
+    logger.info(notice)
+
+    if not os.path.exists(args.manifest):
+        raise IOError("file %s doesn't exist" % (args.manifest))
+
+    campaign = Campaign.Campaign(
+        args.manifest, processes=args.jobs, prefetch=args.prefetch,
+        retries=args.retries)
+
+    n_of_failed = campaign.Run()
+
+    if n_of_failed > 0:
+        logger.error("%s tasks failed" % (n_of_failed))
+        sys.exit(1)
+
+    logger.info("Campaign completed")
@@ -42,7 +42,8 @@ import logging
 import argparse
 
 # Modules for dealing with GC content and graph
-from GClib import constants, Graphs, Elements, Utility
+# Graphs is imported only when a graph is requested
+from GClib import constants, Elements, Utility
 
 # programname
 program_name = os.path.basename(sys.argv[0])
@@ -92,6 +93,16 @@ parser.add_argument(
     type=str,
     required=False,
     help="Output graph filename (PNG)")
+parser.add_argument(
+    '--size_graphfile',
+    type=str,
+    required=False,
+    help="Output GC by isochore size histogram filename (PNG)")
+parser.add_argument(
+    '--group_graphfile',
+    type=str,
+    required=False,
+    help="Output GC by group (subdirectory) histogram filename (PNG)")
 parser.add_argument(
     '-r',
     '--regexp',
@@ -99,6 +110,17 @@ parser.add_argument(
     required=False,
     default=".csv",
     help="pattern for isochore file search (default: '%(default)s')")
+parser.add_argument(
+    '--glob',
+    action='store_true',
+    default=False,
+    help="Pattern is a shell pattern (ie '*.csv') instead of a regular "
+         "expression")
+parser.add_argument(
+    '--recursive',
+    action='store_true',
+    default=False,
+    help="Search isochore files in subdirectories")
 parser.add_argument(
     '-v',
     '--verbose',
@@ -121,6 +143,19 @@ parser.add_argument(
     required=False,
     default=constants.GRAPH_GC_MIN,
     help="Set X min value in graph (default: '%(default)s')")
+parser.add_argument(
+    '--index',
+    type=str,
+    required=False,
+    help="Families index file (JSON). Only new or modified isochore files "
+         "will be read")
+parser.add_argument(
+    '-j',
+    '--jobs',
+    type=int,
+    required=False,
+    default=1,
+    help="Number of parallel processes (default: '%(default)s')")
 args = parser.parse_args()
 
 # get debugging level
@@ -156,15 +191,27 @@ if __name__ == "__main__":
         args.graphfile,
         remove_if_exists=args.force_overwrite)
 
+    for graphfile in [args.size_graphfile, args.group_graphfile]:
+        Utility.FileExists(
+            graphfile,
+            remove_if_exists=args.force_overwrite)
+
+    # loading the plotting stack (gd, PIL, matplotlib) only if necessary
+    if (args.graphfile is not None or args.size_graphfile is not None or
+            args.group_graphfile is not None):
+        from GClib import Graphs
+
     # instantiate a families element
     families = Elements.Families()
 
     # scanning for isochore files in user defined directory
-    families.Scan4Files(args.indir, pattern=args.regexp)
+    families.Scan4Files(
+        args.indir, pattern=args.regexp, recursive=args.recursive,
+        glob=args.glob)
 
     # Group isochore relying their GClevels
     # TODO: here i can set Xmax and Xmin values and bin size dimension
-    families.GroupByIsochores()
+    families.GroupByIsochores(processes=args.jobs, index=args.index)
 
     # Dump families in a CSV file
     families.DumpFamilies(outfile=args.outfile)
@@ -186,3 +233,22 @@ if __name__ == "__main__":
         # save image
         # TODO: change figure quality
         graph.SaveFigure(filename=args.graphfile)
+
+    # Instantiating 2-D histograms if necessary
+    for dimension, graphfile, title in [
+            ("size", args.size_graphfile,
+             'Isochore families by isochore size'),
+            ("group", args.group_graphfile,
+             'Isochore families by group (% of group size)')]:
+
+        if graphfile is None:
+            continue
+
+        # groups could have very different sizes
+        graph = Graphs.DrawFamilies2D(
+            families, dimension=dimension, normalize=(dimension == "group"))
+
+        graph.DrawAxisLabels()
+        graph.DrawTitle(title)
+        graph.SetAxisLimits(axis=[args.x_min, args.x_max, 0, 0])
+        graph.SaveFigure(filename=graphfile)
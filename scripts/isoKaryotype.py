@@ -0,0 +1,174 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+
+Created on Mon Oct 19 15:20:11 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A program to draw the isochores of many chromosomes in the same image
+
+"""
+
+import os
+import sys
+import logging
+import argparse
+
+# Modules for dealing with GC content and graph
+from GClib import constants, Graphs, Utility
+
+# programname
+program_name = os.path.basename(sys.argv[0])
+
+# Add epilog on bottom of help message
+epilog = """
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+"""
+
+notice = """
+
+isoSegmenter  Copyright (C) 2013-2021 ITB - CNR
+This program comes with ABSOLUTELY NO WARRANTY; for details type:
+
+    `isoKaryotype.py --help'.
+
+This is free software, and you are welcome to redistribute it
+under certain conditions; show LICENSE.md for more details.
+
+"""
+
+parser = argparse.ArgumentParser(
+    description='Draw isochores of many chromosomes in the same image',
+    epilog=epilog,
+    formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument(
+    '-i',
+    '--infiles',
+    metavar='infile',
+    type=str,
+    nargs='+',
+    required=True,
+    help="One or more isochore CSV files (one for each chromosome)")
+parser.add_argument(
+    '-n',
+    '--names',
+    metavar='name',
+    type=str,
+    nargs='+',
+    required=False,
+    help="Chromosome names (default: the isochore file names)")
+parser.add_argument(
+    '-o',
+    '--output',
+    type=str,
+    required=True,
+    help="Output graph filename (PNG)")
+parser.add_argument(
+    '-v',
+    '--verbose',
+    action='store_true',
+    help="Set logging to debug mode")
+parser.add_argument(
+    '--force_overwrite',
+    action='store_true',
+    help="Force overwrite")
+parser.add_argument(
+    '--scale',
+    type=int,
+    required=False,
+    default=30000,
+    help="Set the bp drawn in a pixel (default: '%(default)s')")
+parser.add_argument(
+    '--y_max',
+    type=int,
+    required=False,
+    default=constants.GRAPH_GC_MAX,
+    help="Set max value in graph (default: '%(default)s')")
+parser.add_argument(
+    '--y_min',
+    type=int,
+    required=False,
+    default=constants.GRAPH_GC_MIN,
+    help="Set min value in graph (default: '%(default)s')")
+parser.add_argument(
+    '-j',
+    '--jobs',
+    type=int,
+    required=False,
+    default=1,
+    help="Number of parallel processes (default: '%(default)s')")
+args = parser.parse_args()
+
+# get debugging level
+mylevel = logging.INFO
+
+if args.verbose:
+    mylevel = logging.DEBUG
+
+# get a logger with a defined name
+logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=mylevel)
+logger = logging.getLogger(program_name)
+
+
+if __name__ == "__main__":
+    # print out notice
+    logger.info(notice)
+
+    # one name for each file
+    if args.names is not None and len(args.names) != len(args.infiles):
+        raise Exception(
+            "%s names provided for %s files" %
+            (len(args.names), len(args.infiles)))
+
+    if args.names is None:
+        args.names = [None for infile in args.infiles]
+
+    # Checking for graph file existance
+    Utility.FileExists(args.output, remove_if_exists=args.force_overwrite)
+
+    # Instantiating DrawKaryotype Class. All chromosomes have the same scale
+    Graph = Graphs.DrawKaryotype(scale=args.scale)
+    Graph.SetMinMaxValues(args.y_min, args.y_max)
+
+    # reading isochores for each chromosome
+    for infile, name in zip(args.infiles, args.names):
+        Graph.LoadIsochores(infile, name=name)
+
+    # Draw all the chromosomes in the same image
+    Graph.SaveFigure(args.output, processes=args.jobs)
@@ -42,7 +42,8 @@ import logging
 import argparse
 
 # Modules for dealing with GC content and graph
-from GClib import constants, Graphs, Elements, Utility
+# Graphs is imported only when a graph is requested
+from GClib import constants, Elements, Utility, Profiler, Streaming
 
 # programname
 program_name = os.path.basename(sys.argv[0])
@@ -104,6 +105,18 @@ parser.add_argument(
     type=str,
     required=False,
     help="Output windows CSV file")
+parser.add_argument(
+    '--kmerfile',
+    type=str,
+    required=False,
+    help="Output windows CSV file with dinucleotide and trinucleotide "
+         "(k-mer) frequencies and CpG observed/expected ratio")
+parser.add_argument(
+    '-t',
+    '--tiledir',
+    type=str,
+    required=False,
+    help="Output directory of isochores and windows tiles (PNG)")
 parser.add_argument(
     '-v',
     '--verbose',
@@ -165,6 +178,47 @@ parser.add_argument(
     default=constants.ISO_MIN_SIZE,
     help=("Set how many windows an isochore need to have "
           "(default: '%(default)s')"))
+parser.add_argument(
+    '--regions',
+    type=str,
+    required=False,
+    help="Segment only the regions of this BED file, which could refer to "
+         "many sequences of the input file. Regions are tagged in outfile "
+         "and windowfile")
+parser.add_argument(
+    '-j',
+    '--jobs',
+    type=int,
+    required=False,
+    default=1,
+    help="Number of parallel processes (default: '%(default)s')")
+parser.add_argument(
+    '--stream',
+    action='store_true',
+    help="Read the sequence in chunks, without storing it in memory. "
+         "Windows are the same, but they can't be evaluated in parallel. "
+         "Without graphs, isochores are written while they are found")
+parser.add_argument(
+    '--profile_report',
+    type=str,
+    required=False,
+    help="Write elapsed time, peak memory and counters of each stage in "
+         "this JSON file")
+parser.add_argument(
+    '--profile_stage',
+    type=str,
+    required=False,
+    choices=["load", "scan4gaps", "regions", "stream", "value_windows",
+             "dump_windows", "dump_kmers", "draw_windowgraph",
+             "find_isochores", "dump_isochores", "draw_graph", "draw_bar",
+             "enlarge_labels", "save_figure", "draw_tiles"],
+    help="Profile this stage with cProfile")
+parser.add_argument(
+    '--profile_file',
+    type=str,
+    required=False,
+    help="cProfile statistics file of profile_stage (default: "
+         "'<profile_stage>.prof')")
 args = parser.parse_args()
 
 # debug
@@ -196,10 +250,42 @@ if __name__ == "__main__":
 
     # To continue work, I need almost one file to write
     if (args.outfile is None and args.graphfile is None and
-            args.barfile is None):
+            args.barfile is None and args.tiledir is None):
         raise Exception(
             "You must specify an output isochore file while calling this "
-            "program, by graphfile, barfile or outfile option")
+            "program, by graphfile, barfile, tiledir or outfile option")
+
+    # In region mode, only CSV files are written
+    if args.regions is not None:
+        if (args.graphfile is not None or args.barfile is not None or
+                args.windowgraph is not None or args.tiledir is not None):
+            raise Exception("Only CSV files can be written with regions")
+
+        if args.outfile is None and args.windowfile is None:
+            raise Exception(
+                "You must specify outfile or windowfile with regions")
+
+        if args.sequence_start != 1 or args.max_length is not None:
+            raise Exception(
+                "sequence_start and max_length can't be used with regions")
+
+        if args.stream is True:
+            raise Exception("stream can't be used with regions")
+
+        if args.kmerfile is not None:
+            raise Exception("kmerfile can't be used with regions")
+
+    # streamed sequences are not stored: k-mers can't be counted
+    if args.stream is True and args.kmerfile is not None:
+        raise Exception("kmerfile can't be used with stream")
+
+    if args.stream is True and args.jobs != 1:
+        raise Exception("jobs can't be used with stream")
+
+    # loading the plotting stack (gd, PIL, matplotlib) only if necessary
+    if (args.graphfile is not None or args.barfile is not None or
+            args.windowgraph is not None or args.tiledir is not None):
+        from GClib import Graphs
 
     # Chromosome istance will not Dump isochore if file exist. So I can verify
     # this before reading fasta file. Outfile is a required option
@@ -220,11 +306,21 @@ if __name__ == "__main__":
         args.windowfile,
         remove_if_exists=args.force_overwrite)
 
+    # Checking for k-mer file existance
+    Utility.FileExists(
+        args.kmerfile,
+        remove_if_exists=args.force_overwrite)
+
     # Checking for window graph file existance
     Utility.FileExists(
         args.windowgraph,
         remove_if_exists=args.force_overwrite)
 
+    # Checking for tile directory existance (old tiles will be removed)
+    if (args.tiledir is not None and os.path.exists(args.tiledir) and
+            args.force_overwrite is False):
+        raise IOError("directory %s exists!!!" % (args.tiledir))
+
     # sequence_start can't be negative
     if args.sequence_start <= 0:
         raise Exception("Sequence start must be 1-based and > 0")
@@ -244,60 +340,160 @@ if __name__ == "__main__":
         # Setting max_length as To coordinates, starting from sequence start
         To = args.sequence_start + args.max_length
 
-    # Evaluaing isochore min size
-    if args.isochore_min_size != constants.ISO_MIN_SIZE:
-        # TODO: avoid to change constants, pass this as an argument
-        constants.ISO_MIN_SIZE = args.isochore_min_size
+    # The settings of this segmentation. GClib.constants are only defaults
+    settings = Elements.Settings(
+        window_size=args.window_size,
+        min_size=args.isochore_min_size,
+        y_min=args.y_min,
+        y_max=args.y_max)
+
+    # horizontal lines are drawn at class limits (the last one is the upper
+    # limit of the graph)
+    h_lines = [level for Class, level in settings.class_to_level[:-1]]
+
+    # measure each stage of the pipeline
+    profiler = Profiler.Profiler(
+        profile_stage=args.profile_stage, profile_file=args.profile_file)
+
+    if args.stream is True:
+        # gaps and windows are evaluated while the sequence is read
+        records = Streaming.StreamFastaFile(args.infile)
+        record, chunks = next(records, (None, None))
+
+        if record is None:
+            raise Exception("No sequence found")
+
+        # Without graphs, windows and isochores aren't kept in memory
+        if (args.graphfile is None and args.barfile is None and
+                args.windowgraph is None and args.tiledir is None):
+            profiler.Start("stream")
+            window_stream, isochore_stream = Streaming.Segment(
+                chunks,
+                outfile=args.outfile,
+                windowfile=args.windowfile,
+                From=args.sequence_start,
+                To=To,
+                settings=settings)
+
+            # TODO: Deal with more than 1 sequence in input file
+            if next(records, None) is not None:
+                raise Exception("Cannot handle more than 1 sequence")
+
+            profiler.Count("gaps", len(window_stream.gaps))
+            profiler.Count("windows", isochore_stream.n_of_windows)
+            profiler.Count("merges", isochore_stream.n_of_merges)
+
+            if args.profile_report is not None:
+                profiler.DumpReport(args.profile_report)
+
+            sys.exit(0)
+
+        profiler.Start("value_windows")
+        Chrom = Streaming.StreamChromosome(
+            chunks,
+            name=record.name,
+            From=args.sequence_start,
+            To=To,
+            settings=settings)
+
+        # TODO: Deal with more than 1 sequence in input file
+        if next(records, None) is not None:
+            raise Exception("Cannot handle more than 1 sequence")
+
+        profiler.Count("gaps", len(Chrom.gaps))
 
-    # Open the sequence file
-    FastaFile = Utility.FastaFile(args.infile)
+    else:
+        # Open the sequence file
+        profiler.Start("load")
+        FastaFile = Utility.FastaFile(args.infile, raw=True)
+        profiler.Count("sequences", FastaFile.n_of_sequences)
 
-    # Seq Record object
-    seqRecord = None
+        # Region mode: each chromosome is read once, for all its regions
+        if args.regions is not None:
+            regions = Elements.Regions()
+            regions.LoadRegions(args.regions)
 
-    # TODO: Deal with more than 1 sequence in input file
-    if FastaFile.n_of_sequences == 0:
-        raise Exception("No sequence found")
+            profiler.Start("scan4gaps")
 
-    elif FastaFile.n_of_sequences == 1:
-        seqRecord = FastaFile.GetNextSeq()
+            for name in regions.GetChromosomeNames():
+                if name not in FastaFile.seqs_ids:
+                    raise Exception(
+                        "Sequence %s not found in %s" % (name, args.infile))
 
-    else:
-        raise Exception(
-            "Cannot handle %s sequences" %
-            (FastaFile.n_of_sequences))
+                # gaps are determined once for each chromosome
+                regions.AddChromosome(
+                    Elements.Chromosome(
+                        FastaFile.GetSeqbyID(name), settings=settings))
 
-    # Instantiating Chromosome Class with seqRecord object (gaps are
-    # determined automatically)
-    Chrom = Elements.Chromosome(seqRecord)
+            profiler.Count("gaps", sum([
+                len(chromosome.gaps)
+                for chromosome in regions.chromosomes.values()]))
 
-    # Call valuewindos with user defined window size
-    Chrom.ValueWindows(
-        window_size=args.window_size,
-        From=args.sequence_start,
-        To=To)
+            profiler.Start("regions")
+            regions.Segment(processes=args.jobs)
+            profiler.Count("regions", len(regions.regions))
+
+            if args.outfile is not None:
+                profiler.Start("dump_isochores")
+                regions.DumpIsochores(args.outfile)
+
+            if args.windowfile is not None:
+                profiler.Start("dump_windows")
+                regions.DumpWindows(args.windowfile)
+
+            if args.profile_report is not None:
+                profiler.DumpReport(args.profile_report)
+
+            sys.exit(0)
+
+        # Seq Record object
+        seqRecord = None
+
+        # TODO: Deal with more than 1 sequence in input file
+        if FastaFile.n_of_sequences == 0:
+            raise Exception("No sequence found")
+
+        elif FastaFile.n_of_sequences == 1:
+            seqRecord = FastaFile.GetNextSeq()
+
+        else:
+            raise Exception(
+                "Cannot handle %s sequences" %
+                (FastaFile.n_of_sequences))
+
+        # Instantiating Chromosome Class with seqRecord object (gaps are
+        # determined automatically)
+        profiler.Start("scan4gaps")
+        Chrom = Elements.Chromosome(seqRecord, settings=settings)
+        profiler.Count("gaps", len(Chrom.gaps))
+
+        # Call valuewindos with user defined window size
+        profiler.Start("value_windows")
+        Chrom.ValueWindows(
+            From=args.sequence_start,
+            To=To,
+            processes=args.jobs)
+    profiler.Count("windows", len(Chrom.windows))
 
     # Writing windows in a file (if I need it)
     if args.windowfile is not None:
+        profiler.Start("dump_windows")
         Chrom.DumpWindows(args.windowfile)
 
+    # Writing windows k-mer profiles in a file (if I need it)
+    if args.kmerfile is not None:
+        profiler.Start("dump_kmers")
+        Chrom.DumpProfiles(args.kmerfile)
+
     # Writing the window graph file, if is needed
     if args.windowgraph is not None:
-        # Instantiating DrawChromosome Class. Look at sequence start (0-based
-        # sequence start, this has been fixed in the top of this main block)
-        Graph = Graphs.DrawChromosome(sequence_start=args.sequence_start)
-
-        # beware user defined min and max values
-        if args.y_max is not None or args.y_min is not None:
-            # If only one value is defined by the user, get the othert value
-            if args.y_max is None:
-                args.y_max = Graph.y_max
-
-            if args.y_min is None:
-                args.y_min = Graph.y_min
+        profiler.Start("draw_windowgraph")
 
-            # Set max and min values
-            Graph.SetMinMaxValues(args.y_min, args.y_max)
+        # Instantiating DrawChromosome Class. Look at sequence start (0-based
+        # sequence start, this has been fixed in the top of this main block).
+        # Max and min values are read from settings
+        Graph = Graphs.DrawChromosome(
+            sequence_start=args.sequence_start, settings=settings)
 
         # Fixing appropriate values
         if args.max_length is not None:
@@ -309,7 +505,7 @@ if __name__ == "__main__":
             Graph.SetSequenceLength(Chrom.size)
 
         Graph.InitPicture()
-        Graph.SetHorizontalLines([37, 41, 46, 53])
+        Graph.SetHorizontalLines(h_lines)
         Graph.SetColorsList(colorbyclass=True)
 
         # Draw the correct values
@@ -325,34 +521,34 @@ if __name__ == "__main__":
 
         # Finishing picture
         Graph.FinishPicture(drawlabels=False)
+
+        profiler.Start("enlarge_labels")
         Graph.EnlargeLabels()
+
+        profiler.Start("save_figure")
         Graph.SaveFigure(args.windowgraph)
 
     # Finding Isochores. This program tries to segmenting genome into
     # isochores, and so this calculation is always done
+    profiler.Start("find_isochores")
     Chrom.FindIsochores()
+    profiler.Count("isochores", len(Chrom.isochores))
+    profiler.Count("merges", Chrom.n_of_merges)
 
     if args.outfile is not None:
         # Writing Isochores in file
+        profiler.Start("dump_isochores")
         Chrom.DumpIsochores(args.outfile)
 
     # Instantiating graph if it is necessary
     if args.graphfile is not None:
-        # Instantiating DrawChromosome Class. Look at sequence start (0-based
-        # sequence start, this has been fixed in the top of this main block)
-        Graph = Graphs.DrawChromosome(sequence_start=args.sequence_start)
+        profiler.Start("draw_graph")
 
-        # beware user defined min and max values
-        if args.y_max is not None or args.y_min is not None:
-            # If only one value is defined by the user, get the othert value
-            if args.y_max is None:
-                args.y_max = Graph.y_max
-
-            if args.y_min is None:
-                args.y_min = Graph.y_min
-
-            # Set max and min values
-            Graph.SetMinMaxValues(args.y_min, args.y_max)
+        # Instantiating DrawChromosome Class. Look at sequence start (0-based
+        # sequence start, this has been fixed in the top of this main block).
+        # Max and min values are read from settings
+        Graph = Graphs.DrawChromosome(
+            sequence_start=args.sequence_start, settings=settings)
 
         # Fixing appropriate values
         if args.max_length is not None:
@@ -364,7 +560,7 @@ if __name__ == "__main__":
             Graph.SetSequenceLength(Chrom.size)
 
         Graph.InitPicture()
-        Graph.SetHorizontalLines([37, 41, 46, 53])
+        Graph.SetHorizontalLines(h_lines)
         Graph.SetColorsList(colorbyclass=True)
 
         # Draw the correct values
@@ -379,17 +575,23 @@ if __name__ == "__main__":
             Graph.DrawChName(args.draw_chname)
 
         Graph.FinishPicture(drawlabels=False)
+
+        profiler.Start("enlarge_labels")
         Graph.EnlargeLabels()
+
+        profiler.Start("save_figure")
         Graph.SaveFigure(args.graphfile)
 
     # Create bar graph isocore grap (as Schmidt and Frishman 2008) if it is
     # necessary
     if args.barfile is not None:
+        profiler.Start("draw_bar")
+
         # Instantiating DrawBarChromosome Class. Look at sequence start
         # (0-based sequence start, this has been fixed in the top of this main
         # block)
         Graph = Graphs.DrawBarChromosome(
-            sequence_start=args.sequence_start)
+            sequence_start=args.sequence_start, settings=settings)
 
         # there are no min and max values in this graph style
 
@@ -418,5 +620,36 @@ if __name__ == "__main__":
             Graph.DrawChName(args.draw_chname)
 
         Graph.FinishPicture(drawlabels=False)
+
+        profiler.Start("enlarge_labels")
         Graph.EnlargeLabels()
+
+        profiler.Start("save_figure")
         Graph.SaveFigure(args.barfile)
+
+    # Draw isochores and windows in a tile pyramid if it is necessary
+    if args.tiledir is not None:
+        profiler.Start("draw_tiles")
+
+        # Instantiating TilePyramid Class. Look at sequence start (0-based
+        # sequence start, this has been fixed in the top of this main block).
+        # Max and min values are read from settings
+        Pyramid = Graphs.TilePyramid(
+            sequence_start=args.sequence_start, settings=settings)
+
+        # Fixing appropriate values
+        if args.max_length is not None:
+            # SetSequencelength needs the To position (the absolute end
+            # position)
+            Pyramid.SetSequenceLength(To)
+
+        else:
+            Pyramid.SetSequenceLength(Chrom.size)
+
+        Pyramid.AddIsochoreTrack(isochores=Chrom.isochores)
+        Pyramid.AddWindowTrack(windows=Chrom.windows)
+        Pyramid.SaveTiles(args.tiledir, processes=args.jobs, check=False)
+
+    # Writing the profile report, if is needed
+    if args.profile_report is not None:
+        profiler.DumpReport(args.profile_report)
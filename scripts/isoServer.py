@@ -0,0 +1,187 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+
+Created on Mon Oct 19 15:52:37 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A local HTTP server to segment chromosomes kept in memory. Request example:
+
+    http://localhost:8080/segment?genome=hg38&chrom=chr21&window_size=100000
+
+"""
+
+import os
+import sys
+import logging
+import argparse
+
+# Modules for dealing with GC content
+from GClib import Server
+
+# programname
+program_name = os.path.basename(sys.argv[0])
+
+# Add epilog on bottom of help message
+epilog = """
+
+Requests:
+
+    GET /segment?genome=NAME&chrom=CHROM[&start=1&end=...&window_size=...
+        &gap_tolerance=...&min_size=...&format=csv|json|png]
+    GET /status
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+"""
+
+notice = """
+
+isoSegmenter  Copyright (C) 2013-2021 ITB - CNR
+This program comes with ABSOLUTELY NO WARRANTY; for details type:
+
+    `isoServer.py --help'.
+
+This is free software, and you are welcome to redistribute it
+under certain conditions; show LICENSE.md for more details.
+
+"""
+
+parser = argparse.ArgumentParser(
+    description='Segment chromosomes kept in memory with a local HTTP server',
+    epilog=epilog,
+    formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument(
+    '-g',
+    '--genome',
+    type=str,
+    required=True,
+    action='append',
+    help="A genome served, as NAME=FASTA (even compressed). Could be "
+         "specified many times")
+parser.add_argument(
+    '--host',
+    type=str,
+    required=False,
+    default="localhost",
+    help="Listen on this address (default: '%(default)s')")
+parser.add_argument(
+    '-p',
+    '--port',
+    type=int,
+    required=False,
+    default=8080,
+    help="Listen on this port (default: '%(default)s')")
+parser.add_argument(
+    '--cache_size',
+    type=int,
+    required=False,
+    default=4,
+    help="Number of chromosomes kept in memory (default: '%(default)s')")
+parser.add_argument(
+    '-j',
+    '--jobs',
+    type=int,
+    required=False,
+    default=2,
+    help="Number of segmentation workers (default: '%(default)s')")
+parser.add_argument(
+    '--max_pending',
+    type=int,
+    required=False,
+    default=16,
+    help="Max number of queued or running jobs (default: '%(default)s')")
+parser.add_argument(
+    '--timeout',
+    type=int,
+    required=False,
+    default=60,
+    help="Seconds a request waits for its job (default: '%(default)s')")
+parser.add_argument(
+    '-v',
+    '--verbose',
+    action='store_true',
+    help="Set logging to debug mode")
+args = parser.parse_args()
+
+# get debugging level
+mylevel = logging.INFO
+
+if args.verbose:
+    mylevel = logging.DEBUG
+
+# get a logger with a defined name
+logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=mylevel)
+logger = logging.getLogger(program_name)
+
+
+if __name__ == "__main__":
+    # print out notice
+    logger.info(notice)
+
+    # genomes names and FASTA files
+    genomes = {}
+
+    for genome in args.genome:
+        if "=" not in genome:
+            raise Exception("Genome must be specified as NAME=FASTA")
+
+        name, fasta_file = genome.split("=", 1)
+
+        if not os.path.exists(fasta_file):
+            raise IOError("file %s doesn't exist" % (fasta_file))
+
+        genomes[name] = fasta_file
+
+    server = Server.SegmentationServer(
+        (args.host, args.port), genomes, cache_size=args.cache_size,
+        workers=args.jobs, max_pending=args.max_pending,
+        job_timeout=args.timeout)
+
+    logger.info(
+        "Serving %s on %s:%s" %
+        (", ".join(sorted(genomes.keys())), args.host,
+         server.server_address[1]))
+
+    try:
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+
+    finally:
+        server.server_close()
@@ -43,9 +43,7 @@ import logging
 import argparse
 
 import GClib
-from GClib.Graphs import MoreGraphsError
-
-from PIL import Image
+from GClib.Graphs import ImageStack
 
 # programname
 program_name = os.path.basename(sys.argv[0])
@@ -98,76 +96,17 @@ logging.basicConfig(
 logger = logging.getLogger(program_name)
 
 
-# A class instance in order to record useful variables
-class Tile():
-    def __init__(self):
-        self.x = 0
-        self.y = 0
-        self.image = None
-        self.n_of_graphs = 0
-
-    def SaveFigure(self, filename, check=True):
-        """Save figure to a file. Check file existance"""
-
-        if self.image is None:
-            # I have no image to save
-            raise MoreGraphsError(
-                "No BaseGraph or derivate were added to this class instance")
-
-        # checking for file existance
-        if os.path.exists(filename) and check is True:
-            raise MoreGraphsError("File %s exists!!!" % (filename))
-
-        # Determing if the Image is already drawn in temporary files
-        self.image.save(filename)
-
-        logger.info("Image saved in %s" % (filename))
-
-
 if __name__ == "__main__":
     # print out notice
     logger.info(notice)
 
-    # instantiate a tile class
-    tile = Tile()
+    # instantiate an image stack: only image headers are read here
+    stack = ImageStack()
 
     # For each image files
     for image_file in args.image_files:
-        # Open the image file
-        image = Image.open(image_file)
-
-        # get current size
-        x, y = image.size
-
-        if tile.n_of_graphs == 0:
-            # read first image for the first time
-            tile.image = image
-
-        else:
-            # create a new temporary image
-            tmp_image = Image.new(
-                'RGB', (max(x, tile.x), y + tile.y), color=(255, 255, 255))
-
-            # copy the old image in the new temporary image
-            box = (0, 0, tile.x, tile.y)
-            region = tile.image.crop(box)
-            tmp_image.paste(region, box)
-
-            # cut the current graph_image. Define a box
-            box = (0, 0, x, y)
-            region = image.crop(box)
-
-            # Define a box in which put an image. X will ne 0, by Y will be
-            # image heigth
-            box = (0, tile.y, x, y + tile.y)
-            tmp_image.paste(region, box)
-
-            # Set tile image as temporary image
-            tile.image = tmp_image
-
-        # updating class attributes
-        tile.n_of_graphs += 1
-        tile.x, tile.y = tile.image.size
+        stack.AddImage(image_file)
 
-    # Outside the cicle, save the image
-    tile.SaveFigure(args.output)
+    # Outside the cicle, save the image. Each image is decoded and written in
+    # the output file one at a time
+    stack.SaveFigure(args.output)
@@ -136,7 +136,10 @@ setup(
     scripts=[
         'scripts/isoSegmenter.py',
         'scripts/tileImages.py',
-        'scripts/isoFamily.py'],
+        'scripts/isoFamily.py',
+        'scripts/isoKaryotype.py',
+        'scripts/isoServer.py',
+        'scripts/isoCampaign.py'],
 
     # Alternatively, if you want to distribute just a my_module.py, uncomment
     # this:
@@ -160,6 +163,7 @@ setup(
     extras_require={
         'dev': ['check-manifest'],
         'test': ['coveralls', 'nose'],
+        'scandir': ['scandir'],
     },
 
     # testing modules
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+Created on Mon Oct 19 16:41:03 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A test module for Campaign library
+
+"""
+
+import os
+import gzip
+import json
+import Queue
+import numpy
+import shutil
+import tempfile
+import unittest
+import StringIO
+
+import Bio.Seq
+import Bio.SeqRecord
+
+import GClib.Elements
+import GClib.Campaign
+import GClib.Streaming
+import GClib
+
+
+class test_Campaign(unittest.TestCase):
+    def setUp(self):
+        """Write two genomes and a manifest"""
+
+        random = numpy.random.RandomState(42)
+
+        self.directory = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.directory, "campaign")
+
+        self.sequences = {}
+
+        for genome in ["genome1", "genome2"]:
+            fasta_file = os.path.join(self.directory, genome + ".fa.gz")
+            handle = gzip.open(fasta_file, "w")
+
+            for chrom in ["chr1", "chr2"]:
+                at = "".join(random.choice(list("AATTGC"), 50000))
+                gc = "".join(random.choice(list("AATGGGCC"), 50000))
+                sequence = at + "N" * 6000 + gc
+
+                self.sequences[(genome, chrom)] = sequence
+
+                handle.write(">%s\n" % (chrom))
+
+                for i in range(0, len(sequence), 60):
+                    handle.write(sequence[i:i + 60] + "\n")
+
+            handle.close()
+
+        self.manifest = {
+            "output_dir": self.output_dir,
+            "defaults": {"window_size": 10000, "gap_tolerance": 5000,
+                         "min_size": 2, "windows": True},
+            "genomes": [
+                {"name": "genome1",
+                 "fasta": os.path.join(self.directory, "genome1.fa.gz")},
+                {"name": "genome2",
+                 "fasta": os.path.join(self.directory, "genome2.fa.gz"),
+                 "window_size": 20000, "chromosomes": ["chr2"]}]}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _Expected(self, genome, chrom, window_size):
+        """Segment a chromosome with Elements"""
+
+        sequence = self.sequences[(genome, chrom)]
+        seqRecord = Bio.SeqRecord.SeqRecord(
+            Bio.Seq.Seq(sequence), id=chrom, name=chrom)
+
+        Chrom = GClib.Elements.Chromosome(seqRecord)
+        Chrom.ValueWindows(window_size=window_size, gap_tolerance=5000)
+        Chrom.FindIsochores(min_size=2)
+
+        handle = StringIO.StringIO()
+        Chrom.DumpIsochores(outfile=handle)
+
+        return handle.getvalue()
+
+    def _Read(self, genome, chrom, kind="isochores"):
+        filename = os.path.join(
+            self.output_dir, genome, "%s.%s.csv" % (chrom, kind))
+
+        with open(filename) as handle:
+            return handle.read()
+
+    def test_Run(self):
+        """Segment all the genomes of a manifest"""
+
+        campaign = GClib.Campaign.Campaign(self.manifest, processes=2)
+
+        self.assertEqual(campaign.Run(), 0)
+        self.assertEqual(campaign.n_of_completed, 3)
+
+        for genome, chrom, window_size in [("genome1", "chr1", 10000),
+                                           ("genome1", "chr2", 10000),
+                                           ("genome2", "chr2", 20000)]:
+            self.assertEqual(
+                self._Read(genome, chrom),
+                self._Expected(genome, chrom, window_size))
+
+            # windows were written too
+            self.assertTrue(len(self._Read(genome, chrom, "windows")) > 0)
+
+        # chromosomes not in manifest are not segmented
+        self.assertFalse(os.path.exists(os.path.join(
+            self.output_dir, "genome2", "chr1.isochores.csv")))
+
+    def test_Resume(self):
+        """Only the missing chromosomes are segmented again"""
+
+        campaign = GClib.Campaign.Campaign(self.manifest, processes=1)
+        self.assertEqual(campaign.Run(), 0)
+
+        # a lost output, and a task not recorded in checkpoint
+        os.remove(os.path.join(
+            self.output_dir, "genome1", "chr1.isochores.csv"))
+
+        checkpoint_file = os.path.join(self.output_dir, "checkpoint.json")
+
+        with open(checkpoint_file) as handle:
+            checkpoint = json.load(handle)
+
+        del(checkpoint["completed"]["genome1/chr2"])
+
+        with open(checkpoint_file, "w") as handle:
+            json.dump(checkpoint, handle)
+
+        campaign = GClib.Campaign.Campaign(self.manifest, processes=1)
+        self.assertEqual(campaign.Run(), 0)
+        self.assertEqual(campaign.n_of_completed, 2)
+        self.assertEqual(campaign.n_of_skipped, 1)
+
+        self.assertEqual(
+            self._Read("genome1", "chr1"),
+            self._Expected("genome1", "chr1", 10000))
+
+        # a completed campaign does nothing
+        campaign = GClib.Campaign.Campaign(self.manifest, processes=1)
+        self.assertEqual(campaign.Run(), 0)
+        self.assertEqual(campaign.n_of_completed, 0)
+        self.assertEqual(campaign.n_of_skipped, 3)
+
+        # changing parameters means a new segmentation
+        self.manifest["genomes"][1]["window_size"] = 10000
+
+        campaign = GClib.Campaign.Campaign(self.manifest, processes=1)
+        self.assertEqual(campaign.Run(), 0)
+        self.assertEqual(campaign.n_of_completed, 1)
+
+    def test_Failures(self):
+        """Missing files and chromosomes are recorded as failures"""
+
+        self.manifest["genomes"].append(
+            {"name": "genome3",
+             "fasta": os.path.join(self.directory, "missing.fa")})
+        self.manifest["genomes"][1]["chromosomes"] = ["chr2", "chrX"]
+
+        campaign = GClib.Campaign.Campaign(
+            self.manifest, processes=1, retries=0)
+
+        self.assertEqual(campaign.Run(), 2)
+        self.assertEqual(campaign.n_of_completed, 3)
+
+    def test_Streaming(self):
+        """Chromosomes are queued while their FASTA file is read"""
+
+        campaign = GClib.Campaign.Campaign(self.manifest, processes=1)
+        queue = Queue.Queue()
+
+        # the tasks in queue when each record is read
+        events = []
+        stream_fasta_file = GClib.Streaming.StreamFastaFile
+
+        def recording(fasta_file, *args, **kwargs):
+            for record, chunks in stream_fasta_file(
+                    fasta_file, *args, **kwargs):
+                events.append((record.id, queue.qsize()))
+                yield record, chunks
+
+        GClib.Streaming.StreamFastaFile = recording
+
+        try:
+            ids = campaign._ReadGenome(
+                self.manifest["genomes"][0], None, set(), queue)
+
+        finally:
+            GClib.Streaming.StreamFastaFile = stream_fasta_file
+
+        self.assertEqual(ids, ["chr1", "chr2"])
+        self.assertEqual(events, [("chr1", 0), ("chr2", 1)])
+
+        # the same bases of the FASTA file
+        while not queue.empty():
+            kind, genome, (chrom, sequence) = queue.get()
+            self.assertEqual(
+                sequence[:], self.sequences[("genome1", chrom)])
+            sequence.Close()
+
+    def test_ReaderFailure(self):
+        """A failing reader stops the campaign, without waiting forever"""
+
+        def failing(*args, **kwargs):
+            raise OSError("No space left on device")
+
+        shared_sequence = GClib.Utility.SharedSequence
+        GClib.Utility.SharedSequence = failing
+
+        try:
+            campaign = GClib.Campaign.Campaign(self.manifest, processes=1)
+            self.assertRaises(GClib.Campaign.CampaignError, campaign.Run)
+
+        finally:
+            GClib.Utility.SharedSequence = shared_sequence
+
+        # a reader which dies without telling it
+        campaign = GClib.Campaign.Campaign(self.manifest, processes=1)
+        campaign._ReadGenomes = lambda queue: None
+
+        self.assertRaises(GClib.Campaign.CampaignError, campaign.Run)
+
+    def test_Manifest(self):
+        """A manifest needs genomes and an output directory"""
+
+        self.assertRaises(
+            GClib.Campaign.CampaignError, GClib.Campaign.Campaign,
+            {"genomes": []})
+
+        self.assertRaises(
+            GClib.Campaign.CampaignError, GClib.Campaign.Campaign,
+            {"output_dir": self.output_dir, "genomes": [{"name": "test"}]})
+
+
+if __name__ == "__main__":
+    unittest.main()
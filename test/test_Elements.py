@@ -32,11 +32,16 @@ Created on Fri May 31 17:07:40 2013
 """
 
 import os
+import re
 import csv
 import numpy
+import pickle
+import shutil
 import tempfile
 import unittest
+import Bio.Seq
 import Bio.SeqUtils
+import Bio.SeqRecord
 
 import GClib.Elements
 import GClib.Utility
@@ -70,6 +75,122 @@ class test_CalcClass(unittest.TestCase):
             result = GClib.Elements.CalcClass(GClevel)
             self.assertEqual(result, Class)
 
+    def test_ClassScheme(self):
+        """Testing class codes of a GClevels array"""
+
+        scheme = GClib.Elements.ClassScheme()
+
+        GClevels = [GClevel for GClevel, Class in self.GClevels]
+        codes = scheme.GetCodes(GClevels)
+
+        self.assertEqual(codes.dtype, numpy.int8)
+        self.assertEqual(
+            list(scheme.GetLabels(codes)),
+            [Class for GClevel, Class in self.GClevels])
+
+        # a user defined scheme
+        scheme = GClib.Elements.ClassScheme({"low": 40, "high": 50, "x": 0})
+        self.assertEqual(scheme.labels, ["x", "low", "high"])
+        self.assertEqual(list(scheme.GetCodes([-1, 0, 39, 40.5, 70])),
+                         [0, 0, 1, 2, 2])
+        self.assertEqual(scheme.GetClass(39), "low")
+
+        self.assertRaises(
+            GClib.Elements.ElementError, GClib.Elements.ClassScheme, {})
+
+    def test_ClassifyWindows(self):
+        """Testing windows classification with new limits"""
+
+        windows = [GClib.Elements.Window(0, 10, 36.0),
+                   GClib.Elements.Gap(10, 20),
+                   GClib.Elements.Window(20, 30, 45.0)]
+
+        scheme = GClib.Elements.ClassScheme({"low": 40, "high": 100})
+        codes = GClib.Elements.ClassifyWindows(windows, scheme)
+
+        self.assertEqual(list(codes), [0, -1, 1])
+        self.assertEqual([window.Class for window in windows],
+                         ["low", "gap", "high"])
+
+        # default classes
+        GClib.Elements.ClassifyWindows(windows)
+        self.assertEqual([window.Class for window in windows],
+                         ["L1", "gap", "H1"])
+
+
+class test_Settings(unittest.TestCase):
+    def setUp(self):
+        """A random sequence with a gap"""
+
+        random = numpy.random.RandomState(7)
+        bases = numpy.array(list("AACGTTGC"))
+        sequence = "".join(random.choice(bases, 100000))
+        sequence = sequence[:40000] + "N" * 6000 + sequence[46000:]
+
+        self.seqRecord = Bio.SeqRecord.SeqRecord(
+            Bio.Seq.Seq(sequence), id="chrTest", name="chrTest")
+
+    def test_Defaults(self):
+        """Missing values are read from constants"""
+
+        settings = GClib.Elements.Settings(min_size=4)
+
+        self.assertEqual(settings.window_size, GClib.constants.WINDOW_SIZE)
+        self.assertEqual(settings.gap_tolerance, GClib.constants.GAP_TOLERANCE)
+        self.assertEqual(settings.min_size, 4)
+        self.assertEqual(settings.GetClassToLevel(),
+                         GClib.constants.CLASS_TO_LEVEL)
+        self.assertEqual(settings.y_min, GClib.constants.GRAPH_GC_MIN)
+        self.assertEqual(settings.y_max, GClib.constants.GRAPH_GC_MAX)
+
+        # settings are immutable, and could be used as dictionary keys
+        self.assertRaises(AttributeError, setattr, settings, "min_size", 2)
+        self.assertEqual(
+            {settings: 1}[GClib.Elements.Settings(min_size=4)], 1)
+        self.assertEqual(settings.Replace(min_size=2),
+                         GClib.Elements.Settings())
+
+        # the same class limits share the same scheme
+        self.assertIs(settings.GetClassScheme(),
+                      GClib.Elements.Settings().GetClassScheme())
+
+        self.assertEqual(pickle.loads(pickle.dumps(settings)), settings)
+
+        for values in [{"window_size": 0}, {"gap_tolerance": -1},
+                       {"min_size": 0}, {"class_to_level": {}},
+                       {"y_min": 40, "y_max": 40}]:
+            self.assertRaises(
+                GClib.Elements.SettingsError, GClib.Elements.Settings,
+                **values)
+
+    def test_Chromosome(self):
+        """Chromosome settings don't depend on constants"""
+
+        settings = GClib.Elements.Settings(
+            window_size=3000, min_size=3,
+            class_to_level={"low": 50, "high": 100})
+
+        chromosome = GClib.Elements.Chromosome(
+            self.seqRecord, settings=settings)
+        chromosome.ValueWindows()
+        chromosome.FindIsochores()
+
+        self.assertEqual(chromosome.windows[0].size, 3000)
+        self.assertEqual(
+            set([isochore.Class for isochore in chromosome.isochores]),
+            set(["low", "high", "gap"]))
+
+        # the same segmentation, with explicit values
+        reference = GClib.Elements.Chromosome(self.seqRecord)
+        reference.ValueWindows(window_size=3000)
+        GClib.Elements.ClassifyWindows(
+            reference.windows, settings.GetClassScheme())
+
+        self.assertEqual(reference.windows, chromosome.windows)
+
+        # default settings are the constants at call time
+        self.assertEqual(reference.GetSettings(), GClib.Elements.Settings())
+
 
 class test_Element(unittest.TestCase):
     def setUp(self):
@@ -784,7 +905,528 @@ class test_Chromosome(unittest.TestCase):
         self.assertEqual(len(chromosome.isochores), 634)
 
 
-# TODO: test code for families element
+class test_GCIndex(unittest.TestCase):
+    def setUp(self):
+        """A random sequence with G, C, S, N in both cases"""
+
+        random = numpy.random.RandomState(42)
+        bases = numpy.array(list("ACGTNSacgtns"))
+        self.sequence = "".join(random.choice(bases, 20000))
+
+        self.gc_index = GClib.Elements.GCIndex(self.sequence, block_size=64)
+
+    def test_GClevel(self):
+        """Testing GClevel is equal to Bio.SeqUtils.GC"""
+
+        for start, end in [(0, 20000), (0, 64), (10, 50), (63, 129),
+                           (1000, 19999), (5, 6)]:
+            self.assertEqual(
+                self.gc_index.GClevel(start, end),
+                Bio.SeqUtils.GC(self.sequence[start:end]))
+
+    def test_Counts(self):
+        """Testing G+C counts of many intervals at once"""
+
+        random = numpy.random.RandomState(7)
+        bounds = numpy.sort(random.randint(0, 20001, size=(500, 2)), axis=1)
+        bounds = numpy.vstack([bounds, [[0, 20000], [19990, 20000],
+                                        [64, 128], [5, 5]]])
+
+        counts = self.gc_index.Counts(bounds[:, 0], bounds[:, 1])
+
+        self.assertEqual(
+            list(counts),
+            [self.gc_index.Count(start, end) for start, end in bounds])
+
+        # positions after the sequence end
+        self.assertRaises(
+            GClib.Elements.GCIndexError, self.gc_index.Counts, [0], [20001])
+
+    def test_FindRuns(self):
+        """Testing N runs are the same of a regular expression"""
+
+        starts, ends = GClib.Elements._find_runs(
+            self.sequence, GClib.Elements._is_n, block_size=100)
+
+        matches = list(re.finditer("N+", self.sequence, flags=re.IGNORECASE))
+
+        self.assertEqual(list(starts), [match.start() for match in matches])
+        self.assertEqual(list(ends), [match.end() for match in matches])
+
+        # runs at sequence ends and between blocks
+        starts, ends = GClib.Elements._find_runs(
+            "NNACNNNNnnTTN", GClib.Elements._is_n, block_size=4)
+
+        self.assertEqual(list(starts), [0, 4, 12])
+        self.assertEqual(list(ends), [2, 10, 13])
+
+
+class test_ParallelWindows(unittest.TestCase):
+    def setUp(self):
+        """A random sequence with gaps, at start and end too"""
+
+        random = numpy.random.RandomState(42)
+        bases = numpy.array(list("AACGTT"))
+        sequence = "".join(random.choice(bases, 200000))
+
+        sequence = ("N" * 7000 + sequence[7000:50000] + "N" * 6000 +
+                    sequence[56000:90000] + "N" * 100 + sequence[90100:130000] +
+                    "N" * 20000 + sequence[150000:192000] + "N" * 8000)
+
+        seqRecord = Bio.SeqRecord.SeqRecord(
+            Bio.Seq.Seq(sequence), id="chrTest", name="chrTest")
+
+        self.chromosome = GClib.Elements.Chromosome(seqRecord)
+
+    def test_WindowChunks(self):
+        """Chunks start after gaps or at window starts"""
+
+        gaps = [gap for gap in self.chromosome.gaps if gap.size > 5000]
+
+        bounds = GClib.Elements._window_chunks(gaps, 3000, 0, 200000, 8)
+
+        self.assertEqual(bounds[0], 0)
+        self.assertEqual(bounds[-1], 200000)
+        self.assertEqual(bounds, sorted(set(bounds)))
+
+        starts = [gap.end for gap in gaps]
+
+        for bound in bounds[1:-1]:
+            # the nearest gap end before bound
+            start = max([end for end in starts + [0] if end <= bound])
+            self.assertEqual((bound - start) % 3000, 0)
+
+    def test_ValueWindows(self):
+        """Parallel windows are the same of serial windows"""
+
+        for window_size in [1000, 3000, 7777, 50000]:
+            for From, To in [(None, None), (3000, 170000), (52000, 196000)]:
+                self.chromosome.ValueWindows(
+                    window_size=window_size, From=From, To=To)
+                windows = self.chromosome.windows
+
+                self.chromosome.ValueWindows(
+                    window_size=window_size, From=From, To=To, processes=3)
+
+                self.assertEqual(self.chromosome.windows, windows)
+
+    def test_ValueWindowsAfterEnd(self):
+        """Windows end with the sequence, even with a greater To"""
+
+        self.chromosome.ValueWindows(window_size=3000)
+        windows = self.chromosome.windows
+
+        for processes in [1, 3]:
+            self.chromosome.ValueWindows(
+                window_size=3000, To=250000, processes=processes)
+
+            self.assertEqual(self.chromosome.windows, windows)
+            self.assertEqual(self.chromosome.windows[-1].end, 200000)
+
+
+class test_SegmentChromosomes(unittest.TestCase):
+    def setUp(self):
+        """Random sequences with gaps"""
+
+        random = numpy.random.RandomState(11)
+        bases = numpy.array(list("AACGTTGCS"))
+
+        self.sequences = []
+
+        for i, size in enumerate([60000, 150000, 90000, 20000]):
+            sequence = "".join(random.choice(bases, size))
+            sequence = (sequence[:size // 3] + "N" * 8000 +
+                        sequence[size // 3 + 8000:])
+
+            self.sequences.append(GClib.Utility.FastaRecord(
+                id="chr%s" % (i), data=bytearray(sequence)))
+
+    def test_Threads(self):
+        """Chromosomes segmented by threads are the same of serial ones"""
+
+        settings = GClib.Elements.Settings(window_size=3000, min_size=3)
+
+        serial = GClib.Elements.SegmentChromosomes(
+            self.sequences, settings=settings)
+        threaded = GClib.Elements.SegmentChromosomes(
+            self.sequences, settings=settings, threads=3)
+
+        self.assertEqual([chromosome.name for chromosome in threaded],
+                         ["chr0", "chr1", "chr2", "chr3"])
+
+        for chromosome, reference in zip(threaded, serial):
+            self.assertEqual(chromosome.gaps, reference.gaps)
+            self.assertEqual(chromosome.windows, reference.windows)
+            self.assertEqual(chromosome.isochores, reference.isochores)
+
+        # chromosomes are segmented with their own settings
+        chromosome = GClib.Elements.Chromosome(self.sequences[0])
+        result = GClib.Elements.SegmentChromosomes(
+            [chromosome], settings=settings, threads=2)
+
+        # windows of default size end at the first gap
+        self.assertIs(result[0], chromosome)
+        self.assertEqual(chromosome.windows[0].end, 20000)
+
+
+class test_SharedChromosome(unittest.TestCase):
+    def setUp(self):
+        """A chromosome on a SeqRecord and on a SharedSequence"""
+
+        random = numpy.random.RandomState(42)
+        bases = numpy.array(list("AACGTTS"))
+        sequence = "".join(random.choice(bases, 100000))
+        sequence = sequence[:30000] + "N" * 8000 + sequence[38000:]
+
+        seqRecord = Bio.SeqRecord.SeqRecord(
+            Bio.Seq.Seq(sequence), id="chrTest", name="chrTest")
+
+        self.chromosome = GClib.Elements.Chromosome(seqRecord)
+
+        self.shared = GClib.Utility.SharedSequence(seqRecord)
+        self.shared_chromosome = GClib.Elements.Chromosome(self.shared)
+
+    def tearDown(self):
+        self.shared.Close()
+
+    def test_Chromosome(self):
+        """Gaps, GC content and windows are the same of a SeqRecord"""
+
+        self.assertEqual(self.shared_chromosome.name, "chrTest")
+        self.assertEqual(self.shared_chromosome.size, self.chromosome.size)
+        self.assertEqual(self.shared_chromosome.gaps, self.chromosome.gaps)
+        self.assertAlmostEqual(
+            self.shared_chromosome.GClevel, self.chromosome.GClevel)
+
+        self.chromosome.ValueWindows(window_size=3000)
+
+        for processes in [1, 2]:
+            self.shared_chromosome.ValueWindows(
+                window_size=3000, processes=processes)
+            self.assertEqual(
+                self.shared_chromosome.windows, self.chromosome.windows)
+
+    def test_Pickle(self):
+        """A pickled chromosome doesn't contain its sequence"""
+
+        self.shared_chromosome.BuildGCIndex()
+
+        data = pickle.dumps(self.shared_chromosome, pickle.HIGHEST_PROTOCOL)
+        self.assertLess(len(data), self.shared_chromosome.size)
+
+        other = pickle.loads(data)
+        other.ValueWindows(window_size=3000)
+
+        self.shared_chromosome.ValueWindows(window_size=3000)
+        self.assertEqual(other.windows, self.shared_chromosome.windows)
+
+
+class test_FastaRecordChromosome(unittest.TestCase):
+    def setUp(self):
+        """A chromosome on a SeqRecord and on a FastaRecord"""
+
+        random = numpy.random.RandomState(42)
+        bases = numpy.array(list("AACGTTSn"))
+        sequence = "".join(random.choice(bases, 100000))
+        sequence = sequence[:30000] + "N" * 8000 + sequence[38000:]
+
+        seqRecord = Bio.SeqRecord.SeqRecord(
+            Bio.Seq.Seq(sequence), id="chrTest", name="chrTest")
+        self.chromosome = GClib.Elements.Chromosome(seqRecord)
+
+        record = GClib.Utility.FastaRecord(
+            id="chrTest", data=bytearray(sequence))
+        self.record_chromosome = GClib.Elements.Chromosome(record)
+
+    def test_Chromosome(self):
+        """Gaps, GC content, windows and isochores are the same of a
+        SeqRecord"""
+
+        self.assertEqual(self.record_chromosome.name, "chrTest")
+        self.assertEqual(self.record_chromosome.size, self.chromosome.size)
+        self.assertEqual(self.record_chromosome.gaps, self.chromosome.gaps)
+        self.assertAlmostEqual(
+            self.record_chromosome.GClevel, self.chromosome.GClevel)
+
+        for chromosome in [self.chromosome, self.record_chromosome]:
+            chromosome.ValueWindows(window_size=3000)
+            chromosome.FindIsochores()
+
+        self.assertEqual(
+            self.record_chromosome.windows, self.chromosome.windows)
+        self.assertEqual(
+            self.record_chromosome.isochores, self.chromosome.isochores)
+
+
+class test_Regions(unittest.TestCase):
+    def setUp(self):
+        """A random sequence with gaps"""
+
+        random = numpy.random.RandomState(42)
+        bases = numpy.array(list("ACGT"))
+        sequence = "".join(random.choice(bases, 100000))
+
+        # adding gaps
+        sequence = (sequence[:20000] + "N" * 6000 + sequence[26000:70000] +
+                    "N" * 100 + sequence[70100:])
+
+        seqRecord = Bio.SeqRecord.SeqRecord(
+            Bio.Seq.Seq(sequence), id="chrTest", name="chrTest")
+
+        self.chromosome = GClib.Elements.Chromosome(seqRecord)
+
+        self.regions = [
+            GClib.Utility.Region("chrTest", 0, 100000, "whole"),
+            GClib.Utility.Region("chrTest", 15000, 45000, "gap"),
+            GClib.Utility.Region("chrTest", 60000, 80000, "small_gap")]
+
+    def test_Segment(self):
+        """Testing regions have the same windows and isochores of
+        ValueWindows and FindIsochores"""
+
+        for processes in [1, 2]:
+            regions = GClib.Elements.Regions(self.regions)
+            regions.AddChromosome(self.chromosome)
+            regions.Segment(window_size=5000, processes=processes)
+
+            for i, region in enumerate(self.regions):
+                test_chromosome = GClib.Elements.Chromosome(
+                    self.chromosome.seqRecord)
+                test_chromosome.ValueWindows(
+                    window_size=5000, From=region.start, To=region.end)
+                test_chromosome.FindIsochores()
+
+                self.assertEqual(regions.windows[i], test_chromosome.windows)
+                self.assertEqual(
+                    regions.isochores[i], test_chromosome.isochores)
+
+    def test_MissingChromosome(self):
+        """Testing a region on a missing chromosome"""
+
+        regions = GClib.Elements.Regions(
+            [GClib.Utility.Region("chrMissing", 0, 100, "missing")])
+        regions.AddChromosome(self.chromosome)
+
+        self.assertRaises(GClib.Elements.RegionsError, regions.Segment)
+
+    def test_DumpIsochores(self):
+        """Testing dump isochores of all regions"""
+
+        regions = GClib.Elements.Regions(self.regions)
+        regions.AddChromosome(self.chromosome)
+        regions.Segment(window_size=5000)
+
+        testfile = tempfile.mktemp()
+        regions.DumpIsochores(testfile)
+
+        with open(testfile) as handle:
+            rows = list(csv.reader(handle))
+
+        os.remove(testfile)
+
+        self.assertEqual(rows[0][:2], ["Region", "Chrom"])
+        self.assertEqual(
+            len(rows) - 1,
+            sum([len(isochores) for isochores in regions.isochores]))
+        self.assertEqual(rows[1][:3], ["whole", "chrTest", "1"])
+
+
+class test_BinGClevels(unittest.TestCase):
+    def test_BinGClevels(self):
+        """Testing nearest bin assignment"""
+
+        bins = range(30, 66)
+        GClevels = [20, 30, 30.4, 30.5, 30.6, 45.5, 65, 80]
+
+        result = GClib.Elements.BinGClevels(GClevels, bins)
+
+        # ties are assigned like the old loop (with these keys, to the upper
+        # bin), values outside to the margins
+        self.assertEqual(list(result), [0, 0, 0, 1, 1, 16, 35, 35])
+
+    def test_BinGClevelsFloatBins(self):
+        """Testing nearest bin assignment with float bins"""
+
+        bins = [30 + i * 0.5 for i in range(71)]
+        GClevels = [30.25, 30.3, 41.74, 41.75]
+
+        # ties (30.25 and 41.75) are assigned like the old loop on keys
+        result = GClib.Elements.BinGClevels(GClevels, bins)
+        self.assertEqual(list(result), [0, 1, 23, 23])
+
+    def test_BinGClevelsTies(self):
+        """Testing ties are assigned like the old loop on bins dictionary"""
+
+        random = numpy.random.RandomState(42)
+
+        for bin_size in [0.1, 0.25, 0.5, 1, 2]:
+            # bins are calculated like Families.GroupByIsochores
+            n_of_bins = int(round(35 / bin_size, 0)) + 1
+            data = {}
+
+            for i in range(n_of_bins):
+                data[30 + i * bin_size] = None
+
+            bins = sorted(data.keys())
+
+            # middle points and random values
+            GClevels = numpy.concatenate([
+                numpy.round(random.uniform(30, 65, 500), 2),
+                [(bins[i] + bins[i + 1]) / 2 for i in range(n_of_bins - 1)]])
+
+            result = GClib.Elements.BinGClevels(GClevels, bins)
+
+            for GClevel, index in zip(GClevels, result):
+                # the old loop: the last nearest bin in dictionary order
+                best_bin, best_distance = None, None
+
+                for bin in data.keys():
+                    distance = abs(GClevel - bin)
+
+                    if best_distance is None or distance <= best_distance:
+                        best_distance = distance
+                        best_bin = bin
+
+                self.assertEqual(bins[index], best_bin)
+
+
+class test_Families(unittest.TestCase):
+    def setUp(self):
+        """Copy isochores in a temporary directory"""
+
+        self.directory = tempfile.mkdtemp()
+
+        isochores_file = os.path.join(
+            module_path,
+            "test_isochores3_chr21.csv")
+
+        chromosome = GClib.Elements.Chromosome()
+        chromosome.LoadIsochores(isochores_file)
+
+        self.isochores = [isochore for isochore in chromosome.isochores
+                          if isochore.Class != "gap"]
+
+        # write the same isochores twice
+        for i in range(2):
+            chromosome.DumpIsochores(
+                outfile=os.path.join(self.directory, "chr%s.csv" % (i)))
+
+    def test_Scan4Files(self):
+        """Testing searching files recursively"""
+
+        # a smaller file in a subdirectory
+        subdirectory = os.path.join(self.directory, "species")
+        os.mkdir(subdirectory)
+
+        with open(os.path.join(self.directory, "chr0.csv")) as handle:
+            lines = handle.readlines()
+
+        with open(os.path.join(subdirectory, "chr2.csv"), "w") as handle:
+            handle.writelines(lines[:10])
+
+        families = GClib.Elements.Families()
+        families.Scan4Files(self.directory, pattern=r"\.csv$")
+        self.assertEqual(families.n_of_files, 2)
+
+        families.Scan4Files(self.directory, pattern="*.csv", recursive=True,
+                            glob=True)
+        self.assertEqual(families.n_of_files, 3)
+
+        # largest files first
+        self.assertEqual(
+            families.files[-1], os.path.join(subdirectory, "chr2.csv"))
+        self.assertEqual(
+            families.sizes, sorted(families.sizes, reverse=True))
+        self.assertEqual(
+            families.sizes[-1],
+            os.path.getsize(os.path.join(subdirectory, "chr2.csv")))
+
+    def test_GroupByIsochores(self):
+        """Testing grouping isochores in families"""
+
+        families = GClib.Elements.Families()
+        families.Scan4Files(self.directory, pattern=".csv")
+        families.GroupByIsochores()
+
+        # assign isochores to the nearest bin with the old loop on keys
+        test_data = {}
+
+        for bin in range(30, 66):
+            test_data[bin] = {"size": 0, "n_of_isochores": 0}
+
+        for isochore in self.isochores:
+            best_bin, best_distance = None, None
+
+            for bin in test_data.keys():
+                distance = abs(isochore.avg_GClevel - bin)
+
+                if best_distance is None or distance <= best_distance:
+                    best_distance = distance
+                    best_bin = bin
+
+            test_data[best_bin]["size"] += 2 * isochore.size
+            test_data[best_bin]["n_of_isochores"] += 2
+
+        self.assertEqual(families.data, test_data)
+        self.assertEqual(
+            sum([value["n_of_isochores"] for value in families.data.values()]),
+            2 * len(self.isochores))
+
+    def test_GroupByIsochoresParallel(self):
+        """Testing grouping isochores in families with processes"""
+
+        families = GClib.Elements.Families()
+        families.Scan4Files(self.directory, pattern=".csv")
+        families.GroupByIsochores()
+
+        test_data = families.data
+
+        families.GroupByIsochores(processes=2)
+        self.assertEqual(families.data, test_data)
+
+    def test_GroupByIsochoresIndex(self):
+        """Testing grouping isochores in families with an index"""
+
+        families = GClib.Elements.Families()
+        families.Scan4Files(self.directory, pattern=".csv")
+        families.GroupByIsochores()
+
+        test_data = families.data
+
+        index = tempfile.mktemp()
+        families.GroupByIsochores(index=index)
+        self.assertEqual(families.data, test_data)
+
+        # reading index: no files will be processed
+        families.GroupByIsochores(index=index)
+        self.assertEqual(families.data, test_data)
+
+        # a modified file will be read again. Removing its last isochore
+        myfile = os.path.join(self.directory, "chr0.csv")
+
+        with open(myfile) as handle:
+            lines = handle.readlines()
+
+        with open(myfile, "w") as handle:
+            handle.writelines(lines[:-2])
+
+        families.GroupByIsochores(index=index)
+        self.assertNotEqual(families.data, test_data)
+
+        families_index = GClib.Elements.FamiliesIndex(index)
+        self.assertEqual(len(families_index.files), 2)
+
+        # the same data without index
+        test_data = families.data
+        families.GroupByIsochores()
+        self.assertEqual(families.data, test_data)
+
+        os.remove(index)
+
+    def tearDown(self):
+        """Removing temporary directory"""
+
+        shutil.rmtree(self.directory)
 
 
 if __name__ == "__main__":
@@ -34,10 +34,16 @@ A module to test Graphs module
 """
 
 import os
+import json
+import shutil
 import StringIO
 import tempfile
 import unittest
 
+import numpy
+
+from PIL import Image
+
 import GClib.Elements
 import GClib.Graphs
 import GClib
@@ -413,6 +419,26 @@ class test_DrawChromosome(unittest.TestCase):
             isochores=self.isochores)
         self._test_DrawChromosome.DrawLegend()
 
+    def test_ClassSchemes(self):
+        """Testing schemes with a different number of classes"""
+
+        for class_to_level in [
+                {"L": 42, "H": 100},
+                {"L1": 35, "L2": 38, "L3": 41, "H1": 44, "H2": 47, "H3": 52,
+                 "H4": 100}]:
+            settings = GClib.Elements.Settings(class_to_level=class_to_level)
+
+            graph = GClib.Graphs.DrawChromosome(settings=settings)
+            graph.SetSequenceLength(self.sequence_length)
+            graph.InitPicture()
+            graph.SetColorsList(colorbyclass=True)
+
+            self.assertEqual(graph.n_of_colors, len(class_to_level))
+
+            graph.DrawIsochoreRectangles(isochores=self.isochores)
+            graph.DrawWindowRectangles(windows=self.windows)
+            graph.DrawLegend()
+
 # TODO: Test code for DrawBarChromosome
 
 # The testing methods for MoreGraphs classes
@@ -540,7 +566,429 @@ class test_MoreGraphs(unittest.TestCase):
             os.unlink(testfile)
 
 
+# The testing methods for ImageStack class
+
+
+class test_ImageStack(unittest.TestCase):
+    # a test image
+    image_file = os.path.join(module_path, "chr21.isochores.png")
+
+    def setUp(self):
+        self._test_ImageStack = GClib.Graphs.ImageStack()
+
+        # a smaller image, to test images with different width
+        self.small_file = tempfile.mktemp(suffix=".png")
+        image = Image.open(self.image_file)
+        image.crop((0, 0, 100, 50)).save(self.small_file)
+
+    def tearDown(self):
+        if os.path.exists(self.small_file):
+            os.unlink(self.small_file)
+
+    def test_AddImage(self):
+        """Testing stack size"""
+
+        ref_x, ref_y = Image.open(self.image_file).size
+
+        self._test_ImageStack.AddImage(self.image_file)
+        self._test_ImageStack.AddImage(self.small_file)
+
+        self.assertEqual(self._test_ImageStack.n_of_images, 2)
+        self.assertEqual(
+            (self._test_ImageStack.x, self._test_ImageStack.y),
+            (ref_x, ref_y + 50))
+
+    def test_SaveFigure(self):
+        """Testing that streamed image is equal to a pasted image"""
+
+        # testing a stack without images
+        testfile = tempfile.mktemp(suffix=".png")
+
+        self.assertRaises(
+            GClib.Graphs.ImageStackError,
+            self._test_ImageStack.SaveFigure,
+            testfile)
+
+        self._test_ImageStack.AddImage(self.small_file)
+        self._test_ImageStack.AddImage(self.image_file)
+        self._test_ImageStack.SaveFigure(testfile)
+
+        test_image = Image.open(testfile)
+        ref_image = self._test_ImageStack.GetImage()
+
+        self.assertEqual(test_image.size, ref_image.size)
+        self.assertEqual(
+            test_image.convert("RGB").tobytes(), ref_image.tobytes())
+
+        # check that no file are overwritten
+        self.assertRaises(
+            GClib.Graphs.ImageStackError,
+            self._test_ImageStack.SaveFigure,
+            testfile)
+
+        os.unlink(testfile)
+
+    def test_SaveFigureFormats(self):
+        """Testing image format is chosen by filename extension"""
+
+        self._test_ImageStack.AddImage(self.small_file)
+
+        for suffix, image_format in [(".jpg", "JPEG"), (".PNG", "PNG"),
+                                     (".gif", "GIF")]:
+            testfile = tempfile.mktemp(suffix=suffix)
+            self._test_ImageStack.SaveFigure(testfile)
+
+            self.assertEqual(Image.open(testfile).format, image_format)
+            os.unlink(testfile)
+
+
+# The testing methods for TilePyramid class
+
+
+class test_TilePyramid(unittest.TestCase):
+    # load data to test tiles
+    chromosome = GClib.Elements.Chromosome()
+
+    # read isochore from isochores list
+    chromosome.LoadIsochores(
+        os.path.join(
+            module_path,
+            "test_isochores3_chr21.csv"))
+    isochores = chromosome.isochores
+
+    # read windows from windows list
+    chromosome.LoadWindows(os.path.join(module_path, "test_windows_chr21.csv"))
+    windows = chromosome.windows
+
+    # determing sequence length from isochore coordinates
+    sequence_length = isochores[-1].end
+
+    def setUp(self):
+        self._test_TilePyramid = GClib.Graphs.TilePyramid()
+
+        # a directory for tiles (it will be created by SaveTiles)
+        self.tiledir = tempfile.mktemp()
+
+    def tearDown(self):
+        if os.path.exists(self.tiledir):
+            shutil.rmtree(self.tiledir)
+
+    def test_SetSequenceLength(self):
+        """Testing zoom levels"""
+
+        self._test_TilePyramid.SetSequenceLength(self.sequence_length)
+
+        # 48129895 bp are in a single tile of 256 pixels at 256Kb per pixel
+        self.assertEqual(self._test_TilePyramid.n_of_levels, 9)
+        self.assertEqual(self._test_TilePyramid.resolutions[0], 256000)
+        self.assertEqual(self._test_TilePyramid.resolutions[-1], 1000)
+
+    def test_AggregateElements(self):
+        """Testing elements aggregation in pixel columns"""
+
+        # A gap, two windows and nothing after 400 bp
+        elements = [GClib.Elements.Gap(start=0, end=100),
+                    GClib.Elements.Window(start=100, end=300, GClevel=40),
+                    GClib.Elements.Window(start=300, end=400, GClevel=46)]
+
+        values, gaps, covered = GClib.Graphs._aggregate_elements(
+            elements, "GClevel", 0, 200, 3)
+
+        # the first column is half gap, the second is made of two windows
+        self.assertEqual(list(values), [40, 43, 0])
+        self.assertEqual(list(gaps), [False, False, False])
+        self.assertEqual(list(covered), [True, True, False])
+
+        values, gaps, covered = GClib.Graphs._aggregate_elements(
+            elements, "GClevel", 0, 50, 3)
+
+        self.assertEqual(list(gaps), [True, True, False])
+
+    def test_RenderColumns(self):
+        """Testing column colors with a different number of classes"""
+
+        # five classes have the default colors
+        self.assertEqual(
+            GClib.Graphs._class_colors(5), GClib.constants.CLASS_COLORS)
+
+        # seven classes, the last column is a gap
+        thresholds = [35, 38, 41, 44, 47, 52, 100]
+        values = numpy.array([32, 36, 40, 43, 46, 50, 60, 40], dtype=float)
+        gaps = numpy.array([False] * 7 + [True])
+        covered = numpy.ones(8, dtype=numpy.bool_)
+
+        image = GClib.Graphs._render_columns(
+            values, gaps, covered, 10, 30, 65, thresholds)
+
+        colors = [tuple(color) for color in image[-1]]
+        self.assertEqual(colors[0], GClib.constants.CLASS_COLORS[0])
+        self.assertEqual(colors[6], GClib.constants.CLASS_COLORS[-1])
+        self.assertEqual(colors[7], GClib.constants.GAP_COLOR)
+        self.assertEqual(len(set(colors[:7])), 7)
+
+    def test_SaveTiles(self):
+        """Testing SaveTiles"""
+
+        # testing SaveTiles before SetSequenceLength
+        self.assertRaises(
+            GClib.Graphs.TilePyramidError,
+            self._test_TilePyramid.SaveTiles,
+            self.tiledir)
+
+        self._test_TilePyramid.SetSequenceLength(self.sequence_length)
+        self._test_TilePyramid.AddIsochoreTrack(self.isochores)
+        self._test_TilePyramid.AddWindowTrack(self.windows)
+
+        # drawing tiles with two processes
+        self._test_TilePyramid.SaveTiles(self.tiledir, processes=2)
+
+        # read the pyramid description
+        with open(os.path.join(self.tiledir, "tiles.json")) as handle:
+            metadata = json.load(handle)
+
+        self.assertEqual(metadata["tracks"], ["isochores", "windows"])
+        self.assertEqual(len(metadata["levels"]), 9)
+
+        # the first zoom level is a single tile
+        image = Image.open(
+            os.path.join(self.tiledir, "isochores", "0", "0.png"))
+        self.assertEqual(image.size, (256, 256))
+
+        # tiles after the sequence end are not drawn
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(self.tiledir, "isochores", "0", "1.png")))
+
+        # check that no directory is overwritten
+        self.assertRaises(
+            GClib.Graphs.TilePyramidError,
+            self._test_TilePyramid.SaveTiles,
+            self.tiledir)
+
+    def test_OverwriteTiles(self):
+        """Testing tiles of a previous pyramid are removed"""
+
+        self._test_TilePyramid.SetSequenceLength(self.sequence_length)
+        self._test_TilePyramid.AddIsochoreTrack(self.isochores)
+        self._test_TilePyramid.AddWindowTrack(self.windows)
+        self._test_TilePyramid.SaveTiles(self.tiledir)
+
+        # a file which isn't a tile
+        other_file = os.path.join(self.tiledir, "README")
+
+        with open(other_file, "w") as handle:
+            handle.write("not a tile")
+
+        # a smaller pyramid, with a single track
+        isochores = [isochore for isochore in self.isochores
+                     if isochore.end <= 20000000]
+
+        pyramid = GClib.Graphs.TilePyramid()
+        pyramid.SetSequenceLength(isochores[-1].end)
+        pyramid.AddIsochoreTrack(isochores)
+        pyramid.SaveTiles(self.tiledir, check=False)
+
+        self.assertEqual(pyramid.n_of_levels, 8)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.tiledir, "isochores", "8")))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.tiledir, "windows")))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.tiledir, "isochores", "7", "80.png")))
+        self.assertTrue(os.path.exists(other_file))
+
+    def test_CraftedTracks(self):
+        """Testing track names of tiles.json which aren't directories"""
+
+        # a directory beside tiles directory
+        outside = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.tiledir, "other", "0"))
+
+        # files which are not tiles
+        other_file = os.path.join(self.tiledir, "other", "notes.txt")
+
+        for filename in [other_file, os.path.join(outside, "keep.txt")]:
+            with open(filename, "w") as handle:
+                handle.write("not a tile")
+
+        with open(os.path.join(self.tiledir, "tiles.json"), "w") as handle:
+            json.dump({"tracks": [
+                "", ".", "..", outside, os.path.join("other", "0"),
+                os.path.join(os.pardir, os.path.basename(outside)),
+                "other", 5]}, handle)
+
+        try:
+            self._test_TilePyramid.SetSequenceLength(self.sequence_length)
+            self._test_TilePyramid.AddIsochoreTrack(self.isochores)
+            self._test_TilePyramid.SaveTiles(self.tiledir, check=False)
+
+            # only the zoom levels of "other" are removed
+            self.assertTrue(os.path.exists(other_file))
+            self.assertFalse(
+                os.path.exists(os.path.join(self.tiledir, "other", "0")))
+            self.assertTrue(
+                os.path.exists(os.path.join(outside, "keep.txt")))
+            self.assertTrue(os.path.exists(
+                os.path.join(self.tiledir, "isochores", "0", "0.png")))
+
+        finally:
+            shutil.rmtree(outside)
+
+
+# The testing methods for DrawKaryotype class
+
+
+class test_DrawKaryotype(unittest.TestCase):
+    # an isochore file to test karyotypes
+    isochore_file = os.path.join(module_path, "test_isochores3_chr21.csv")
+
+    def setUp(self):
+        self._test_DrawKaryotype = GClib.Graphs.DrawKaryotype()
+
+        # two chromosomes: one from file and one from memory
+        self._test_DrawKaryotype.LoadIsochores(self.isochore_file)
+
+        chromosome = GClib.Elements.Chromosome()
+        chromosome.LoadIsochores(self.isochore_file)
+        self._test_DrawKaryotype.AddIsochores(
+            "half", [isochore for isochore in chromosome.isochores
+                     if isochore.end <= 24000000])
+
+    def test_SetImageSize(self):
+        """Testing image size"""
+
+        self._test_DrawKaryotype.SetImageSize()
+
+        # the longest chromosome determines image width
+        self.assertEqual(
+            self._test_DrawKaryotype.x, 110 + 1605 + 20)
+        self.assertEqual(self._test_DrawKaryotype.y, 70 + 2 * (15 + 100))
+
+    def test_SaveFigure(self):
+        """Testing karyotype drawn by more processes"""
+
+        testfile = tempfile.mktemp(suffix=".png")
+        reffile = tempfile.mktemp(suffix=".png")
+
+        self._test_DrawKaryotype.SaveFigure(testfile, processes=2)
+        self._test_DrawKaryotype.SaveFigure(reffile, processes=1)
+
+        test_image = Image.open(testfile)
+        ref_image = Image.open(reffile)
+
+        self.assertEqual(test_image.size, (1735, 300))
+        self.assertEqual(test_image.tobytes(), ref_image.tobytes())
+
+        # check that no file are overwritten
+        self.assertRaises(
+            GClib.Graphs.DrawKaryotypeError,
+            self._test_DrawKaryotype.SaveFigure,
+            testfile)
+
+        os.unlink(testfile)
+        os.unlink(reffile)
+
+    def test_ClassSchemes(self):
+        """Testing karyotypes with seven classes"""
+
+        settings = GClib.Elements.Settings(class_to_level={
+            "L1": 35, "L2": 38, "L3": 41, "H1": 44, "H2": 47, "H3": 52,
+            "H4": 100})
+
+        graph = GClib.Graphs.DrawKaryotype(settings=settings)
+        graph.LoadIsochores(self.isochore_file)
+
+        testfile = tempfile.mktemp(suffix=".png")
+        graph.SaveFigure(testfile, processes=1)
+
+        self.assertTrue(os.path.exists(testfile))
+        os.unlink(testfile)
+
+
 # TODO: Define test code for drawing graphs
 
+class test_DrawFamilies(unittest.TestCase):
+    def setUp(self):
+        """Copy isochores in temporary subdirectories"""
+
+        self.directory = tempfile.mkdtemp()
+
+        isochores_file = os.path.join(
+            module_path,
+            "test_isochores3_chr21.csv")
+
+        chromosome = GClib.Elements.Chromosome()
+        chromosome.LoadIsochores(isochores_file)
+
+        for species in ["species1", "species2"]:
+            os.mkdir(os.path.join(self.directory, species))
+            chromosome.DumpIsochores(
+                outfile=os.path.join(self.directory, species, "chr1.csv"))
+
+        self.families = GClib.Elements.Families()
+        self.families.Scan4Files(
+            self.directory, pattern="*.csv", recursive=True, glob=True)
+        self.families.GroupByIsochores()
+
+        self.graphfile = tempfile.mktemp(suffix=".png")
+
+    def test_Histograms(self):
+        """Testing 2-D histograms"""
+
+        self.assertEqual(self.families.groups, ["species1", "species2"])
+        self.assertEqual(
+            self.families.size_data.shape,
+            (self.families.n_of_bins, self.families.n_of_size_bins))
+
+        # the same total of 1-D histogram
+        for i, bin in enumerate(self.families.bin_values):
+            size = self.families.data[bin]["size"]
+            self.assertEqual(self.families.size_data[i].sum(), size)
+            self.assertEqual(self.families.group_data[i].sum(), size)
+
+    def test_DrawFamilies(self):
+        """Testing drawing families with a single bar call"""
+
+        graph = GClib.Graphs.DrawFamilies(self.families)
+        self.assertEqual(
+            len(graph.all_bar.patches), self.families.n_of_bins)
+
+        graph.SaveFigure(self.graphfile)
+        self.assertTrue(os.path.exists(self.graphfile))
+
+    def test_DrawFamiliesClasses(self):
+        """Testing families colored by seven classes"""
+
+        settings = GClib.Elements.Settings(class_to_level={
+            "L1": 35, "L2": 38, "L3": 41, "H1": 44, "H2": 47, "H3": 52,
+            "H4": 100})
+
+        graph = GClib.Graphs.DrawFamilies(self.families, settings=settings)
+        self.assertEqual(
+            len(graph.all_bar.patches), self.families.n_of_bins)
+
+    def test_DrawFamilies2D(self):
+        """Testing drawing 2-D families histograms"""
+
+        for dimension in ["size", "group"]:
+            graph = GClib.Graphs.DrawFamilies2D(
+                self.families, dimension=dimension)
+            graph.DrawAxisLabels()
+            graph.SaveFigure(self.graphfile)
+
+            self.assertTrue(os.path.exists(self.graphfile))
+            os.remove(self.graphfile)
+
+        self.assertEqual(graph.data.shape, (2, self.families.n_of_bins))
+
+    def tearDown(self):
+        """Removing temporary files"""
+
+        shutil.rmtree(self.directory)
+
+        if os.path.exists(self.graphfile):
+            os.remove(self.graphfile)
+
+
 if __name__ == "__main__":
     unittest.main()
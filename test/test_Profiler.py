@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+Created on Mon Oct 19 17:41:12 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A test module for Profiler library
+
+"""
+
+import os
+import json
+import tempfile
+import unittest
+
+import GClib.Profiler
+import GClib
+
+
+class test_Profiler(unittest.TestCase):
+    def setUp(self):
+        self.reportfile = tempfile.mktemp(suffix=".json")
+        self.profilefile = tempfile.mktemp(suffix=".prof")
+
+    def tearDown(self):
+        for filename in [self.reportfile, self.profilefile]:
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_Stages(self):
+        """Record stages and counters"""
+
+        profiler = GClib.Profiler.Profiler()
+
+        profiler.Start("first")
+        profiler.Count("windows", 10)
+
+        # starting a stage stops the previous one
+        profiler.Start("second")
+
+        with profiler.Stage("third"):
+            data = [0] * 10 ** 6
+
+        # counters could be set after a stage
+        profiler.Count("items", len(data))
+
+        report = profiler.GetReport()
+
+        self.assertEqual(
+            [stage["name"] for stage in report["stages"]],
+            ["first", "second", "third"])
+        self.assertEqual(report["stages"][0]["counters"], {"windows": 10})
+        self.assertEqual(report["stages"][2]["counters"], {"items": 10 ** 6})
+
+        for stage in report["stages"]:
+            self.assertGreaterEqual(stage["elapsed"], 0)
+            self.assertGreaterEqual(
+                stage["peak_rss"], stage["peak_rss_before"])
+
+        self.assertRaises(GClib.Profiler.ProfilerError, profiler.Stop)
+
+    def test_DumpReport(self):
+        """Write a report and cProfile statistics"""
+
+        profiler = GClib.Profiler.Profiler(
+            profile_stage="sort", profile_file=self.profilefile)
+
+        with profiler.Stage("sort"):
+            sorted(range(10 ** 5), reverse=True)
+
+        profiler.DumpReport(self.reportfile)
+
+        with open(self.reportfile) as handle:
+            report = json.load(handle)
+
+        self.assertEqual(report["stages"][0]["name"], "sort")
+        self.assertTrue(os.path.exists(self.profilefile))
+
+    def test_NoStage(self):
+        """Counters need a stage"""
+
+        profiler = GClib.Profiler.Profiler()
+
+        self.assertRaises(
+            GClib.Profiler.ProfilerError, profiler.Count, "windows", 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+
+
+Created on Mon Oct 19 22:31:05 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A test module for Profiles library
+
+"""
+
+import csv
+import unittest
+import StringIO
+
+import numpy
+
+import Bio.Seq
+import Bio.SeqRecord
+
+import GClib.Elements
+import GClib.Profiles
+import GClib
+
+
+def naive_counts(sequence, k):
+    """Count k-mers in a string, one by one"""
+
+    sequence = sequence.upper()
+    counts = dict((kmer, 0) for kmer in GClib.Profiles.Kmers(k))
+
+    for i in range(len(sequence) - k + 1):
+        kmer = sequence[i:i + k]
+
+        if kmer in counts:
+            counts[kmer] += 1
+
+    return [counts[kmer] for kmer in GClib.Profiles.Kmers(k)]
+
+
+class test_KmerIndex(unittest.TestCase):
+    def setUp(self):
+        """A random sequence with N and S in both cases"""
+
+        random = numpy.random.RandomState(42)
+        bases = numpy.array(list("ACGTNSacgtns"))
+        self.sequence = "".join(random.choice(bases, 5000))
+
+        self.kmer_index = GClib.Profiles.KmerIndex(
+            self.sequence, k_values=(1, 2, 3), block_size=64)
+
+    def test_Kmers(self):
+        """Testing k-mers order"""
+
+        self.assertEqual(
+            GClib.Profiles.Kmers(2)[:5], ["AA", "AC", "AG", "AT", "CA"])
+        self.assertEqual(len(GClib.Profiles.Kmers(3)), 64)
+
+    def test_Count(self):
+        """Testing k-mer counts are the same of a naive count"""
+
+        for start, end in [(0, 5000), (0, 64), (10, 50), (63, 129),
+                           (1000, 4999), (5, 6), (5, 5), (4990, 5000)]:
+            for k in (1, 2, 3):
+                self.assertEqual(
+                    list(self.kmer_index.Count(start, end, k)),
+                    naive_counts(self.sequence[start:end], k))
+
+    def test_Counts(self):
+        """Testing k-mer counts of many intervals at once"""
+
+        random = numpy.random.RandomState(7)
+        bounds = numpy.sort(random.randint(0, 5001, size=(200, 2)), axis=1)
+        bounds = numpy.vstack([bounds, [[0, 5000], [4998, 5000],
+                                        [64, 128], [5, 5]]])
+
+        for k in (1, 2, 3):
+            counts = self.kmer_index.Counts(bounds[:, 0], bounds[:, 1], k)
+
+            self.assertEqual(
+                counts.tolist(),
+                [list(self.kmer_index.Count(start, end, k))
+                 for start, end in bounds])
+
+    def test_NotIndexed(self):
+        """Testing k-mers not indexed"""
+
+        self.assertRaises(
+            GClib.Profiles.ProfileError, self.kmer_index.Count, 0, 100, 4)
+
+
+class test_CpGRatio(unittest.TestCase):
+    def test_CpGRatio(self):
+        """Testing CpG observed/expected ratio"""
+
+        sequence = "ACGTTCGAACCGGTA"
+        kmer_index = GClib.Profiles.KmerIndex(sequence, k_values=(1, 2))
+
+        bases = kmer_index.Count(0, len(sequence), 1)
+        dinucleotides = kmer_index.Count(0, len(sequence), 2)
+
+        # observed CG frequency on the expected one
+        expected = ((3.0 / 14) /
+                    (sequence.count("C") * sequence.count("G") /
+                     float(len(sequence)) ** 2))
+
+        self.assertAlmostEqual(
+            GClib.Profiles.CpGRatio(bases, dinucleotides), expected)
+
+        # no C, no ratio
+        kmer_index = GClib.Profiles.KmerIndex("AGTTAG", k_values=(1, 2))
+
+        self.assertTrue(numpy.isnan(GClib.Profiles.CpGRatio(
+            kmer_index.Count(0, 6, 1), kmer_index.Count(0, 6, 2))))
+
+
+class test_DumpProfiles(unittest.TestCase):
+    def setUp(self):
+        """A random sequence with a gap"""
+
+        random = numpy.random.RandomState(42)
+        bases = numpy.array(list("ACGT"))
+        self.sequence = (
+            "".join(random.choice(bases, 30000)) + "N" * 5000 +
+            "".join(random.choice(bases, 15000)))
+
+        seqRecord = Bio.SeqRecord.SeqRecord(
+            Bio.Seq.Seq(self.sequence), id="test")
+
+        self.chromosome = GClib.Elements.Chromosome(seqRecord)
+        self.chromosome.ValueWindows(window_size=10000)
+
+    def test_DumpProfiles(self):
+        """Testing windows profiles"""
+
+        handle = StringIO.StringIO()
+        self.chromosome.DumpProfiles(handle, k_values=(2, ))
+        handle.seek(0)
+
+        rows = list(csv.reader(handle))
+
+        self.assertEqual(
+            rows[0], GClib.Elements.WINDOWS_HEADER +
+            GClib.Profiles.Kmers(2) + ["CpG_OE"])
+        self.assertEqual(len(rows), len(self.chromosome.windows) + 1)
+
+        for window, row in zip(self.chromosome.windows, rows[1:]):
+            if window.Class == "gap":
+                self.assertEqual(row[5:], [""] * 17)
+                continue
+
+            counts = naive_counts(self.sequence[window.start:window.end], 2)
+
+            for value, count in zip(row[5:21], counts):
+                self.assertAlmostEqual(
+                    float(value), float(count) / sum(counts), places=6)
+
+    def test_NoWindows(self):
+        """Testing profiles without windows"""
+
+        chromosome = GClib.Elements.Chromosome(self.chromosome.seqRecord)
+
+        self.assertRaises(
+            GClib.Elements.ChromosomeError, chromosome.DumpProfiles,
+            StringIO.StringIO())
+
+
+if __name__ == "__main__":
+    unittest.main()
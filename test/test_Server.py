@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+Created on Mon Oct 19 16:02:18 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A test module for Server library
+
+"""
+
+import os
+import json
+import numpy
+import urllib2
+import tempfile
+import unittest
+import threading
+import StringIO
+
+import GClib.Elements
+import GClib.Server
+import GClib
+
+
+class test_Server(unittest.TestCase):
+    def setUp(self):
+        """Write a FASTA file and start a server on a free port"""
+
+        random = numpy.random.RandomState(42)
+
+        # a sequence with a gap and two different GC levels
+        at = "".join(random.choice(list("AATTGC"), 200000))
+        gc = "".join(random.choice(list("AATGGGCC"), 200000))
+        self.sequence = at + "N" * 10000 + gc
+
+        fd, self.fasta_file = tempfile.mkstemp(suffix=".fa")
+
+        with os.fdopen(fd, "w") as handle:
+            handle.write(">chrTest\n")
+
+            for i in range(0, len(self.sequence), 60):
+                handle.write(self.sequence[i:i + 60] + "\n")
+
+        self.server = GClib.Server.SegmentationServer(
+            ("localhost", 0), {"test": self.fasta_file}, cache_size=1,
+            workers=2)
+        self.port = self.server.server_address[1]
+
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _Get(self, query):
+        """Returns response code and body of a request"""
+
+        url = "http://localhost:%s%s" % (self.port, query)
+
+        try:
+            response = urllib2.urlopen(url)
+            return response.code, response.read()
+
+        except urllib2.HTTPError as error:
+            return error.code, error.read()
+
+    def test_SegmentCSV(self):
+        """Testing segmentation as CSV"""
+
+        code, body = self._Get(
+            "/segment?genome=test&chrom=chrTest&window_size=10000")
+        self.assertEqual(code, 200)
+
+        # the same isochores calculated by Chromosome
+        chromosome = GClib.Elements.Chromosome(
+            self.server.cache.Get("test", "chrTest").seqRecord)
+        chromosome.ValueWindows(window_size=10000)
+        chromosome.FindIsochores()
+
+        handle = StringIO.StringIO()
+        chromosome.DumpIsochores(handle)
+
+        self.assertEqual(body, handle.getvalue())
+
+    def test_SegmentJSON(self):
+        """Testing segmentation as JSON, with coordinates"""
+
+        code, body = self._Get(
+            "/segment?genome=test&chrom=chrTest&window_size=10000"
+            "&start=150001&end=300000&min_size=3&format=json")
+        self.assertEqual(code, 200)
+
+        data = json.loads(body)
+        self.assertEqual(data["chrom"], "chrTest")
+        self.assertEqual(data["isochores"][0]["start"], 150001)
+        self.assertEqual(data["isochores"][-1]["end"], 300000)
+
+    def test_Cache(self):
+        """Testing chromosomes are read once"""
+
+        for window_size in [10000, 20000, 50000]:
+            code, body = self._Get(
+                "/segment?genome=test&chrom=chrTest&window_size=%s" %
+                (window_size))
+            self.assertEqual(code, 200)
+
+        code, body = self._Get("/status")
+        status = json.loads(body)
+
+        self.assertEqual(status["cache"]["misses"], 1)
+        self.assertEqual(status["cache"]["hits"], 2)
+        self.assertEqual(status["cache"]["chromosomes"], ["test:chrTest"])
+
+    def test_Load(self):
+        """Testing reading stops at the requested chromosome"""
+
+        with open(self.fasta_file, "a") as handle:
+            handle.write(">chrOther\nACGTACGTNN\n")
+
+        cache = GClib.Server.ChromosomeCache({"test": self.fasta_file})
+
+        chromosome = cache.Load("test", "chrTest")
+        self.assertEqual(str(chromosome.seqRecord.data), self.sequence)
+
+        # the ids are known only when the whole file was read
+        self.assertNotIn("test", cache.ids)
+
+        chromosome = cache.Load("test", "chrOther")
+        self.assertEqual(str(chromosome.seqRecord.data), "ACGTACGTNN")
+
+        self.assertRaises(
+            GClib.Server.JobError, cache.Load, "test", "chrMissing")
+        self.assertEqual(cache.ids["test"], set(["chrTest", "chrOther"]))
+
+    def test_Errors(self):
+        """Testing bad requests"""
+
+        for query in ["/segment?genome=test",
+                      "/segment?genome=missing&chrom=chrTest",
+                      "/segment?genome=test&chrom=chrMissing",
+                      "/segment?genome=test&chrom=chrTest&window_size=a",
+                      "/segment?genome=test&chrom=chrTest&start=500000"]:
+            code, body = self._Get(query)
+            self.assertEqual(code, 400, query)
+            self.assertIn("error", json.loads(body))
+
+        code, body = self._Get("/missing")
+        self.assertEqual(code, 404)
+
+    def test_InternalError(self):
+        """Testing an unreadable FASTA file is an internal error"""
+
+        self.server.cache.genomes["broken"] = self.fasta_file + ".missing"
+
+        code, body = self._Get("/segment?genome=broken&chrom=chrTest")
+        self.assertEqual(code, 500)
+        self.assertIn("error", json.loads(body))
+
+    def test_Busy(self):
+        """Testing a server without free slots"""
+
+        self.server.slots = threading.BoundedSemaphore(1)
+        self.server.slots.acquire()
+
+        code, body = self._Get("/segment?genome=test&chrom=chrTest")
+        self.assertEqual(code, 503)
+
+    def tearDown(self):
+        """Stop server and remove FASTA file"""
+
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+        os.remove(self.fasta_file)
+
+
+if __name__ == "__main__":
+    unittest.main()
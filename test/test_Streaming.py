@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+
+
+Created on Mon Oct 19 21:40:27 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A test module for Streaming library
+
+"""
+
+import os
+import unittest
+
+import numpy
+
+import Bio.Seq
+import Bio.SeqRecord
+
+import GClib.Elements
+import GClib.Streaming
+import GClib
+
+# getting module path
+module_path = os.path.dirname(__file__)
+
+
+class test_WindowStream(unittest.TestCase):
+    def setUp(self):
+        """A random sequence with gaps of different sizes"""
+
+        random = numpy.random.RandomState(42)
+        bases = numpy.array(list("AACGTTSgcn"))
+        sequence = list(random.choice(bases, 50000))
+
+        for start, size in [(0, 30), (5000, 99), (12000, 100), (12200, 101),
+                            (20010, 3000), (30000, 10), (49000, 1000)]:
+            sequence[start:start + size] = "N" * size
+
+        self.sequence = "".join(sequence)
+
+        seqRecord = Bio.SeqRecord.SeqRecord(
+            Bio.Seq.Seq(self.sequence), id="chrTest", name="chrTest")
+        self.chromosome = GClib.Elements.Chromosome(seqRecord)
+
+    def _Check(self, chunk_size, **kwargs):
+        """Windows of a stream are the same of ValueWindows"""
+
+        self.chromosome.ValueWindows(gap_tolerance=100, **kwargs)
+
+        chunks = [self.sequence[i:i + chunk_size]
+                  for i in range(0, len(self.sequence), chunk_size)]
+
+        chromosome = GClib.Streaming.StreamChromosome(
+            chunks, name="chrTest", gap_tolerance=100, **kwargs)
+
+        # windows are compared with their G+C levels
+        self.assertEqual(chromosome.windows, self.chromosome.windows)
+
+        self.assertEqual(chromosome.gaps, self.chromosome.gaps)
+        self.assertEqual(chromosome.size, self.chromosome.size)
+        self.assertAlmostEqual(chromosome.GClevel, self.chromosome.GClevel)
+
+    def test_Windows(self):
+        """Testing windows with different chunk sizes"""
+
+        for chunk_size in [1, 7, 1000, 100000]:
+            for window_size in [100, 3000]:
+                self._Check(chunk_size, window_size=window_size)
+
+    def test_FromTo(self):
+        """Testing windows between two coordinates"""
+
+        for chunk_size in [7, 1000]:
+            for From, To in [(0, 12150), (5050, 20100), (12000, 49500),
+                             (20500, None)]:
+                self._Check(
+                    chunk_size, window_size=500, From=From, To=To)
+
+    def test_Stream(self):
+        """Testing windows are returned while the sequence is read"""
+
+        stream = GClib.Streaming.WindowStream(
+            window_size=1000, gap_tolerance=100)
+
+        windows = stream.Feed(self.sequence[:20500])
+
+        # windows restart after the gap at 12200. The last one, before the
+        # gap at 20010, is returned when the gap ends
+        self.assertEqual(windows[-1].end, 19301)
+
+        windows = stream.Feed(self.sequence[20500:])
+        self.assertEqual((windows[0].start, windows[0].end), (19301, 20010))
+        self.assertEqual(windows[1], GClib.Elements.Gap(20010, 23010))
+
+        # only the bases after the last window are kept
+        self.assertLess(len(stream.counts), 1001)
+
+        windows = stream.Close()
+        self.assertEqual(windows[-1], GClib.Elements.Gap(49000, 50000))
+
+        self.assertRaises(
+            GClib.Streaming.StreamingError, stream.Feed, "ACGT")
+
+    def test_FromError(self):
+        """Testing a start after the sequence end"""
+
+        stream = GClib.Streaming.WindowStream(From=100)
+        stream.Feed("ACGT")
+
+        self.assertRaises(GClib.Streaming.StreamingError, stream.Close)
+
+
+class test_IsochoreStream(unittest.TestCase):
+    def setUp(self):
+        """Windows of chr21"""
+
+        fasta = GClib.Utility.FastaFile(
+            os.path.join(module_path, "chr21.fa.gz"), raw=True)
+
+        self.chromosome = GClib.Elements.Chromosome(fasta.GetNextSeq())
+        self.chromosome.ValueWindows()
+
+    def test_Isochores(self):
+        """Testing isochores are the same of FindIsochores"""
+
+        for min_size in [1, 2, 5, 8]:
+            self.chromosome.FindIsochores(min_size=min_size)
+
+            stream = GClib.Streaming.IsochoreStream(min_size=min_size)
+            isochores = list(GClib.Streaming.IterIsochores(
+                self.chromosome.windows, stream=stream))
+
+            self.assertEqual(isochores, self.chromosome.isochores)
+            self.assertEqual(stream.n_of_merges, self.chromosome.n_of_merges)
+
+    def test_Settings(self):
+        """Testing isochores with the same settings of a chromosome"""
+
+        settings = GClib.Elements.Settings(
+            min_size=4, class_to_level={"low": 40, "mid": 45, "high": 100})
+
+        self.chromosome.settings = settings
+        self.chromosome.ValueWindows()
+        self.chromosome.FindIsochores()
+
+        isochores = list(GClib.Streaming.IterIsochores(
+            self.chromosome.windows, settings=settings))
+
+        self.assertEqual(isochores, self.chromosome.isochores)
+        self.assertEqual(
+            set([isochore.Class for isochore in isochores]),
+            set(["low", "mid", "high", "gap"]))
+
+    def test_Stream(self):
+        """Testing isochores are returned when a gap is added"""
+
+        stream = GClib.Streaming.IsochoreStream()
+
+        # chr21 starts with a gap
+        windows = self.chromosome.windows
+        self.assertEqual(stream.Add(windows[0]), [windows[0]])
+
+        # the isochores before the next gap
+        index = [i for i, window in enumerate(windows)
+                 if window.Class == "gap"][1]
+
+        for window in windows[1:index]:
+            self.assertEqual(stream.Add(window), [])
+
+        isochores = stream.Add(windows[index])
+        self.assertEqual(isochores[-1], windows[index])
+        self.assertGreater(len(isochores), 1)
+
+        # only the isochores after the last gap are kept
+        self.assertEqual(stream.isochores, [])
+
+        stream.Close()
+        self.assertRaises(
+            GClib.Streaming.StreamingError, stream.Add, windows[index])
+
+        # no windows
+        stream = GClib.Streaming.IsochoreStream()
+        self.assertRaises(GClib.Streaming.StreamingError, stream.Close)
+
+
+class test_StreamFastaFile(unittest.TestCase):
+    def test_Chromosome(self):
+        """Testing a streamed chromosome is the same of a loaded one"""
+
+        filename = os.path.join(module_path, "chr21.fa.gz")
+
+        fasta = GClib.Utility.FastaFile(filename, raw=True)
+        chromosome = GClib.Elements.Chromosome(fasta.GetNextSeq())
+        chromosome.ValueWindows()
+
+        records = list(GClib.Streaming.StreamFastaFile(filename))
+        self.assertEqual(len(records), 1)
+
+        record, chunks = records[0]
+        self.assertEqual(record.name, "chr21")
+
+        # chunks are read when the next record is requested
+        records = GClib.Streaming.StreamFastaFile(filename)
+        record, chunks = next(records)
+        streamed = GClib.Streaming.StreamChromosome(chunks, name=record.name)
+
+        self.assertEqual(streamed.windows, chromosome.windows)
+        self.assertEqual(streamed.gaps, chromosome.gaps)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+
+    Copyright (C) 2013-2021 ITB - CNR
+
+    This file is part of isoSegmenter.
+
+    isoSegmenter is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    isoSegmenter is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with isoSegmenter.  If not, see <http://www.gnu.org/licenses/>.
+
+
+If you use isoSegmenter in your work, please cite this manuscript:
+
+    Cozzi P, Milanesi L, Bernardi G. Segmenting the Human Genome into
+    Isochores. Evolutionary Bioinformatics. 2015;11:253-261.
+    doi:10.4137/EBO.S27693
+
+Created on Mon Oct 19 18:14:40 2026
+
+@author: Paolo Cozzi <paolo.cozzi@ibba.cnr.it>
+
+A test module for Synthetic library
+
+"""
+
+import os
+import numpy
+import shutil
+import tempfile
+import unittest
+import StringIO
+
+import Bio.Seq
+import Bio.SeqRecord
+
+import GClib.Elements
+import GClib.Synthetic
+import GClib.Utility
+import GClib
+
+
+class test_SyntheticChromosome(unittest.TestCase):
+    def setUp(self):
+        self.chromosome = GClib.Synthetic.SyntheticChromosome(
+            name="chrTest", size=2 * 10 ** 6, isochore_size=300000,
+            min_isochore_size=100000, gap_density=2, seed=42)
+
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_ClassLimits(self):
+        """Class limits follow CLASS_TO_LEVEL"""
+
+        self.assertEqual(
+            GClib.Synthetic.ClassLimits("L1"), (GClib.Synthetic.GC_MIN, 37))
+        self.assertEqual(GClib.Synthetic.ClassLimits("H1"), (41, 46))
+        self.assertEqual(
+            GClib.Synthetic.ClassLimits("H3"), (53, GClib.Synthetic.GC_MAX))
+
+    def test_Layout(self):
+        """Isochores and gaps cover the whole chromosome"""
+
+        layout = self.chromosome.layout
+
+        self.assertEqual(layout[0][:3], [0, 10000, "gap"])
+        self.assertEqual(layout[-1][1], self.chromosome.size)
+
+        for previous, element in zip(layout[:-1], layout[1:]):
+            self.assertEqual(previous[1], element[0])
+
+    def test_Sequence(self):
+        """The same seed gives the same sequence, with gaps where planned"""
+
+        sequence = self.chromosome.GetSequence()
+
+        self.assertEqual(len(sequence), self.chromosome.size)
+        self.assertEqual(set(sequence), set("ACGTN"))
+
+        # a different chunk size doesn't change the sequence
+        chunks = self.chromosome.Chunks(chunk_size=12345)
+        self.assertEqual("".join([chunk.tostring() for chunk in chunks]),
+                         sequence)
+
+        for start, end, Class, GClevel in self.chromosome.layout:
+            if Class == "gap":
+                self.assertEqual(sequence[start:end], "N" * (end - start))
+
+            else:
+                self.assertNotIn("N", sequence[start:end])
+
+    def test_Isochores(self):
+        """Planted GC levels are inside class limits"""
+
+        sequence = self.chromosome.GetSequence()
+
+        for start, end, Class, GClevel in self.chromosome.GetIsochores():
+            if Class == "gap":
+                continue
+
+            # GC level was measured on sequence
+            self.assertAlmostEqual(
+                GClevel, GClib.Elements.Bio.SeqUtils.GC(sequence[start:end]))
+
+            lower, upper = GClib.Synthetic.ClassLimits(Class)
+            self.assertGreater(GClevel, lower - 1)
+            self.assertLess(GClevel, upper + 1)
+
+    def test_DumpIsochores(self):
+        """Planted isochores could be read by Chromosome.LoadIsochores"""
+
+        outfile = os.path.join(self.directory, "isochores.csv")
+        self.chromosome.DumpIsochores(outfile)
+
+        Chrom = GClib.Elements.Chromosome()
+        Chrom.LoadIsochores(outfile)
+
+        self.assertEqual(
+            len(Chrom.isochores), len(self.chromosome.layout))
+
+        self.assertRaises(
+            GClib.Synthetic.SyntheticError, self.chromosome.DumpIsochores,
+            outfile)
+
+    def test_Segmentation(self):
+        """Segmented classes are mostly the planted ones"""
+
+        sequence = self.chromosome.GetSequence()
+        seqRecord = Bio.SeqRecord.SeqRecord(
+            Bio.Seq.Seq(sequence), id="chrTest", name="chrTest")
+
+        Chrom = GClib.Elements.Chromosome(seqRecord)
+        Chrom.ValueWindows(window_size=20000)
+        Chrom.FindIsochores()
+
+        # the class of each base
+        planted = numpy.zeros(self.chromosome.size, dtype="S3")
+        segmented = numpy.zeros(self.chromosome.size, dtype="S3")
+
+        for start, end, Class, GClevel in self.chromosome.GetIsochores():
+            planted[start:end] = Class
+
+        for isochore in Chrom.isochores:
+            segmented[isochore.start:isochore.end] = isochore.Class
+
+        self.assertGreater((planted == segmented).mean(), 0.8)
+
+    def test_WriteFasta(self):
+        """Write plain, compressed and in memory FASTA files"""
+
+        other = GClib.Synthetic.SyntheticChromosome(
+            name="chrOther", size=100000, seed=1)
+        sequence = self.chromosome.GetSequence()
+
+        for filename in ["test.fa", "test.fa.gz"]:
+            fasta_file = os.path.join(self.directory, filename)
+            GClib.Synthetic.WriteFasta(fasta_file, [self.chromosome, other])
+
+            fasta = GClib.Utility.FastaFile(fasta_file)
+            self.assertEqual(fasta.n_of_sequences, 2)
+            self.assertEqual(
+                str(fasta.GetSeqbyID("chrTest").seq), sequence)
+            self.assertEqual(
+                str(fasta.GetSeqbyID("chrOther").seq), other.GetSequence())
+
+        handle = StringIO.StringIO()
+        GClib.Synthetic.WriteFasta(handle, [other], line_width=70)
+
+        lines = handle.getvalue().split("\n")
+        self.assertEqual(lines[0], ">chrOther")
+        self.assertEqual(len(lines[1]), 70)
+        self.assertEqual("".join(lines[1:]), other.GetSequence())
+
+    def test_Size(self):
+        """A chromosome must be longer than its telomeres"""
+
+        self.assertRaises(
+            GClib.Synthetic.SyntheticError,
+            GClib.Synthetic.SyntheticChromosome, size=15000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -34,11 +34,20 @@ A test module for Utility library
 """
 
 import os
+import bz2
 import Bio
+import gzip
 import types
+import pickle
 import tempfile
 import unittest
 
+import numpy
+
+import Bio.Seq
+import Bio.bgzf
+import Bio.SeqRecord
+
 import GClib.Utility
 import GClib
 
@@ -86,6 +95,325 @@ class TestFastaFile(unittest.TestCase):
                 self.test_seqObj.IterSeqs()))
 
 
+class TestParseFasta(unittest.TestCase):
+    def setUp(self):
+        # headers, empty sequences, windows newlines and text before the
+        # first sequence
+        self.text = (
+            "a comment\n>seq1 the first sequence\r\nACGTN\r\nnnACG\n"
+            ">seq2\n\n>\n>seq3 a test\nAC GT\nGG>T\n>seq4")
+
+    def test_Parse(self):
+        """Testing records are the same of Bio.SeqIO for any block size"""
+
+        import StringIO
+        import Bio.SeqIO
+
+        reference = [
+            (seq.id, seq.name, seq.description, str(seq.seq))
+            for seq in Bio.SeqIO.parse(StringIO.StringIO(self.text), "fasta")]
+
+        for block_size in [1, 2, 3, 7, 1000]:
+            records = GClib.Utility.ParseFasta(
+                StringIO.StringIO(self.text), block_size=block_size)
+
+            self.assertEqual(reference, [
+                (record.id, record.name, record.description, record[:])
+                for record in records])
+
+    def test_FastaFile(self):
+        """Testing a FastaFile read by ParseFasta"""
+
+        filename = os.path.join(module_path, "chr21.fa.gz")
+
+        fasta = GClib.Utility.FastaFile(filename, raw=True)
+        reference = GClib.Utility.FastaFile(filename).GetNextSeq()
+
+        record = fasta.GetSeqbyID("chr21")
+        self.assertIsInstance(record, GClib.Utility.FastaRecord)
+        self.assertIsInstance(record.data, bytearray)
+        self.assertEqual(record.description, reference.description)
+        self.assertEqual(record.data, str(reference.seq))
+
+    def test_SharedSequence(self):
+        """Testing a FastaRecord written in a SharedSequence"""
+
+        record = GClib.Utility.FastaRecord(
+            id="seq1", description="seq1 a test", data=bytearray("ACGT"))
+        shared = GClib.Utility.SharedSequence(record)
+
+        self.assertEqual(shared.id, "seq1")
+        self.assertEqual(shared.description, "seq1 a test")
+        self.assertEqual(shared[:], "ACGT")
+
+        shared.Close()
+
+
+class TestReadBed(unittest.TestCase):
+    def setUp(self):
+        """Write a BED file"""
+
+        fd, self.filename = tempfile.mkstemp(suffix=".bed")
+
+        with os.fdopen(fd, "w") as handle:
+            handle.write("track name=test\n")
+            handle.write("# a comment\n")
+            handle.write("chr21\t10000000\t11000000\tregion1\n")
+            handle.write("chr21\t15000000\t16000000\n")
+
+    def test_ReadBed(self):
+        """Testing reading regions from BED"""
+
+        regions = GClib.Utility.ReadBed(self.filename)
+
+        self.assertEqual(len(regions), 2)
+        self.assertEqual(
+            regions[0],
+            GClib.Utility.Region("chr21", 10000000, 11000000, "region1"))
+
+        # a default name with 1-based coordinates
+        self.assertEqual(regions[1].name, "chr21:15000001-16000000")
+
+    def test_ReadBedInvalid(self):
+        """Testing invalid regions raise ValueError"""
+
+        with open(self.filename, "w") as handle:
+            handle.write("chr21\t16000000\t15000000\n")
+
+        self.assertRaises(ValueError, GClib.Utility.ReadBed, self.filename)
+
+    def tearDown(self):
+        """Removing tempfile"""
+
+        os.remove(self.filename)
+
+
+class TestSharedSequence(unittest.TestCase):
+    def setUp(self):
+        self.sequence = "ACGTNNNNACGT" * 1000
+        self.shared = GClib.Utility.SharedSequence(
+            self.sequence, id="chrTest")
+
+    def tearDown(self):
+        self.shared.Close()
+
+    def test_Sequence(self):
+        """Testing a shared sequence is like a string"""
+
+        self.assertEqual(len(self.shared), len(self.sequence))
+        self.assertEqual(self.shared[4:8], "NNNN")
+        self.assertEqual(self.shared.name, "chrTest")
+        self.assertTrue(os.path.exists(self.shared.filename))
+
+    def test_SeqRecord(self):
+        """Testing a shared sequence from a SeqRecord"""
+
+        seqRecord = Bio.SeqRecord.SeqRecord(
+            Bio.Seq.Seq(self.sequence), id="chrTest", name="test",
+            description="a test")
+
+        shared = GClib.Utility.SharedSequence(seqRecord)
+
+        self.assertEqual(shared.id, "chrTest")
+        self.assertEqual(shared.name, "test")
+        self.assertEqual(shared.description, "a test")
+        self.assertEqual(shared[:], self.sequence)
+
+        shared.Close()
+
+    def test_Pickle(self):
+        """Testing a pickled sequence maps the same file"""
+
+        data = pickle.dumps(self.shared, pickle.HIGHEST_PROTOCOL)
+
+        # bases aren't pickled
+        self.assertLess(len(data), len(self.sequence))
+
+        other = pickle.loads(data)
+        self.assertEqual(other.filename, self.shared.filename)
+        self.assertEqual(other[:], self.sequence)
+
+        # only the creator removes the file
+        other.Close()
+        self.assertTrue(os.path.exists(self.shared.filename))
+
+        self.shared.Close()
+        self.assertFalse(os.path.exists(self.shared.filename))
+
+    def test_Attach(self):
+        """Testing attaching to a sequence by filename"""
+
+        other = GClib.Utility.SharedSequence(
+            filename=self.shared.filename, id="chrTest")
+
+        self.assertEqual(other[:], self.sequence)
+
+        self.assertRaises(ValueError, GClib.Utility.SharedSequence)
+
+    def test_WriteFailure(self):
+        """Testing a sequence which can't be written leaves no file"""
+
+        class Unwritable:
+            def __len__(self):
+                return 10
+
+        directory = tempfile.mkdtemp()
+
+        try:
+            self.assertRaises(
+                TypeError, GClib.Utility.SharedSequence, Unwritable(),
+                directory=directory)
+            self.assertEqual(os.listdir(directory), [])
+
+        finally:
+            os.rmdir(directory)
+
+    def test_SharedDirectory(self):
+        """Testing a sequence bigger than /dev/shm goes in temp directory"""
+
+        self.assertIsNone(GClib.Utility._shared_directory(2 ** 62))
+
+
+class TestCompressedFile(unittest.TestCase):
+    def setUp(self):
+        # a fasta file with a few sequences
+        self.text = "".join(
+            ">seq%s a test\n%s\n" % (i, "ACGTNNNNCCGG\n" * 5000)
+            for i in range(5))
+
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for filename in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, filename))
+
+        os.rmdir(self.directory)
+
+    def _Write(self, name, data):
+        filename = os.path.join(self.directory, name)
+
+        with open(filename, "wb") as handle:
+            handle.write(data)
+
+        return filename
+
+    def _Check(self, filename, compression):
+        """Read a file with different threads and units"""
+
+        self.assertEqual(
+            GClib.Utility.CompressionFormat(filename), compression)
+
+        for threads in [1, 3]:
+            for unit_size in [1000, 2 ** 22]:
+                handle = GClib.Utility.CompressedFile(
+                    filename, threads=threads, unit_size=unit_size)
+                self.assertEqual(handle.read(), self.text)
+
+                handle = GClib.Utility.CompressedFile(
+                    filename, threads=threads, unit_size=unit_size)
+                self.assertEqual("".join(handle), self.text)
+
+        # reading sequences
+        fasta = GClib.Utility.FastaFile(filename, threads=2)
+        self.assertEqual(fasta.n_of_sequences, 5)
+        self.assertEqual(fasta.GetSeqbyID("seq4").description, "seq4 a test")
+
+    def test_Gzip(self):
+        """Testing a gzip file with many members"""
+
+        filename = os.path.join(self.directory, "test.fa.gz")
+
+        # writing two members
+        with gzip.open(filename, "wb") as handle:
+            handle.write(self.text[:1000])
+
+        with gzip.open(filename, "ab") as handle:
+            handle.write(self.text[1000:])
+
+        self._Check(filename, "gzip")
+
+    def test_Bgzf(self):
+        """Testing a BGZF file"""
+
+        filename = os.path.join(self.directory, "test.fa.bgz")
+
+        with Bio.bgzf.BgzfWriter(filename, "wb") as handle:
+            handle.write(self.text)
+
+        self._Check(filename, "bgzf")
+
+    def test_Bz2(self):
+        """Testing a bz2 file with many streams"""
+
+        filename = self._Write("test.fa.bz2", "".join(
+            bz2.compress(self.text[start:start + 50000])
+            for start in range(0, len(self.text), 50000)))
+
+        self._Check(filename, "bz2")
+
+    def test_Bz2SingleStream(self):
+        """Testing a bz2 file with a single stream is read in chunks"""
+
+        filename = self._Write("test.fa.bz2", bz2.compress(self.text))
+        self._Check(filename, "bz2")
+
+        # a bigger random sequence, in bz2 blocks of 100 Kb
+        random = numpy.random.RandomState(42)
+        text = "".join(random.choice(list("ACGT"), 2 * 10 ** 6))
+
+        filename = self._Write("random.fa.bz2", bz2.compress(text, 1))
+
+        handle = GClib.Utility.CompressedFile(filename, unit_size=2 ** 16)
+        chunks = list(handle._chunks)
+
+        self.assertEqual("".join(chunks), text)
+        self.assertGreater(len(chunks), 5)
+        self.assertLess(max([len(chunk) for chunk in chunks]), 10 ** 6)
+
+    def test_Plain(self):
+        """Testing plain and truncated files"""
+
+        filename = self._Write("test.fa", self.text)
+        self.assertIsNone(GClib.Utility.CompressionFormat(filename))
+        self.assertRaises(IOError, GClib.Utility.CompressedFile, filename)
+
+        filename = self._Write("test.fa.bz2", bz2.compress(self.text)[:-50])
+        self.assertRaises(
+            IOError, GClib.Utility.CompressedFile(filename).read)
+
+        # a gzip file with two members, truncated
+        filename = os.path.join(self.directory, "test.fa.gz")
+
+        for mode, text in [("wb", self.text[:1000]), ("ab", self.text[1000:])]:
+            with gzip.open(filename, mode) as handle:
+                handle.write(text)
+
+        with open(filename, "rb") as handle:
+            data = handle.read()
+
+        filename = self._Write("test.fa.gz", data[:-100])
+        self.assertRaises(
+            IOError, GClib.Utility.CompressedFile(filename).read)
+
+        # a wrong CRC32
+        filename = self._Write(
+            "test.fa.gz", data[:-8] + chr(ord(data[-8]) ^ 1) + data[-7:])
+        self.assertRaises(
+            IOError, GClib.Utility.CompressedFile(filename).read)
+
+    def test_Close(self):
+        """Testing closing a file before reading it all"""
+
+        filename = self._Write("test.fa.bz2", bz2.compress(self.text))
+
+        handle = GClib.Utility.CompressedFile(filename, queue_size=1)
+        self.assertEqual(handle.read(10), self.text[:10])
+        handle.close()
+
+        handle.thread.join(5)
+        self.assertFalse(handle.thread.is_alive())
+
+
 class TestFileExists(unittest.TestCase):
     # To verify a seqObject
     def setUp(self):
@@ -35,6 +35,8 @@ Created on Tue Feb 12 11:43:35 2019
 from __future__ import print_function
 
 import os
+import sys
+import json
 import shlex
 import unittest
 import tempfile
@@ -148,5 +150,200 @@ class TileImageTestCase(unittest.TestCase):
         self.assertEqual(status, 0)
 
 
+class IsoKaryotypeTestCase(unittest.TestCase):
+    """A class to test isoKaryotype scripts"""
+
+    def setUp(self):
+        # create temporary file names
+        self.outfile = tempfile.mktemp(suffix=".png")
+
+        # get a test isochore file
+        self.infile = os.path.join(module_path, "test_isochores3_chr21.csv")
+
+    def tearDown(self):
+        # clean up stuff if exists
+        if os.path.exists(self.outfile):
+            os.remove(self.outfile)
+
+    def test_isokaryotype(self):
+        """Test isoKaryotype.py script"""
+
+        cmd = (
+            "isoKaryotype.py --infiles {0} {0} --names chr21 chr21bis "
+            "-o {1} --jobs 2").format(
+                    self.infile,
+                    self.outfile)
+
+        cmds = shlex.split(cmd)
+
+        # call script
+        status = subprocess.check_call(cmds)
+
+        self.assertEqual(status, 0)
+
+
+class IsoSegmenterRegionsTestCase(unittest.TestCase):
+    """A class to test isoSegmenter scripts with regions"""
+
+    def setUp(self):
+        # create temporary file names
+        self.outfile = tempfile.mktemp()
+        self.bedfile = tempfile.mktemp(suffix=".bed")
+
+        self.infile = os.path.join(module_path, "chr21.fa.gz")
+
+        with open(self.bedfile, "w") as handle:
+            handle.write("chr21\t15000000\t16000000\tregion1\n")
+            handle.write("chr21\t30000000\t32000000\tregion2\n")
+
+    def tearDown(self):
+        # clean up stuff if exists
+        for filename in [self.outfile, self.bedfile]:
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_isosegmenter_regions(self):
+        """Test isoSegmenter.py script with regions"""
+
+        cmd = (
+            "isoSegmenter.py --infile {0} --outfile {1} --regions {2} "
+            "--jobs 2").format(
+                    self.infile,
+                    self.outfile,
+                    self.bedfile)
+
+        cmds = shlex.split(cmd)
+
+        # call script
+        status = subprocess.check_call(cmds)
+
+        self.assertEqual(status, 0)
+
+        with open(self.outfile) as handle:
+            header = handle.readline().strip().split(",")
+
+        self.assertEqual(header[0], "Region")
+
+
+class IsoSegmenterProfileTestCase(unittest.TestCase):
+    """A class to test isoSegmenter profile report"""
+
+    def setUp(self):
+        # create temporary file names
+        self.outfile = tempfile.mktemp()
+        self.reportfile = tempfile.mktemp(suffix=".json")
+        self.profilefile = tempfile.mktemp(suffix=".prof")
+
+        self.infile = os.path.join(module_path, "chr21.fa.gz")
+
+    def tearDown(self):
+        # clean up stuff if exists
+        for filename in [self.outfile, self.reportfile, self.profilefile]:
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_isosegmenter_profile(self):
+        """Test isoSegmenter.py script with a profile report"""
+
+        cmd = (
+            "isoSegmenter.py --infile {0} --outfile {1} --profile_report {2} "
+            "--profile_stage find_isochores --profile_file {3}").format(
+                    self.infile,
+                    self.outfile,
+                    self.reportfile,
+                    self.profilefile)
+
+        cmds = shlex.split(cmd)
+
+        # call script
+        status = subprocess.check_call(cmds)
+
+        self.assertEqual(status, 0)
+
+        with open(self.reportfile) as handle:
+            report = json.load(handle)
+
+        names = [stage["name"] for stage in report["stages"]]
+
+        self.assertEqual(
+            names, ["load", "scan4gaps", "value_windows", "find_isochores",
+                    "dump_isochores"])
+
+        counters = report["stages"][3]["counters"]
+        self.assertGreater(counters["isochores"], 0)
+        self.assertGreater(counters["merges"], 0)
+
+        self.assertTrue(os.path.exists(self.profilefile))
+
+
+class IsoSegmenterStreamTestCase(unittest.TestCase):
+    """A class to test isoSegmenter scripts reading a stream"""
+
+    def setUp(self):
+        # create temporary file names
+        self.outfile = tempfile.mktemp()
+        self.windowfile = tempfile.mktemp()
+        self.streamfile = tempfile.mktemp()
+        self.streamwindowfile = tempfile.mktemp()
+
+        self.infile = os.path.join(module_path, "chr21.fa.gz")
+
+    def tearDown(self):
+        # clean up stuff if exists
+        for filename in [self.outfile, self.windowfile, self.streamfile,
+                         self.streamwindowfile]:
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_isosegmenter_stream(self):
+        """Test isoSegmenter.py script with a stream"""
+
+        cmd = (
+            "isoSegmenter.py --infile {0} --outfile {1} "
+            "--windowfile {2}").format(
+                self.infile, self.outfile, self.windowfile)
+
+        status = subprocess.check_call(shlex.split(cmd))
+        self.assertEqual(status, 0)
+
+        # isochores are written while windows are evaluated
+        cmd = (
+            "isoSegmenter.py --infile {0} --outfile {1} "
+            "--windowfile {2} --stream").format(
+                self.infile, self.streamfile, self.streamwindowfile)
+
+        status = subprocess.check_call(shlex.split(cmd))
+        self.assertEqual(status, 0)
+
+        # windows and isochores are the same
+        for filename, streamfile in [(self.outfile, self.streamfile),
+                                     (self.windowfile,
+                                      self.streamwindowfile)]:
+            with open(filename) as handle:
+                reference = handle.read()
+
+            with open(streamfile) as handle:
+                self.assertEqual(handle.read(), reference)
+
+
+class LazyImportTestCase(unittest.TestCase):
+    """A class to test that the plotting stack is not loaded with GClib"""
+
+    def test_lazy_import(self):
+        """Test importing GClib doesn't load Graphs, matplotlib and Bio.SeqIO"""
+
+        modules = ["GClib.Graphs", "matplotlib", "gd", "PIL", "Bio.SeqIO"]
+
+        cmd = [
+            sys.executable, "-c",
+            "import sys, GClib, GClib.Elements, GClib.Utility; "
+            "print(' '.join(sorted(sys.modules.keys())))"]
+
+        loaded = subprocess.check_output(cmd).split()
+
+        for module in modules:
+            self.assertNotIn(module, loaded)
+
+
 if __name__ == "__main__":
     unittest.main()